@@ -1,34 +1,83 @@
+import time
+# Worker startup is timed from here; see create_app()
+_import_started = time.perf_counter()
+
 import os
 import json
 import secrets
 import hashlib
+import base64
+import math
+import functools
+import mimetypes
+import threading
 from datetime import datetime, timedelta
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g, Response, flash, send_from_directory
 from dotenv import load_dotenv
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from the .env file next to this module (before the modules
+# below read their configuration); an explicit path skips python-dotenv's directory search
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
 
 # Import the encryption helper
 from encryption_helper import PasswordEncryption
+from kdf_service import kdf_service, KDFBusyError
 
 # Import database module
-from database import init_db, get_user_by_username, get_user_by_email, create_user, update_user_password
-from database import add_password, get_passwords_by_user_id, get_password_by_id, delete_password
+from database import init_db, get_user_by_username, get_user_by_email, get_user_by_id, create_user, update_user_password, rehash_user_password
+from database import add_password, get_password_by_id, delete_password
 from database import create_reset_token, get_reset_token, mark_token_as_used
 from database import create_recovery_key, get_recovery_key_by_user_id, verify_recovery_key
+from database import get_email_outbox_counts, get_password_page, get_vault_revision, get_vault_changes, search_passwords
+from database import get_user_cache_stats
+from database import get_pool_stats, create_vault_key, get_vault_key, delete_vault_key
+from database import update_encrypted_passwords, get_encrypted_passwords
+from encryption_helper import ENTRY_FORMAT_VERSION
+from vault_migration import migrate_legacy_entries
+from vault_health import backfill_fingerprints, describe_password, vault_health_report
+from vault_export import EXPORT_FORMATS, export_entries, format_ndjson, format_csv, seal_stream
+from vault_import import IMPORT_CONFIG, ImportFormatError, ImportTooLargeError, SizeLimitedStream, detect_format, open_import, import_entries
+from email_outbox import EmailOutbox
+from maintenance import scheduler as maintenance
+from rate_limit import RATE_LIMIT_CONFIG, RateLimitExceeded, limiter
+from breach_check import breach_index, breach_warning
+from assets import ASSET_CONFIG, asset_manifest, precompressed_variant
+from page_cache import PAGE_CACHE_CONFIG, PageCache
+from password_generator import (DEFAULT_CLASSES, GeneratorError, generate_passwords, generate_passphrases,
+                                password_entropy, passphrase_entropy)
+
+import metrics
 
-# Initialize database
-init_db()
+# Import unlocked-vault session cache
+from vault_session import unlock_vault, get_unlocked_vault, lock_vault, lock_user_vaults, vault_cache_stats
 
 app = Flask(__name__)
 # Use a fixed secret key in production from environment variable, otherwise generate a random one
 app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24)
 
+@app.template_global()
+def asset_url(name):
+    """url_for('static') for a source asset, linking its content-hashed build when there is one"""
+    return url_for('static', filename=asset_manifest.resolve(name))
+
+def serve_static(filename):
+    """Static files; built assets are sent precompressed and marked immutable"""
+    if not asset_manifest.is_built(filename):
+        return app.send_static_file(filename)
+    send_name, encoding = precompressed_variant(app.static_folder, filename, request.accept_encodings.quality)
+    response = send_from_directory(app.static_folder, send_name, max_age=ASSET_CONFIG['max_age'],
+                                   mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # The URL changes whenever the content does, so browsers needn't even revalidate
+    response.headers['Cache-Control'] = f"public, max-age={ASSET_CONFIG['max_age']}, immutable"
+    return response
+
+app.view_functions['static'] = serve_static
+
 # Email configuration - Production ready settings
 EMAIL_CONFIG = {
     'smtp_server': os.environ.get('SMTP_SERVER', 'smtp.gmail.com'),
@@ -38,18 +87,77 @@ EMAIL_CONFIG = {
     'use_tls': os.environ.get('EMAIL_USE_TLS', 'True').lower() == 'true'
 }
 
-print(f"Email configuration loaded:")
-print(f"  SMTP Server: {EMAIL_CONFIG['smtp_server']}")
-print(f"  SMTP Port: {EMAIL_CONFIG['smtp_port']}")
-print(f"  Sender Email: {EMAIL_CONFIG['sender_email']}")
-print(f"  Use TLS: {EMAIL_CONFIG['use_tls']}")
+# Background email delivery; each worker runs a sender thread that drains the outbox table
+# (started by create_app, as is the maintenance scheduler)
+outbox = EmailOutbox(EMAIL_CONFIG)
+
+# Worker startup, timed by phase; reported on /health and as a histogram on /metrics
+worker_startup_duration = metrics.histogram(
+    'securepass_worker_startup_seconds', 'Time a worker spent starting up, by phase', ['phase'])
+_startup = {'pid': None}
+_startup_lock = threading.Lock()
+
+def create_app():
+    """
+    Finish starting this worker process and return the app
+
+    Importing this module only defines the app and its routes. Schema migrations, the
+    email sender and the maintenance scheduler start here, once per process (a forked
+    worker runs it again). The first request runs it if the server didn't.
+    """
+    if _startup['pid'] == os.getpid():
+        return app
+    with _startup_lock:
+        if _startup['pid'] == os.getpid():
+            return app
+        started = time.perf_counter()
+        # Module import only counts for the process that did the import
+        phases = {'import': started - _import_started} if _startup['pid'] is None else {}
+        
+        phase_started = time.perf_counter()
+        applied = init_db()
+        phases['migrations'] = time.perf_counter() - phase_started
+        
+        phase_started = time.perf_counter()
+        outbox.start()
+        # Token purges, ANALYZE, incremental vacuum and WAL checkpoints; one worker runs each job at a time
+        maintenance.start()
+        phases['background'] = time.perf_counter() - phase_started
+        
+        phases['total'] = sum(phases.values())
+        for phase, seconds in phases.items():
+            worker_startup_duration.observe(seconds, phase)
+        _startup.update(pid=os.getpid(), started_at=datetime.now().isoformat(),
+                        seconds={phase: round(seconds, 4) for phase, seconds in phases.items()},
+                        migrations_applied=[f"shard {shard}: {version:04d}_{name}" for shard, version, name, _ in applied])
+        print(f"Worker {os.getpid()} ready in {phases['total'] * 1000:.0f} ms ("
+              + ', '.join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in phases.items() if phase != 'total')
+              + f"; {len(applied)} migration(s) applied; SMTP {EMAIL_CONFIG['smtp_server']}:{EMAIL_CONFIG['smtp_port']})")
+    return app
+
+@app.before_request
+def ensure_started():
+    create_app()
 
 # Initialize encryption helper
 encryptor = PasswordEncryption()
 
+# Worker pool for decrypting legacy entries in batch requests (each one costs a KDF run)
+BATCH_DECRYPT_CONFIG = {
+    'max_ids': int(os.environ.get('BATCH_DECRYPT_MAX_IDS', 1000)),
+    'workers': int(os.environ.get('BATCH_DECRYPT_WORKERS', 4)),
+}
+decrypt_executor = ThreadPoolExecutor(max_workers=BATCH_DECRYPT_CONFIG['workers'])
+
+# Page sizes for the vault listing
+PAGE_CONFIG = {
+    'default_limit': int(os.environ.get('PASSWORDS_PAGE_SIZE', 100)),
+    'max_limit': int(os.environ.get('PASSWORDS_MAX_PAGE_SIZE', 500)),
+}
+
 def send_password_reset_email(username, recipient_email, reset_link):
     """
-    Send password reset email to user
+    Queue a password reset email for the background sender
     
     Args:
         username (str): The username of the recipient
@@ -57,15 +165,9 @@ def send_password_reset_email(username, recipient_email, reset_link):
         reset_link (str): The password reset link to include in the email
     
     Returns:
-        bool: True if email was sent successfully, False otherwise
+        bool: True if the email was queued successfully, False otherwise
     """
     try:
-        # Create message
-        message = MIMEMultipart("alternative")
-        message["Subject"] = "SecurePass Password Reset"
-        message["From"] = EMAIL_CONFIG['sender_email']
-        message["To"] = recipient_email
-        
         # Create the plain-text version
         text = f"""\
         Hi {username},
@@ -116,39 +218,65 @@ def send_password_reset_email(username, recipient_email, reset_link):
         </html>
         """
         
-        # Turn these into plain/html MIMEText objects
-        part1 = MIMEText(text, "plain")
-        part2 = MIMEText(html, "html")
-        
-        # Add HTML/plain-text parts to MIMEMultipart message
-        message.attach(part1)
-        message.attach(part2)
-        
-        # Create secure connection and send email
-        if EMAIL_CONFIG['use_tls']:
-            server = smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'])
-            server.starttls()
-            server.login(EMAIL_CONFIG['sender_email'], EMAIL_CONFIG['sender_password'])
-            server.sendmail(EMAIL_CONFIG['sender_email'], recipient_email, message.as_string())
-            server.quit()
-        else:
-            server = smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'])
-            server.login(EMAIL_CONFIG['sender_email'], EMAIL_CONFIG['sender_password'])
-            server.sendmail(EMAIL_CONFIG['sender_email'], recipient_email, message.as_string())
-            server.quit()
-        
-        print(f"Password reset email sent successfully to {recipient_email}")
+        outbox.enqueue(recipient_email, "SecurePass Password Reset", text, html)
+        print(f"Password reset email queued for {recipient_email}")
         return True
     except Exception as e:
-        print(f"Error sending email to {recipient_email}: {e}")
+        print(f"Error queueing email to {recipient_email}: {e}")
         return False
 
+def client_ip():
+    """The client's address, taken from X-Forwarded-For when behind trusted proxies"""
+    proxies = RATE_LIMIT_CONFIG['trusted_proxies']
+    if proxies:
+        forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.remote_addr
+
+def rate_limited(rule, username_field=None):
+    """Apply a rate limit rule to POSTs to a form route, before the view does any KDF work"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method == 'POST':
+                username = request.form.get(username_field) if username_field else None
+                limiter.check(rule, ip=client_ip(), username=username)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Anonymous pages link assets through the manifest, so a new asset build invalidates them too
+page_cache = PageCache([os.path.join(app.root_path, app.template_folder)], [asset_manifest.path])
+
+def render_page(template_name, **context):
+    """
+    render_template for GET pages that look the same to every anonymous visitor
+
+    The output is cached per worker and sent with a strong ETag, so a revalidating
+    browser gets 304 without a render. Signed-in visitors, pending flash messages and
+    error/message arguments all render normally.
+    """
+    if (not PAGE_CACHE_CONFIG['enabled'] or request.method not in ('GET', 'HEAD')
+            or 'username' in session or '_flashes' in session):
+        return render_template(template_name, **context)
+    key = page_cache.key(template_name, context, request.script_root)
+    if key is None:
+        return render_template(template_name, **context)
+    page = page_cache.get(key, lambda: render_template(template_name, **context))
+    response = Response(page.body, mimetype='text/html')
+    response.set_etag(page.etag)
+    # Browsers may keep the page but must revalidate, which costs a 304 and no render
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
 # Routes
 @app.route('/')
 def index():
     if 'username' in session:
         return redirect(url_for('dashboard'))
-    return render_template('index.html')
+    return render_page('index.html')
 
 @app.route('/dashboard')
 def dashboard():
@@ -157,6 +285,7 @@ def dashboard():
     return render_template('dashboard.html')
 
 @app.route('/register', methods=['GET', 'POST'])
+@rate_limited('register')
 def register():
     if request.method == 'POST':
         username = request.form['username']
@@ -190,6 +319,9 @@ def register():
         try:
             # Create user in database
             user_id = create_user(username, email, master_hash)
+            warning = breach_warning(breach_index.lookup(master_password), 'Your master password')
+            if warning:
+                flash(warning)
             return redirect(url_for('login'))
         except sqlite3.IntegrityError as e:
             # Handle specific database constraint violations
@@ -204,16 +336,25 @@ def register():
             print(f"Registration error: {str(e)}")
             return render_template('register.html', error='Registration failed. Please try again.')
     
-    return render_template('register.html')
+    return render_page('register.html')
+
+def upgrade_master_hash(user, master_password):
+    """Rehash a just-verified master password with the current KDF settings"""
+    try:
+        rehash_user_password(user['id'], user['password_hash'], encryptor.hash_master_password(master_password))
+    except Exception as e:
+        # The old hash still verifies; try again at the next login
+        print(f"Master password rehash for user {user['id']} failed: {e}")
 
 @app.route('/login', methods=['GET', 'POST'])
+@rate_limited('login', username_field='username')
 def login():
     if request.method == 'POST':
         username = request.form['username']
         master_password = request.form['master_password']
         
-        # Get user from database
-        user = get_user_by_username(username)
+        # Get user from database (bypassing the cache: the hash may have just been reset in another worker)
+        user = get_user_by_username(username, use_cache=False)
         
         if not user:
             return render_template('login.html', error='Invalid username or password')
@@ -222,17 +363,23 @@ def login():
         try:
             is_valid = encryptor.verify_master_password(master_password, user['password_hash'])
             if is_valid:
+                if encryptor.master_hash_needs_rehash(user['password_hash']):
+                    upgrade_master_hash(user, master_password)
+                lock_vault(session)
                 session['username'] = username
                 session['user_id'] = user['id']
                 return redirect(url_for('dashboard'))
             else:
                 return render_template('login.html', error='Invalid username or password')
+        except KDFBusyError:
+            return render_template('login.html', error='Server is busy. Please try again in a moment.'), 503
         except Exception as e:
             return render_template('login.html', error='Login failed')
     
-    return render_template('login.html')
+    return render_page('login.html')
 
 @app.route('/forgot_password', methods=['GET', 'POST'])
+@rate_limited('forgot_password', username_field='username')
 def forgot_password():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -273,9 +420,10 @@ def forgot_password():
         return render_template('forgot_password.html', 
                              message='If account exists, reset instructions sent to email')
     
-    return render_template('forgot_password.html')
+    return render_page('forgot_password.html')
 
 @app.route('/reset_password/<token>', methods=['GET', 'POST'])
+@rate_limited('reset_password')
 def reset_password(token):
     # Get token from database
     token_data = get_reset_token(token)
@@ -318,10 +466,15 @@ def reset_password(token):
         # Update user's password
         try:
             update_user_password(token_data['user_id'], master_hash)
+            delete_vault_key(token_data['user_id'])
+            lock_user_vaults(token_data['user_id'])
             
             # Mark token as used
             mark_token_as_used(token_data['id'])
             
+            warning = breach_warning(breach_index.lookup(new_password), 'Your new master password')
+            if warning:
+                flash(warning)
             return render_template('reset_password.html', 
                                  success='Password reset successfully.')
         except Exception as e:
@@ -337,7 +490,7 @@ def generate_recovery_key():
         return jsonify({'error': 'Not authenticated'}), 401
     
     # Get user from database
-    user = get_user_by_username(session['username'])
+    user = get_user_by_id(session['user_id'])
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
@@ -357,6 +510,7 @@ def generate_recovery_key():
         return jsonify({'error': 'Failed to generate recovery key'}), 500
 
 @app.route('/use_recovery_key', methods=['GET', 'POST'])
+@rate_limited('use_recovery_key', username_field='username')
 def use_recovery_key():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -381,9 +535,10 @@ def use_recovery_key():
         session['recovery_user_id'] = user['id']
         return redirect(url_for('recovery_reset_password'))
     
-    return render_template('use_recovery_key.html')
+    return render_page('use_recovery_key.html')
 
 @app.route('/recovery_reset_password', methods=['GET', 'POST'])
+@rate_limited('recovery_reset_password')
 def recovery_reset_password():
     if not session.get('recovery_authenticated'):
         return redirect(url_for('login'))
@@ -413,12 +568,17 @@ def recovery_reset_password():
         # Update user's password
         try:
             update_user_password(user_id, master_hash)
+            delete_vault_key(user_id)
+            lock_user_vaults(user_id)
             
             # Clear recovery session
             session.pop('recovery_authenticated', None)
             session.pop('recovery_username', None)
             session.pop('recovery_user_id', None)
             
+            warning = breach_warning(breach_index.lookup(new_password), 'Your new master password')
+            if warning:
+                flash(warning)
             return render_template('recovery_reset_password.html', 
                                  success='Password reset successfully.')
         except Exception as e:
@@ -429,6 +589,7 @@ def recovery_reset_password():
 
 @app.route('/logout')
 def logout():
+    lock_vault(session)
     session.pop('username', None)
     session.pop('user_id', None)
     return redirect(url_for('index'))
@@ -440,17 +601,82 @@ def get_passwords():
         return jsonify({'error': 'Not authenticated'}), 401
     
     # Get user from database
-    user = get_user_by_username(session['username'])
+    user = get_user_by_id(session['user_id'])
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    # Get passwords from database
-    user_passwords = get_passwords_by_user_id(user['id'])
+    # Optional keyset pagination: ?limit=N for the first page, then ?after=<next_after>
+    after_token = request.args.get('after')
+    limit = request.args.get('limit')
+    if limit is not None:
+        # Parsed by hand: type=int would quietly turn limit=abc into the default page size
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= PAGE_CONFIG['max_limit']:
+            return jsonify({'error': f"limit must be between 1 and {PAGE_CONFIG['max_limit']}"}), 400
+    if after_token and limit is None:
+        limit = PAGE_CONFIG['default_limit']
+    try:
+        after = decode_page_cursor(after_token) if after_token else None
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    # The vault revision changes on every add/update/delete, so an unchanged vault answers 304
+    revision = get_vault_revision(user['id'])
+    etag = hashlib.sha256(f"{user['id']}:{revision}:{after_token}:{limit}".encode()).hexdigest()[:32]
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        # Get passwords from database (metadata only, never the encrypted blobs)
+        rows = get_password_page(user['id'], after, limit + 1 if limit else None)
+        
+        # Convert to list of dictionaries
+        passwords_list = []
+        for password in rows[:limit]:
+            passwords_list.append({
+                'id': password['id'],
+                'site_name': password['site_name'],
+                'site_url': password['site_url'],
+                'site_username': password['site_username'],
+                'created_at': password['created_at']
+            })
+        
+        payload = {'passwords': passwords_list, 'revision': revision}
+        if limit:
+            last = rows[limit - 1] if len(rows) > limit else None
+            payload['next_after'] = encode_page_cursor(last['created_at'], last['id']) if last else None
+        response = jsonify(payload)
+    
+    response.set_etag(etag)
+    # Let browsers keep the list but always revalidate it
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/api/passwords/search', methods=['GET'])
+def search_passwords_api():
+    if 'username' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    terms = request.args.get('q', '').split()
+    if not terms:
+        return jsonify({'error': 'Search query required'}), 400
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= 100:
+        return jsonify({'error': 'limit must be between 1 and 100'}), 400
+    
+    # Get user from database
+    user = get_user_by_id(session['user_id'])
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
     
-    # Convert to list of dictionaries
-    passwords_list = []
-    for password in user_passwords:
-        passwords_list.append({
+    results = []
+    for password in search_passwords(user['id'], terms[:10], limit):
+        results.append({
             'id': password['id'],
             'site_name': password['site_name'],
             'site_url': password['site_url'],
@@ -458,44 +684,85 @@ def get_passwords():
             'created_at': password['created_at']
         })
     
-    return jsonify({'passwords': passwords_list})
+    return jsonify({'passwords': results})
+
+@app.route('/api/sync', methods=['GET'])
+def sync_api():
+    if 'username' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    # ?since=<revision from the previous sync>; 0 (or none) fetches the whole vault
+    try:
+        since = int(request.args.get('since', 0))
+        if since < 0:
+            raise ValueError(since)
+    except ValueError:
+        return jsonify({'error': 'since must be a revision number'}), 400
+    
+    # Get user from database
+    user = get_user_by_id(session['user_id'])
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    changes = get_vault_changes(user['id'], since)
+    changed = []
+    for password in changes['changed']:
+        changed.append({
+            'id': password['id'],
+            'site_name': password['site_name'],
+            'site_url': password['site_url'],
+            'site_username': password['site_username'],
+            'created_at': password['created_at'],
+            'updated_at': password['updated_at'],
+            'revision': password['revision']
+        })
+    
+    response = jsonify({'revision': changes['revision'], 'full': changes['full'],
+                        'changed': changed, 'deleted': changes['deleted']})
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 @app.route('/api/passwords', methods=['POST'])
 def add_password_api():
     if 'username' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    data = request.get_json()
+    data = request.get_json() or {}
     master_password = data.get('master_password')
     site_name = data.get('site_name')
     site_url = data.get('site_url')
     site_username = data.get('site_username')
     site_password = data.get('site_password')
     
-    if not all([master_password, site_name, site_username, site_password]):
+    if not all([site_name, site_username, site_password]):
         return jsonify({'error': 'Missing required fields'}), 400
     
     # Get user from database
-    user = get_user_by_username(session['username'])
+    user = get_user_by_id(session['user_id'])
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    # Verify master password
-    try:
-        is_valid = encryptor.verify_master_password(master_password, user['password_hash'])
-        if not is_valid:
-            return jsonify({'error': 'Invalid master password'}), 401
-    except Exception as e:
-        return jsonify({'error': 'Verification failed'}), 500
+    # Use the unlocked vault key if there is one, otherwise unlock with the master password
+    vault, error = require_vault(user, master_password)
+    if error:
+        return error
     
-    # Encrypt the password
+    # Encrypt the password under the vault key
     try:
-        encrypted_data = encryptor.encrypt_password(site_password, master_password)
+        encrypted_data = encryptor.encrypt_entry(site_password, vault.key, encryptor.entry_associated_data(user['id']))
+        # Fingerprint and score it now, while the plaintext is at hand, for the vault health report
+        fingerprint, strength = describe_password(encryptor, site_password, encryptor.fingerprint_key(vault.key))
         
         # Store the encrypted password in database
-        password_id = add_password(user['id'], site_name, site_url, site_username, encrypted_data)
+        password_id = add_password(user['id'], site_name, site_url, site_username,
+                                   json.dumps(encrypted_data), enc_version=ENTRY_FORMAT_VERSION,
+                                   fingerprint=fingerprint, strength=strength)
         
-        return jsonify({'message': 'Password added successfully'})
+        response = {'message': 'Password added successfully'}
+        warning = breach_warning(breach_index.lookup(site_password))
+        if warning:
+            response['warning'] = warning
+        return jsonify(response)
     except Exception as e:
         return jsonify({'error': 'Encryption failed'}), 500
 
@@ -504,27 +771,21 @@ def decrypt_password(password_id):
     if 'username' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    data = request.get_json()
+    data = request.get_json() or {}
     master_password = data.get('master_password')
     
-    if not master_password:
-        return jsonify({'error': 'Master password required'}), 400
-    
     # Get user from database
-    user = get_user_by_username(session['username'])
+    user = get_user_by_id(session['user_id'])
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    # Verify master password
-    try:
-        is_valid = encryptor.verify_master_password(master_password, user['password_hash'])
-        if not is_valid:
-            return jsonify({'error': 'Invalid master password'}), 401
-    except Exception as e:
-        return jsonify({'error': 'Verification failed'}), 500
+    # Use the unlocked vault key if there is one, otherwise unlock with the master password
+    vault, error = require_vault(user, master_password)
+    if error:
+        return error
     
     # Get the password entry from database
-    password_entry = get_password_by_id(password_id)
+    password_entry = get_password_by_id(password_id, user['id'])
     
     if not password_entry:
         return jsonify({'error': 'Password not found'}), 404
@@ -535,19 +796,389 @@ def decrypt_password(password_id):
     
     # Decrypt the password
     try:
-        decrypted_password = encryptor.decrypt_password(password_entry['encrypted_data'], master_password)
-        return jsonify({'password': decrypted_password})
+        encrypted_data = json.loads(password_entry['encrypted_data'])
+        associated_data = encryptor.entry_associated_data(user['id'])
+        if not encryptor.is_legacy_entry(encrypted_data):
+            return jsonify({'password': encryptor.decrypt_entry(encrypted_data, vault.key, associated_data)})
     except Exception as e:
         return jsonify({'error': 'Decryption failed'}), 500
+    
+    # Legacy entry the unlock-time migration hasn't reached yet: open it with the master password
+    if not master_password:
+        return jsonify({'error': 'Master password required'}), 400
+    try:
+        decrypted_password = encryptor.decrypt_password(encrypted_data, master_password)
+    except Exception as e:
+        return jsonify({'error': 'Decryption failed'}), 500
+    
+    entry = encryptor.encrypt_entry(decrypted_password, vault.key, associated_data)
+    update_encrypted_passwords(user['id'], [(password_id, json.dumps(entry))], ENTRY_FORMAT_VERSION)
+    return jsonify({'password': decrypted_password})
+
+@app.route('/api/passwords/decrypt', methods=['POST'])
+def decrypt_passwords_batch():
+    if 'username' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    data = request.get_json() or {}
+    master_password = data.get('master_password')
+    ids = data.get('ids')
+    
+    if ids == 'all':
+        password_ids = None
+    elif isinstance(ids, list) and ids and all(type(i) is int for i in ids):  # bool is an int subclass
+        if len(ids) > BATCH_DECRYPT_CONFIG['max_ids']:
+            return jsonify({'error': f"At most {BATCH_DECRYPT_CONFIG['max_ids']} IDs per request"}), 400
+        password_ids = list(dict.fromkeys(ids))
+    else:
+        return jsonify({'error': 'ids must be a list of password IDs or "all"'}), 400
+    
+    # Get user from database
+    user = get_user_by_id(session['user_id'])
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    # Verify the master password once for the whole batch
+    vault, error = require_vault(user, master_password)
+    if error:
+        return error
+    
+    # Load every requested row in one query
+    rows = get_encrypted_passwords(user['id'], password_ids)
+    associated_data = encryptor.entry_associated_data(user['id'])
+    results = {}
+    legacy = []
+    
+    # Vault-key entries take microseconds each, so they are decrypted inline
+    for row in rows:
+        try:
+            encrypted_data = json.loads(row['encrypted_data'])
+            if encryptor.is_legacy_entry(encrypted_data):
+                legacy.append((row['id'], encrypted_data))
+            else:
+                results[row['id']] = {'password': encryptor.decrypt_entry(encrypted_data, vault.key, associated_data)}
+        except Exception as e:
+            results[row['id']] = {'error': 'Decryption failed'}
+    
+    # Legacy entries need a KDF run each, so they are spread over the worker pool and migrated
+    if legacy:
+        if not master_password:
+            for password_id, _ in legacy:
+                results[password_id] = {'error': 'Master password required'}
+        else:
+            def open_legacy(item):
+                try:
+                    return item[0], encryptor.decrypt_password(item[1], master_password)
+                except Exception as e:
+                    return item[0], None
+            
+            migrated = []
+            for password_id, plaintext in decrypt_executor.map(open_legacy, legacy):
+                if plaintext is None:
+                    results[password_id] = {'error': 'Decryption failed'}
+                    continue
+                results[password_id] = {'password': plaintext}
+                entry = encryptor.encrypt_entry(plaintext, vault.key, associated_data)
+                migrated.append((password_id, json.dumps(entry)))
+            if migrated:
+                update_encrypted_passwords(user['id'], migrated, ENTRY_FORMAT_VERSION)
+    
+    order = password_ids if password_ids is not None else [row['id'] for row in rows]
+    return jsonify({'results': [
+        dict({'id': password_id}, **results.get(password_id, {'error': 'Password not found'}))
+        for password_id in order
+    ]})
+
+@app.route('/api/passwords/import', methods=['POST'])
+def import_passwords_api():
+    if 'username' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    if request.content_length and request.content_length > IMPORT_CONFIG['max_bytes']:
+        return jsonify({'error': f"Import is larger than {IMPORT_CONFIG['max_bytes']} bytes"}), 413
+    # Chunked bodies have no Content-Length to check up front, so count what is read
+    # instead; this must happen before anything touches the body (request.stream, files, form)
+    request.environ['wsgi.input'] = SizeLimitedStream(request.environ['wsgi.input'], IMPORT_CONFIG['max_bytes'])
+    
+    # Either a multipart upload ('file' plus optional master_password and format fields),
+    # or a raw text/csv or application/json body for an already unlocked vault
+    try:
+        upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+    except ImportTooLargeError as e:
+        return jsonify({'error': str(e)}), 413
+    if upload is not None:
+        stream = upload.stream
+        master_password = request.form.get('master_password')
+        fmt = detect_format(request.form.get('format'), upload.filename, upload.mimetype)
+    else:
+        stream = request.stream
+        master_password = None
+        fmt = detect_format(request.args.get('format'), mimetype=request.mimetype)
+    
+    if fmt is None:
+        return jsonify({'error': 'Unknown import format; use csv or json'}), 400
+    
+    # Get user from database
+    user = get_user_by_id(session['user_id'])
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    # Verify the master password once for the whole import
+    vault, error = require_vault(user, master_password)
+    if error:
+        return error
+    
+    try:
+        rows = open_import(stream, fmt)
+    except ImportFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    except ImportTooLargeError as e:
+        return jsonify({'error': str(e)}), 413
+    
+    report = import_entries(encryptor, user['id'], vault.key, rows)
+    return jsonify(report), 413 if report.get('too_large') else 200
+
+@app.route('/api/passwords/export', methods=['GET', 'POST'])
+def export_passwords_api():
+    if 'username' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    # Secrets (master password, export passphrase) are only read from a POST body, never the URL
+    data = (request.get_json(silent=True) or {}) if request.method == 'POST' else {}
+    master_password = data.get('master_password')
+    passphrase = data.get('passphrase')
+    fmt = (data.get('format') or request.args.get('format') or 'ndjson').lower()
+    
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    # Get user from database
+    user = get_user_by_id(session['user_id'])
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    vault, error = require_vault(user, master_password)
+    if error:
+        return error
+    
+    batches = export_entries(encryptor, user['id'], vault.key, master_password)
+    body = format_csv(batches) if fmt == 'csv' else format_ndjson(batches)
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    if passphrase:
+        try:
+            body = seal_stream(body, passphrase, fmt)
+        except KDFBusyError:
+            return kdf_busy_response()
+        mimetype, extension = 'application/octet-stream', f'{extension}.spx'
+    
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="securepass-export.{extension}"',
+        'Cache-Control': 'no-store',
+    })
+
+@app.route('/api/vault/unlock', methods=['POST'])
+def unlock_vault_api():
+    if 'username' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    data = request.get_json() or {}
+    master_password = data.get('master_password')
+    
+    if not master_password:
+        return jsonify({'error': 'Master password required'}), 400
+    
+    # Get user from database
+    user = get_user_by_id(session['user_id'])
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    _, error = unlock_or_error(user, master_password)
+    if error:
+        return error
+    
+    return jsonify({'message': 'Vault unlocked'})
+
+@app.route('/api/vault/health', methods=['GET'])
+def vault_health_api():
+    if 'username' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    # Get user from database
+    user = get_user_by_id(session['user_id'])
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    # Built from stored fingerprints and scores, so the vault doesn't need to be unlocked
+    return jsonify(vault_health_report(user['id']))
+
+@app.route('/api/vault/lock', methods=['POST'])
+def lock_vault_api():
+    if 'username' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    lock_vault(session)
+    return jsonify({'message': 'Vault locked'})
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Label by route endpoint, not path, so IDs in URLs don't explode the series count
+        metrics.http_request_duration.observe(
+            time.perf_counter() - started, request.endpoint or 'unmatched', request.method, str(response.status_code))
+        metrics.flush()
+    return response
+
+@app.errorhandler(KDFBusyError)
+def handle_kdf_busy(error):
+    if request.path.startswith('/api/'):
+        return kdf_busy_response()
+    return 'Server is busy. Please try again in a moment.', 503, {'Retry-After': '1'}
+
+def kdf_busy_response():
+    """JSON response for API calls rejected because the KDF pool is saturated"""
+    return jsonify({'error': 'Server is busy, please retry'}), 503, {'Retry-After': '1'}
+
+@app.errorhandler(RateLimitExceeded)
+def handle_rate_limited(error):
+    if request.path.startswith('/api/'):
+        return rate_limited_response(error)
+    return 'Too many attempts. Please try again later.', 429, {'Retry-After': str(math.ceil(error.retry_after))}
+
+def rate_limited_response(error):
+    """JSON response for API calls over a rate limit"""
+    retry_after = math.ceil(error.retry_after)
+    return jsonify({'error': 'Too many attempts, please retry later', 'retry_after': retry_after}), 429, {
+        'Retry-After': str(retry_after)}
+
+def encode_page_cursor(created_at, password_id):
+    """Opaque cursor pointing just past an entry in the newest-first listing"""
+    return base64.urlsafe_b64encode(f"{created_at}|{password_id}".encode()).decode()
+
+def decode_page_cursor(token):
+    """Parse a cursor made by encode_page_cursor, raising ValueError if malformed"""
+    try:
+        created_at, password_id = base64.urlsafe_b64decode(token.encode()).decode().rsplit('|', 1)
+        return created_at, int(password_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def require_vault(user, master_password):
+    """
+    The session's unlocked vault, or the vault unlocked with the master password
+    
+    Returns:
+        tuple: (vault, None), or (None, error response) for the route to return as is
+    """
+    vault = get_unlocked_vault(session, user['id'])
+    if vault is not None:
+        return vault, None
+    return unlock_or_error(user, master_password)
+
+def unlock_or_error(user, master_password):
+    """unlock_with_master_password, with each failure turned into its API error response"""
+    if not master_password:
+        return None, (jsonify({'error': 'Master password required'}), 400)
+    try:
+        vault = unlock_with_master_password(user, master_password)
+    except KDFBusyError:
+        return None, kdf_busy_response()
+    except RateLimitExceeded as e:
+        return None, rate_limited_response(e)
+    except Exception:
+        return None, (jsonify({'error': 'Verification failed'}), 500)
+    if vault is None:
+        return None, (jsonify({'error': 'Invalid master password'}), 401)
+    return vault, None
+
+def unlock_with_master_password(user, master_password):
+    """
+    Unwrap the user's vault key with the master password and cache it for this session
+    
+    Users without a vault key yet get one created after a regular master password check.
+    Legacy per-entry-salt entries are re-encrypted under the vault key while the master
+    password is available, within a time budget; the rest are picked up on the next unlock.
+    Entries without a fingerprint for the vault health report are backfilled the same way.
+    
+    Args:
+        user: The user row from the database
+        master_password (str): The master password to verify
+    
+    Returns:
+        UnlockedVault: The unlocked vault, or None if the master password is wrong
+    
+    Raises:
+        RateLimitExceeded: Too many master password checks from this client or for this user
+    """
+    # Every path below runs a KDF, so throttle before any of them
+    limiter.check('vault_unlock', ip=client_ip(), user=user['id'])
+    
+    record = get_vault_key(user['id'])
+    if record is None:
+        # No vault key (new user or just reset): check against the current hash, not a cached one
+        user = get_user_by_id(user['id'], use_cache=False)
+        if user is None or not encryptor.verify_master_password(master_password, user['password_hash']):
+            return None
+        vault_key = encryptor.generate_vault_key()
+        wrapped = encryptor.wrap_vault_key(vault_key, master_password)
+        if not create_vault_key(user['id'], wrapped['salt'], wrapped['wrapped_key']):
+            # Another request created the key first; theirs is the vault key
+            record = get_vault_key(user['id'])
+    
+    if record is not None:
+        try:
+            vault_key = encryptor.unwrap_vault_key(
+                {'salt': record['kdf_salt'], 'wrapped_key': record['wrapped_key']}, master_password)
+        except ValueError:
+            return None
+    
+    vault = unlock_vault(session, user['id'], vault_key)
+    migration = migrate_legacy_entries(encryptor, user['id'], master_password, vault_key)
+    if migration['migrated'] or migration['failed']:
+        print(f"Vault migration for user {user['id']}: {migration}")
+    backfill = backfill_fingerprints(encryptor, user['id'], vault_key)
+    if backfill['fingerprinted'] or backfill['failed']:
+        print(f"Fingerprint backfill for user {user['id']}: {backfill}")
+    return vault
 
 @app.route('/api/generate-password', methods=['POST'])
 def generate_password():
-    data = request.get_json()
-    length = data.get('length', 16)
+    data = request.get_json(silent=True) or {}
+    mode = data.get('mode', 'password')
+    count = data.get('count')
     
-    # Generate a secure password
-    generated_password = generate_secure_password(length)
-    return jsonify({'password': generated_password})
+    try:
+        # Default only when the key is absent, so an explicit 0 is rejected like any other bad count
+        n = 1 if count is None else count
+        if mode == 'passphrase':
+            words = data.get('words', 6)
+            results = generate_passphrases(words, n, data.get('separator', '-'), bool(data.get('capitalize')))
+            entropy = passphrase_entropy(words)
+        elif mode == 'password':
+            length = data.get('length', 16)
+            exclude = data.get('exclude', '')
+            if not isinstance(exclude, str):
+                return jsonify({'error': 'exclude must be a string of characters'}), 400
+            policy = {
+                'classes': data.get('classes') or DEFAULT_CLASSES,
+                'exclude_ambiguous': bool(data.get('exclude_ambiguous')),
+                'exclude': exclude,
+            }
+            results = generate_passwords(length, n, require=data.get('require') or (), **policy)
+            entropy = password_entropy(length, **policy)
+        else:
+            return jsonify({'error': 'mode must be password or passphrase'}), 400
+    except GeneratorError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # A single password keeps the original response shape; count asks for a list
+    if count is None:
+        return jsonify({'password': results[0], 'entropy_bits': round(entropy, 1)})
+    return jsonify({'passwords': results, 'entropy_bits': round(entropy, 1)})
 
 @app.route('/health')
 def health_check():
@@ -558,15 +1189,27 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'service': 'SecurePass Password Manager'
+        'service': 'SecurePass Password Manager',
+        'database_pool': get_pool_stats(),
+        'vault_cache': vault_cache_stats(),
+        'kdf': kdf_service.stats(),
+        'email_outbox': dict(outbox.stats(), queue=get_email_outbox_counts()),
+        'user_cache': get_user_cache_stats(),
+        'maintenance': maintenance.stats(),
+        'rate_limit': limiter.stats(),
+        'breach_index': breach_index.stats(),
+        'page_cache': page_cache.stats(),
+        'startup': dict(_startup)
     })
 
-def generate_secure_password(length):
-    import secrets
-    import string
-    
-    charset = string.ascii_letters + string.digits + "!@#$%^&*()_+-=[]{}|;:,.<>?"
-    return ''.join(secrets.choice(charset) for _ in range(length))
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Prometheus scrape endpoint with latency histograms merged across all workers.
+    """
+    if not metrics.METRICS_CONFIG['enabled']:
+        return 'Metrics are disabled', 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
-    app.run(debug=True, host='127.0.0.1', port=5001)
+    create_app().run(debug=True, host='127.0.0.1', port=5001)
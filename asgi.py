@@ -0,0 +1,172 @@
+"""
+ASGI entry point for SecurePass.
+Serves the same Flask app (routes, templates, sessions) from an ASGI server such as
+uvicorn. The event loop owns the sockets, so idle and keep-alive connections don't
+occupy a thread; each request's handler runs on a bounded thread pool, where waiting
+on SQLite, the KDF process pool or encryption blocks only that thread and never the
+loop. Emails are already sent by the outbox thread, outside any request.
+
+    gunicorn -w 2 -k uvicorn.workers.UvicornWorker asgi:application
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app
+
+ASGI_CONFIG = {
+    # Request handlers running at once per process; other requests wait on the event loop
+    'threads': int(os.environ.get('ASGI_THREADS', 32)),
+    'max_body_bytes': int(os.environ.get('ASGI_MAX_BODY_BYTES', 32 * 1024 * 1024)),
+    # Request bodies larger than this are spooled to a temporary file instead of memory
+    'spool_bytes': int(os.environ.get('ASGI_SPOOL_BYTES', 1024 * 1024)),
+}
+
+
+class WSGIBridge:
+    """
+    ASGI application that runs a WSGI application on a thread pool.
+
+    Args:
+        wsgi_app (callable): The WSGI application
+        threads (int): Size of the handler thread pool
+        max_body_bytes (int): Larger request bodies get 413 without reaching the app
+    """
+
+    def __init__(self, wsgi_app, threads=None, max_body_bytes=None):
+        self.wsgi_app = wsgi_app
+        self.max_body_bytes = max_body_bytes or ASGI_CONFIG['max_body_bytes']
+        # Threads start on first use, so a server that forks after import gets its own
+        self.executor = ThreadPoolExecutor(max_workers=threads or ASGI_CONFIG['threads'], thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive):
+        """Read the whole request body; returns (file, length), or None if it is too large or the client left"""
+        body = tempfile.SpooledTemporaryFile(max_size=ASGI_CONFIG['spool_bytes'])
+        length = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            chunk = message.get('body', b'')
+            length += len(chunk)
+            if length > self.max_body_bytes:
+                body.close()
+                return None
+            body.write(chunk)
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body, length
+
+    async def _http(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        read = await self._read_body(receive)
+        if read is None:
+            await send({'type': 'http.response.start', 'status': 413,
+                        'headers': [(b'content-type', b'text/plain'), (b'connection', b'close')]})
+            await send({'type': 'http.response.body', 'body': b'Request body too large'})
+            return
+        body, length = read
+
+        # Stop producing a streamed response (e.g. an export) once the client has gone
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        watcher = loop.create_task(watch_disconnect())
+        response = {}
+        written = []
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            return written.append
+
+        iterable = None
+        try:
+            iterable = await loop.run_in_executor(self.executor, self.wsgi_app, _environ(scope, body, length), start_response)
+            iterator = iter(iterable)
+            # The first chunk is produced before the headers go out, since generators may
+            # only call start_response once they start running
+            chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+            await send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+            for data in written:
+                await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+            while chunk is not None and not disconnected.is_set():
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            watcher.cancel()
+            await asyncio.gather(watcher, return_exceptions=True)
+            if hasattr(iterable, 'close'):
+                await loop.run_in_executor(self.executor, iterable.close)
+            body.close()
+
+
+def _environ(scope, body, length):
+    """Build a WSGI environ from an ASGI HTTP scope"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for name, value in scope.get('headers', []):
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-length':
+            continue
+        key = 'CONTENT_TYPE' if name == 'content-type' else 'HTTP_' + name.upper().replace('-', '_')
+        # Repeated headers become one comma-separated value, as in WSGI servers (cookies use '; ')
+        if key in environ:
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+
+app = create_app()
+application = WSGIBridge(app)
+
+if __name__ == "__main__":
+    # For local development: python asgi.py
+    import uvicorn
+    uvicorn.run(application, host='127.0.0.1', port=int(os.environ.get('PORT', 8000)))
@@ -0,0 +1,352 @@
+"""
+Static asset pipeline for SecurePass.
+`python manage.py build-assets` minifies the stylesheet and script, copies the favicons,
+and writes each under a name containing a hash of its content, next to gzip (and, if the
+brotli module is installed, brotli) compressed copies. A manifest maps source names to
+the built files; templates link through asset_url(), so a deploy that changes a file
+changes its URL and the old one can be cached forever. The files of the last few builds
+are kept, so pages rendered before a deploy still find theirs. Without a manifest (local
+development) asset_url() links the source files directly.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+ASSET_CONFIG = {
+    # Built files go in a subdirectory of static/ so the static route serves them
+    'output_dir': os.environ.get('ASSET_OUTPUT_DIR', 'dist'),
+    # Seconds browsers may cache hashed files; their URLs change whenever their content does
+    'max_age': int(os.environ.get('ASSET_MAX_AGE', 365 * 24 * 3600)),
+    # Seconds between checks of the manifest's mtime; a rebuild is picked up within this
+    'check_interval': float(os.environ.get('ASSET_CHECK_INTERVAL', 2.0)),
+    # Builds whose files survive a rebuild; workers and cached pages may still link them
+    'keep_builds': int(os.environ.get('ASSET_KEEP_BUILDS', 3)),
+}
+
+MANIFEST_NAME = 'manifest.json'
+# The hashed files of each kept build, oldest first
+HISTORY_NAME = 'builds.json'
+HASH_LENGTH = 12
+# Smaller files aren't worth compressing; the headers would outweigh the savings
+MIN_COMPRESS_BYTES = 256
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'image/svg+xml', 'image/x-icon',
+                      'image/vnd.microsoft.icon', 'application/json')
+
+# Precompressed variants, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+# --- Minifiers ---
+
+_CSS_TOKEN = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+
+
+def minify_css(source):
+    """Strip comments and insignificant whitespace from a stylesheet"""
+    out = []
+    code = []
+    position = 0
+    for match in _CSS_TOKEN.finditer(source):
+        code.append(source[position:match.start()])
+        position = match.end()
+        if match.group(1) is None:
+            # A comment separates tokens like whitespace does
+            code.append(' ')
+            continue
+        # Strings are kept verbatim
+        out.append(_squeeze_css(''.join(code)))
+        out.append(match.group(1))
+        code = []
+    code.append(source[position:])
+    out.append(_squeeze_css(''.join(code)))
+    return ''.join(out).strip() + '\n'
+
+
+def _squeeze_css(css):
+    css = re.sub(r'\s+', ' ', css)
+    # Spaces around these never matter; ':' only after it, since "a :hover" differs from "a:hover"
+    css = re.sub(r' ?([{};,>]) ?', r'\1', css)
+    css = re.sub(r': ', ':', css)
+    return css.replace(';}', '}')
+
+
+_JS_TOKEN = re.compile(r'''
+    (?P<space>[ \t\f\v\r]+)
+  | (?P<newline>\n)
+  | (?P<line_comment>//[^\n]*)
+  | (?P<block_comment>/\*.*?\*/)
+  | (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)
+  | (?P<word>[A-Za-z0-9_$]+)
+  | (?P<punct>.)
+''', re.S | re.X)
+_JS_REGEX = re.compile(r'/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[A-Za-z]*')
+# A '/' after one of these starts a regular expression literal rather than a division
+_REGEX_AFTER_PUNCT = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_AFTER_WORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw'}
+# A line break after one of these can't end a statement, so dropping it is safe
+_JOINS_NEXT_LINE = set('{([,;')
+
+
+def _is_word(char):
+    return char.isalnum() or char in '_$'
+
+
+def minify_js(source):
+    """
+    Strip comments, indentation and blank lines from a script
+
+    Line breaks that could end a statement are kept, so code relying on automatic
+    semicolon insertion still parses the same way. Template literals are kept verbatim
+    and must not nest other template literals inside ${...}.
+    """
+    out = []
+    previous = ''  # last token written, ignoring whitespace
+    pending = ''   # whitespace seen since then: '', ' ' or '\n'
+    position = 0
+    while position < len(source):
+        if source[position] == '/' and source[position + 1:position + 2] not in ('/', '*') and (
+                not previous or previous in _REGEX_AFTER_WORDS
+                or (not _is_word(previous[-1]) and previous[-1] in _REGEX_AFTER_PUNCT)):
+            match = _JS_REGEX.match(source, position)
+            if match:
+                kind, token = 'regex', match.group()
+            else:
+                match = _JS_TOKEN.match(source, position)
+                kind, token = match.lastgroup, match.group()
+        else:
+            match = _JS_TOKEN.match(source, position)
+            kind, token = match.lastgroup, match.group()
+        position = match.end()
+
+        if kind in ('space', 'line_comment'):
+            pending = pending or ' '
+            continue
+        if kind == 'newline' or (kind == 'block_comment' and '\n' in token):
+            pending = '\n'
+            continue
+        if kind == 'block_comment':
+            pending = pending or ' '
+            continue
+
+        if previous and pending:
+            if pending == '\n' and previous[-1] not in _JOINS_NEXT_LINE:
+                out.append('\n')
+            elif _is_word(previous[-1]) and _is_word(token[0]):
+                out.append(' ')
+            elif previous[-1] in '+-' and token[0] == previous[-1]:
+                # "a - -b" must not become "a--b"
+                out.append(' ')
+        out.append(token)
+        previous = token
+        pending = ''
+    return ''.join(out) + '\n'
+
+
+# Source files under static/ and how each is transformed before hashing
+ASSETS = {
+    'css/style.css': minify_css,
+    'js/main.js': minify_js,
+    'images/favicon.svg': None,
+    'images/favicon.ico': None,
+}
+
+
+# --- Build ---
+
+def _compressible(name):
+    mimetype = mimetypes.guess_type(name)[0] or ''
+    return mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def _write(path, data):
+    """Write a built file unless an identical one (same hashed name) already exists"""
+    if os.path.exists(path):
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _read_history(build_dir):
+    try:
+        with open(os.path.join(build_dir, HISTORY_NAME)) as f:
+            history = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return []
+    return [build for build in history if isinstance(build, list)] if isinstance(history, list) else []
+
+
+def _base_name(filename):
+    """The hashed file a precompressed variant belongs to"""
+    for _, suffix in ENCODINGS:
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+def build_assets(static_dir=None, output_dir=None, prune=True, keep_builds=None):
+    """
+    Build hashed, precompressed copies of every asset and write the manifest
+
+    Args:
+        static_dir (str): The static folder (default: static/ next to this module)
+        output_dir (str): Subdirectory of static_dir to build into (default: ASSET_OUTPUT_DIR)
+        prune (bool): Remove files no kept build references
+        keep_builds (int): Builds whose files pruning keeps, this one included
+            (default: ASSET_KEEP_BUILDS)
+
+    Returns:
+        tuple: (manifest, sizes) where sizes maps each asset to its source, built and
+            compressed sizes in bytes
+    """
+    static_dir = static_dir or STATIC_DIR
+    output_dir = output_dir or ASSET_CONFIG['output_dir']
+    keep_builds = max(1, keep_builds if keep_builds is not None else ASSET_CONFIG['keep_builds'])
+    build_dir = os.path.join(static_dir, output_dir)
+    os.makedirs(build_dir, exist_ok=True)
+
+    manifest = {}
+    sizes = {}
+    built = []
+    for name, transform in ASSETS.items():
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            data = f.read()
+        source_size = len(data)
+        if transform is not None:
+            data = transform(data.decode('utf-8')).encode('utf-8')
+
+        stem, ext = os.path.splitext(os.path.basename(name))
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        filename = f"{stem}.{digest}{ext}"
+        _write(os.path.join(build_dir, filename), data)
+        built.append(filename)
+        manifest[name] = f"{output_dir}/{filename}"
+        sizes[name] = {'source': source_size, 'built': len(data)}
+
+        if len(data) < MIN_COMPRESS_BYTES or not _compressible(name):
+            continue
+        # mtime=0 keeps gzip output identical across builds of the same content
+        variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(data, quality=11)
+        for encoding, suffix in ENCODINGS:
+            compressed = variants.get(encoding)
+            # A variant that isn't smaller is left out; the plain file is served instead
+            if compressed is None or len(compressed) >= len(data):
+                continue
+            _write(os.path.join(build_dir, filename + suffix), compressed)
+            sizes[name][encoding] = len(compressed)
+
+    # Rebuilding unchanged sources doesn't push an older build out
+    history = [build for build in _read_history(build_dir) if sorted(build) != sorted(built)]
+    history = (history + [built])[-keep_builds:]
+    # The history goes first: a worker that sees the new manifest must also see its files listed
+    _write_json(os.path.join(build_dir, HISTORY_NAME), history)
+    _write_json(os.path.join(build_dir, MANIFEST_NAME), manifest)
+
+    if prune:
+        kept = {filename for build in history for filename in build}
+        for filename in os.listdir(build_dir):
+            if filename in (MANIFEST_NAME, HISTORY_NAME) or _base_name(filename) in kept:
+                continue
+            os.remove(os.path.join(build_dir, filename))
+    return manifest, sizes
+
+
+# --- Runtime ---
+
+class AssetManifest:
+    def __init__(self, static_dir=None, output_dir=None, check_interval=None):
+        self.static_dir = static_dir or STATIC_DIR
+        self.output_dir = output_dir or ASSET_CONFIG['output_dir']
+        self.path = os.path.join(self.static_dir, self.output_dir, MANIFEST_NAME)
+        self.check_interval = check_interval if check_interval is not None else ASSET_CONFIG['check_interval']
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._next_check = 0.0
+        self._mtime = None
+        self._entries = {}
+        self._built = frozenset()
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        with self._lock:
+            if self._loaded and mtime == self._mtime:
+                return
+            entries = {}
+            if mtime is not None:
+                try:
+                    with open(self.path) as f:
+                        entries = json.load(f)
+                except ValueError:
+                    print(f"Asset manifest {self.path} is not valid JSON; serving unbuilt assets")
+            # Files of earlier kept builds are still served as immutable
+            history = _read_history(os.path.dirname(self.path)) if mtime is not None else []
+            built = {f"{self.output_dir}/{filename}" for build in history for filename in build}
+            self._entries = entries
+            self._built = frozenset(built.union(entries.values()))
+            self._mtime = mtime
+            self._loaded = True
+
+    def _current(self):
+        # Stat the manifest at most every check_interval, so a rebuild reaches every worker
+        now = time.monotonic()
+        if not self._loaded or now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self._load()
+        return self._entries
+
+    def resolve(self, name):
+        """Path under static/ to link for a source asset name"""
+        return self._current().get(name, name)
+
+    def is_built(self, filename):
+        """True if filename (relative to static/) is a hashed file from a kept build"""
+        self._current()
+        return filename in self._built
+
+
+def precompressed_variant(static_dir, filename, accepted):
+    """
+    Pick the precompressed copy of a built file that the client accepts
+
+    Args:
+        static_dir (str): The static folder
+        filename (str): Built file relative to static_dir
+        accepted (callable): Returns the client's quality value for an encoding name
+
+    Returns:
+        tuple: (filename to send, Content-Encoding or None)
+    """
+    for encoding, suffix in ENCODINGS:
+        if accepted(encoding) and os.path.exists(os.path.join(static_dir, filename + suffix)):
+            return filename + suffix, encoding
+    return filename, None
+
+
+# Manifest shared by the app
+asset_manifest = AssetManifest()
@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for SecurePass.
+
+Run everything against a throwaway database and compare with the stored baseline:
+    python -m benchmarks.run --compare benchmarks/baseline.json
+"""
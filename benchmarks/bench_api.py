@@ -0,0 +1,89 @@
+"""
+In-process benchmarks of every Flask route through the test client.
+"""
+
+from datetime import datetime, timedelta
+
+import database
+
+from benchmarks.harness import Suite
+from benchmarks.synthetic import MASTER_PASSWORD, username_for
+
+
+def _check(response, *expected):
+    if response.status_code not in expected:
+        raise RuntimeError(f"{response.request.method} {response.request.path} -> {response.status_code}")
+    return response
+
+
+def run(dataset, scale=1.0):
+    import app as app_module
+
+    suite = Suite('api', scale)
+    app = app_module.create_app()
+    username = username_for(1)
+    user = database.get_user_by_username(username, use_cache=False)
+
+    anonymous = app.test_client()
+    for path in ['/', '/login', '/register', '/forgot_password', '/use_recovery_key', '/health']:
+        suite.bench(f"GET {path}", lambda i, path=path: _check(anonymous.get(path), 200), 300)
+    login_etag = anonymous.get('/login').headers['ETag']
+    suite.bench('GET /login (304)', lambda i: _check(anonymous.get('/login', headers={'If-None-Match': login_etag}), 304), 300)
+
+    # KDF-bound routes
+    suite.bench('POST /login', lambda i: _check(anonymous.post('/login', data={
+        'username': username, 'master_password': MASTER_PASSWORD}), 302), 20)
+    suite.bench('POST /register', lambda i: _check(anonymous.post('/register', data={
+        'username': f"bench-new-{i}-{datetime.now().timestamp()}", 'email': f"new-{i}-{datetime.now().timestamp()}@example.com",
+        'master_password': MASTER_PASSWORD, 'confirm_password': MASTER_PASSWORD}), 302), 20)
+    suite.bench('POST /forgot_password', lambda i: _check(anonymous.post('/forgot_password', data={
+        'username': username}), 200), 100)
+
+    token = 'bench-reset-token'
+    database.create_reset_token(user['id'], token, datetime.now() + timedelta(hours=1))
+    suite.bench('GET /reset_password/<token>', lambda i: _check(anonymous.get(f"/reset_password/{token}"), 200), 300)
+
+    client = app.test_client()
+    _check(client.post('/login', data={'username': username, 'master_password': MASTER_PASSWORD}), 302)
+    suite.bench('GET /dashboard', lambda i: _check(client.get('/dashboard'), 200), 300)
+    suite.bench('GET /api/passwords', lambda i: _check(client.get('/api/passwords'), 200), 100)
+    suite.bench('GET /api/passwords?limit=50', lambda i: _check(client.get('/api/passwords?limit=50'), 200), 300)
+    etag = client.get('/api/passwords').headers['ETag']
+    suite.bench('GET /api/passwords (304)', lambda i: _check(client.get('/api/passwords', headers={'If-None-Match': etag}), 304), 300)
+    revision = client.get('/api/sync').get_json()['revision']
+    suite.bench('GET /api/sync (full)', lambda i: _check(client.get('/api/sync'), 200), 100)
+    suite.bench('GET /api/sync (no changes)', lambda i: _check(client.get(f'/api/sync?since={revision}'), 200), 300)
+    suite.bench('GET /api/passwords/search', lambda i: _check(client.get('/api/passwords/search?q=git'), 200), 300)
+    suite.bench('GET /api/vault/health', lambda i: _check(client.get('/api/vault/health'), 200), 300)
+
+    suite.bench('POST /api/vault/unlock', lambda i: _check(client.post('/api/vault/unlock', json={
+        'master_password': MASTER_PASSWORD}), 200), 20)
+    ids = [row['id'] for row in database.get_password_page(user['id'], limit=100)]
+    suite.bench('POST /api/passwords (unlocked)', lambda i: _check(client.post('/api/passwords', json={
+        'site_name': f"bench {i}", 'site_url': 'https://example.com', 'site_username': 'me', 'site_password': 'pw'}), 200), 300)
+    suite.bench('POST /api/passwords/<id>/decrypt (unlocked)', lambda i: _check(client.post(
+        f"/api/passwords/{ids[i % len(ids)]}/decrypt", json={}), 200), 300)
+    suite.bench('POST /api/passwords/decrypt (100 ids)', lambda i: _check(client.post(
+        '/api/passwords/decrypt', json={'ids': ids}), 200), 100)
+    suite.bench('POST /api/generate-password', lambda i: _check(client.post('/api/generate-password', json={'length': 16}), 200), 300)
+    suite.bench('POST /api/generate-password (1000)', lambda i: _check(client.post('/api/generate-password', json={
+        'length': 16, 'count': 1000}), 200), 50)
+    suite.bench('POST /api/generate-password (passphrase)', lambda i: _check(client.post('/api/generate-password', json={
+        'mode': 'passphrase', 'words': 6}), 200), 300)
+    suite.bench('POST /generate_recovery_key', lambda i: _check(client.post('/generate_recovery_key'), 200), 300)
+
+    # Locked vault: every call pays for the master password check
+    locked = app.test_client()
+    _check(locked.post('/login', data={'username': username, 'master_password': MASTER_PASSWORD}), 302)
+    def decrypt_locked(i):
+        _check(locked.post('/api/vault/lock'), 200)
+        _check(locked.post(f"/api/passwords/{ids[i % len(ids)]}/decrypt", json={'master_password': MASTER_PASSWORD}), 200)
+    suite.bench('POST /api/passwords/<id>/decrypt (locked)', decrypt_locked, 20)
+
+    recovery_key = client.post('/generate_recovery_key').get_json()['recovery_key']
+    recovery = app.test_client()
+    suite.bench('POST /use_recovery_key', lambda i: _check(recovery.post('/use_recovery_key', data={
+        'username': username, 'recovery_key': recovery_key}), 302), 300)
+    suite.bench('GET /recovery_reset_password', lambda i: _check(recovery.get('/recovery_reset_password'), 200), 300)
+    suite.bench('GET /logout', lambda i: _check(app.test_client().get('/logout'), 302), 300)
+    return suite.results
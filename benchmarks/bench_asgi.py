@@ -0,0 +1,68 @@
+"""
+In-process benchmarks of the ASGI entry point against the WSGI (test client) path.
+
+Requests are fed straight into asgi.application, so the numbers cover the bridge and
+its thread pool but not a real server's socket handling.
+"""
+
+import asyncio
+
+from benchmarks.harness import Suite
+
+CONCURRENCY = 100
+
+
+def _scope(method, path):
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+        'scheme': 'http', 'path': path, 'root_path': '', 'query_string': b'', 'headers': [],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+
+
+async def _request(application, method, path):
+    pending = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    status = []
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        # The client never disconnects
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(_scope(method, path), receive, send)
+    if status != [200]:
+        raise RuntimeError(f"ASGI {method} {path} -> {status}")
+
+
+def run(dataset, scale=1.0):
+    import asgi
+
+    suite = Suite('asgi', scale)
+    client = asgi.app.test_client()
+    application = asgi.application
+    loop = asyncio.new_event_loop()
+
+    async def batch(path):
+        await asyncio.gather(*[_request(application, 'GET', path) for _ in range(CONCURRENCY)])
+
+    def concurrent(path):
+        loop.run_until_complete(batch(path))
+
+    def sequential_wsgi(path):
+        for _ in range(CONCURRENCY):
+            if client.get(path).status_code != 200:
+                raise RuntimeError(f"WSGI GET {path} failed")
+
+    try:
+        for path in ['/login', '/health']:
+            suite.bench(f"GET {path}", lambda i, path=path: loop.run_until_complete(_request(application, 'GET', path)), 300)
+            suite.bench(f"GET {path} x{CONCURRENCY} concurrent", lambda i, path=path: concurrent(path), 20)
+            suite.bench(f"GET {path} x{CONCURRENCY} sequential (WSGI)", lambda i, path=path: sequential_wsgi(path), 20)
+    finally:
+        loop.close()
+    return suite.results
@@ -0,0 +1,53 @@
+"""
+Microbenchmarks for encryption_helper.
+"""
+
+import hashlib
+import os
+import tempfile
+
+import password_hashing
+from breach_check import BreachIndex, build_index
+from encryption_helper import PasswordEncryption
+
+from benchmarks.harness import Suite
+
+
+def run(scale=1.0):
+    suite = Suite('crypto', scale)
+    encryptor = PasswordEncryption()
+    master_password = 'benchmark-master-password'
+    salt = encryptor.generate_salt()
+
+    suite.bench('derive_key', lambda i: encryptor.derive_key(master_password, salt), 20)
+
+    # Legacy per-entry-salt format: one KDF run per call
+    legacy = encryptor.encrypt_password('secret-value', master_password)
+    suite.bench('encrypt_password', lambda i: encryptor.encrypt_password('secret-value', master_password), 20)
+    suite.bench('decrypt_password', lambda i: encryptor.decrypt_password(legacy, master_password), 20)
+
+    stored_hash = encryptor.hash_master_password(master_password)
+    suite.bench('verify_master_password', lambda i: encryptor.verify_master_password(master_password, stored_hash), 20)
+    scrypt_hash = password_hashing.hash_password(master_password, 'scrypt')
+    suite.bench('verify_master_password (scrypt)', lambda i: encryptor.verify_master_password(master_password, scrypt_hash), 20)
+
+    # Vault-key format: no KDF per entry
+    vault_key = encryptor.generate_vault_key()
+    wrapped = encryptor.wrap_vault_key(vault_key, master_password)
+    associated_data = encryptor.entry_associated_data(1)
+    entry = encryptor.encrypt_entry('secret-value', vault_key, associated_data)
+    suite.bench('unwrap_vault_key', lambda i: encryptor.unwrap_vault_key(wrapped, master_password), 20)
+    suite.bench('encrypt_entry', lambda i: encryptor.encrypt_entry('secret-value', vault_key, associated_data), 2000)
+    suite.bench('decrypt_entry', lambda i: encryptor.decrypt_entry(entry, vault_key, associated_data), 2000)
+
+    # Breached-password lookups against a 1M-record index
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, 'hashes.txt')
+        with open(source, 'w') as f:
+            for digest in sorted(hashlib.sha1(f"breached-{n}".encode()).hexdigest().upper() for n in range(1000000)):
+                f.write(f"{digest}:1\n")
+        index = BreachIndex(os.path.join(workdir, 'breached.idx'))
+        build_index(source, index.path)
+        suite.bench('breach_lookup_hit', lambda i: index.lookup(f"breached-{i}"), 20000)
+        suite.bench('breach_lookup_miss', lambda i: index.lookup(f"not-breached-{i}"), 20000)
+    return suite.results
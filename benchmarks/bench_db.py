@@ -0,0 +1,65 @@
+"""
+Microbenchmarks for every database.py operation, run against a synthetic dataset.
+"""
+
+import json
+import time
+from datetime import datetime, timedelta
+
+import database
+
+from benchmarks.harness import Suite
+from benchmarks.synthetic import username_for
+
+
+def run(dataset, scale=1.0):
+    suite = Suite('db', scale)
+    users = dataset['users']
+    usernames = [username_for(i + 1) for i in range(users)]
+    hot = min(50, users)
+    user_ids = [database.get_user_by_username(name, use_cache=False)['id'] for name in usernames[:hot]]
+    heaviest = max(user_ids, key=lambda uid: len(database.get_password_page(uid)))
+    some_ids = [row['id'] for row in database.get_password_page(heaviest, limit=100)]
+
+    suite.bench('get_user_by_username', lambda i: database.get_user_by_username(usernames[i % users], use_cache=False), 2000)
+    suite.bench('get_user_by_username_cached', lambda i: database.get_user_by_username(usernames[i % hot]), 2000)
+    suite.bench('get_user_by_email', lambda i: database.get_user_by_email(f"{usernames[i % users]}@example.com", use_cache=False), 2000)
+    suite.bench('get_user_by_id', lambda i: database.get_user_by_id(user_ids[i % len(user_ids)], use_cache=False), 2000)
+    suite.bench('get_passwords_by_user_id', lambda i: database.get_passwords_by_user_id(heaviest), 50)
+    suite.bench('get_password_page_50', lambda i: database.get_password_page(heaviest, limit=50), 500)
+    suite.bench('get_vault_revision', lambda i: database.get_vault_revision(heaviest), 2000)
+    latest = database.get_vault_revision(heaviest)
+    suite.bench('get_vault_changes_full', lambda i: database.get_vault_changes(heaviest, 0), 50)
+    suite.bench('get_vault_changes_last_10', lambda i: database.get_vault_changes(heaviest, max(1, latest - 10)), 2000)
+    suite.bench('get_password_by_id', lambda i: database.get_password_by_id(some_ids[i % len(some_ids)], heaviest), 2000)
+    suite.bench('get_encrypted_passwords_100', lambda i: database.get_encrypted_passwords(heaviest, some_ids), 200)
+    suite.bench('search_passwords', lambda i: database.search_passwords(heaviest, ['git']), 500)
+    suite.bench('get_vault_key', lambda i: database.get_vault_key(user_ids[i % len(user_ids)]), 2000)
+    suite.bench('get_reused_passwords', lambda i: database.get_reused_passwords(heaviest), 500)
+    suite.bench('get_password_strength_counts', lambda i: database.get_password_strength_counts(heaviest), 500)
+    suite.bench('get_password_age_counts', lambda i: database.get_password_age_counts(heaviest, [90, 365, 730]), 500)
+
+    # Writes go to a dedicated user so the dataset itself stays untouched
+    bench_user = database.create_user('bench-writer', 'bench-writer@example.com', 'x:y')
+    added = []
+    suite.bench('add_password', lambda i: added.append(
+        database.add_password(bench_user, f"site {i}", 'https://example.com', 'me', json.dumps({'v': 2}), 2)), 500)
+    suite.bench('update_user_password', lambda i: database.update_user_password(bench_user, f"x:{i}"), 500)
+    suite.bench('delete_password', lambda i: database.delete_password(added[i % len(added)], bench_user), 500)
+
+    expiry = datetime.now() + timedelta(hours=1)
+    tokens = []
+    suite.bench('create_reset_token', lambda i: tokens.append(
+        database.create_reset_token(bench_user, f"bench-token-{len(tokens)}", expiry)), 500)
+    suite.bench('get_reset_token', lambda i: database.get_reset_token(f"bench-token-{i % len(tokens)}"), 2000)
+    suite.bench('mark_token_as_used', lambda i: database.mark_token_as_used(tokens[i % len(tokens)]), 500)
+    suite.bench('cleanup_expired_tokens', lambda i: database.cleanup_expired_tokens(), 50)
+    suite.bench('purge_reset_tokens_500', lambda i: database.purge_reset_tokens(datetime.now(), 500), 50)
+
+    suite.bench('create_recovery_key', lambda i: database.create_recovery_key(bench_user, f"hash-{i}"), 500)
+    suite.bench('get_recovery_key_by_user_id', lambda i: database.get_recovery_key_by_user_id(bench_user), 2000)
+    suite.bench('verify_recovery_key', lambda i: database.verify_recovery_key(bench_user, 'hash-0'), 2000)
+    suite.bench('take_rate_limit_tokens', lambda i: database.take_rate_limit_tokens(
+        [(f"bench:ip:{i % 100}", 1e9, 1e9), ('bench:global', 1e9, 1e9)], time.time()), 2000)
+    suite.bench('enqueue_email', lambda i: database.enqueue_email('bench@example.com', 'Bench', 'body'), 500)
+    return suite.results
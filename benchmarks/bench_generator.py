@@ -0,0 +1,20 @@
+"""
+Throughput benchmarks for password_generator.
+"""
+
+from password_generator import DEFAULT_CLASSES, generate_passwords, generate_passphrases
+
+from benchmarks.harness import Suite
+
+
+def run(scale=1.0):
+    suite = Suite('generator', scale)
+    suite.bench('password_16', lambda i: generate_passwords(16), 5000)
+    suite.bench('password_16_x1000', lambda i: generate_passwords(16, 1000), 200)
+    suite.bench('password_256_x1000', lambda i: generate_passwords(256, 1000), 20)
+    # Short passwords that must hit every class are rejected and redrawn most often
+    suite.bench('password_8_policy_x1000', lambda i: generate_passwords(
+        8, 1000, require=DEFAULT_CLASSES, exclude_ambiguous=True), 100)
+    suite.bench('passphrase_6', lambda i: generate_passphrases(6), 5000)
+    suite.bench('passphrase_6_x1000', lambda i: generate_passphrases(6, 1000), 200)
+    return suite.results
@@ -0,0 +1,29 @@
+"""
+Worker startup benchmarks: a fresh interpreter importing the app and running create_app().
+
+Each iteration spawns a new Python process against the already migrated benchmark
+database, so the numbers cover the imports, the schema version check and starting the
+background threads, as a worker booting during a scale-out pays them.
+"""
+
+import os
+import subprocess
+import sys
+
+from benchmarks.harness import Suite
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _python(code):
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=dict(os.environ, MAINTENANCE_ENABLED='false'),
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def run(dataset, scale=1.0):
+    suite = Suite('startup', scale)
+    suite.bench('python (baseline)', lambda i: _python('pass'), 10, warmup=1)
+    suite.bench('import app', lambda i: _python('import app'), 10, warmup=1)
+    suite.bench('import app + create_app()', lambda i: _python('import app; app.create_app()'), 10, warmup=1)
+    suite.bench('import wsgi', lambda i: _python('import wsgi'), 10, warmup=1)
+    return suite.results
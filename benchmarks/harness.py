@@ -0,0 +1,117 @@
+"""
+Timing and reporting helpers shared by the benchmark suites.
+"""
+
+import json
+import platform
+import statistics
+import time
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(fraction * len(sorted_samples) + 0.5)) - 1))
+    return sorted_samples[index]
+
+
+def measure(fn, iterations, warmup=None):
+    """
+    Time repeated calls of fn
+
+    Args:
+        fn (callable): Called with the iteration number
+        iterations (int): Timed calls
+        warmup (int): Untimed calls first (defaults to a tenth of iterations)
+
+    Returns:
+        dict: Latency summary in milliseconds plus throughput
+    """
+    warmup = warmup if warmup is not None else max(1, iterations // 10)
+    for i in range(warmup):
+        fn(i)
+
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        fn(warmup + i)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    samples.sort()
+    total_seconds = sum(samples) / 1000.0
+    return {
+        'iterations': iterations,
+        'mean_ms': statistics.fmean(samples),
+        'p50_ms': percentile(samples, 0.50),
+        'p95_ms': percentile(samples, 0.95),
+        'p99_ms': percentile(samples, 0.99),
+        'max_ms': samples[-1],
+        'ops_per_sec': iterations / total_seconds if total_seconds else 0.0,
+    }
+
+
+class Suite:
+    """A named group of benchmark results"""
+
+    def __init__(self, name, scale=1.0):
+        self.name = name
+        self.scale = scale
+        self.results = {}
+
+    def bench(self, name, fn, iterations, warmup=None):
+        """Measure fn and record it under suite.name"""
+        iterations = max(3, int(iterations * self.scale))
+        result = measure(fn, iterations, warmup)
+        self.results[f"{self.name}.{name}"] = result
+        print(f"  {self.name}.{name:<48} p50 {result['p50_ms']:9.3f} ms   p95 {result['p95_ms']:9.3f} ms   "
+              f"p99 {result['p99_ms']:9.3f} ms")
+        return result
+
+
+def environment():
+    """Describe the host, so results from different machines aren't compared blindly"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def write_results(path, results):
+    """Write results as JSON"""
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+
+
+def compare(results, baseline_path, threshold, metric='p95_ms', min_delta_ms=0.05):
+    """
+    Compare results against a stored baseline
+
+    Args:
+        results (dict): Benchmark name -> summary from this run
+        baseline_path (str): JSON file written by write_results
+        threshold (float): Allowed relative slowdown, e.g. 0.25 for 25%
+        metric (str): Summary field to compare
+        min_delta_ms (float): Ignore slowdowns smaller than this, which are timer noise for microsecond operations
+
+    Returns:
+        list: Names of benchmarks that regressed beyond the threshold
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    print(f"\nComparison with {baseline_path} ({metric}, threshold {threshold:.0%}):")
+    for name in sorted(results):
+        if name not in baseline:
+            print(f"  {name:<50} (new)")
+            continue
+        before, after = baseline[name][metric], results[name][metric]
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        if change > threshold and after - before > min_delta_ms:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"  {name:<50} {before:9.3f} -> {after:9.3f} ms ({change:+.0%}){flag}")
+    return regressions
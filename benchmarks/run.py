@@ -0,0 +1,92 @@
+"""
+Benchmark runner for SecurePass.
+
+Builds a synthetic database in a temporary directory, runs the selected suites and
+writes p50/p95/p99 latencies as JSON. With --compare the run fails (exit code 1)
+when any benchmark's p95 is slower than the baseline by more than --threshold.
+
+Usage:
+    python -m benchmarks.run --output bench_results.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.25
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+SUITES = ['crypto', 'generator', 'db', 'api', 'asgi', 'startup']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run SecurePass benchmarks")
+    parser.add_argument('--suite', action='append', choices=SUITES, help="Suite to run (repeatable, default: all)")
+    parser.add_argument('--users', type=int, default=200, help="Synthetic users")
+    parser.add_argument('--entries', type=int, default=20000, help="Synthetic vault entries")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply iteration counts")
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--compare', metavar='BASELINE', help="Compare with a baseline JSON")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed p95 slowdown before failing")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help="Ignore slowdowns smaller than this")
+    parser.add_argument('--save-baseline', metavar='PATH', help="Write results as the new baseline")
+    args = parser.parse_args()
+    suites = args.suite or SUITES
+
+    # Everything runs against a throwaway database; the environment must be set
+    # before the app modules are imported
+    workdir = tempfile.mkdtemp(prefix='securepass-bench-')
+    os.environ['DATABASE_PATH'] = os.path.join(workdir, 'bench.db')
+    os.environ.setdefault('SMTP_SERVER', 'localhost')
+    os.environ.setdefault('SMTP_PORT', '1')
+    os.environ.setdefault('EMAIL_USE_TLS', 'False')
+    # The API suite replays logins and unlocks far faster than the limits allow;
+    # the limiter's own cost is covered by the db suite
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'False')
+
+    from benchmarks import harness, synthetic
+
+    print(f"Generating {args.users} users / {args.entries} entries in {workdir}")
+    dataset = synthetic.generate(os.environ['DATABASE_PATH'], args.users, args.entries)
+    print(f"  done in {dataset['seconds']:.1f}s")
+
+    results = {}
+    if 'crypto' in suites:
+        from benchmarks import bench_crypto
+        print("crypto:")
+        results.update(bench_crypto.run(args.scale))
+    if 'generator' in suites:
+        from benchmarks import bench_generator
+        print("generator:")
+        results.update(bench_generator.run(args.scale))
+    if 'db' in suites:
+        from benchmarks import bench_db
+        print("db:")
+        results.update(bench_db.run(dataset, args.scale))
+    if 'api' in suites:
+        from benchmarks import bench_api
+        print("api:")
+        results.update(bench_api.run(dataset, args.scale))
+    if 'asgi' in suites:
+        from benchmarks import bench_asgi
+        print("asgi:")
+        results.update(bench_asgi.run(dataset, args.scale))
+    if 'startup' in suites:
+        from benchmarks import bench_startup
+        print("startup:")
+        results.update(bench_startup.run(dataset, args.scale))
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        harness.write_results(path, results)
+        print(f"Results written to {path}")
+
+    if args.compare:
+        regressions = harness.compare(results, args.compare, args.threshold, min_delta_ms=args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Synthetic data generator for SecurePass benchmarks.
+
+Builds a database with realistic shapes: many users, a skewed number of vault entries
+per user, real password hashes, wrapped vault keys and AES-GCM encrypted entries.
+Every user shares the master password below so benchmarks can log in as anyone.
+
+Usage:
+    python -m benchmarks.synthetic --users 10000 --entries 1000000 --output data/bench.db
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+MASTER_PASSWORD = 'benchmark-master-password'
+SITES = ['github', 'gitlab', 'google', 'amazon', 'netflix', 'spotify', 'dropbox', 'slack',
+         'twitter', 'reddit', 'paypal', 'stripe', 'linkedin', 'zoom', 'notion', 'figma']
+
+
+def username_for(index):
+    """Username of the nth synthetic user"""
+    return f"user{index:06d}"
+
+
+def generate(db_path, users, entries, seed=1234, batch_size=10000):
+    """
+    Create (or extend) a benchmark database
+
+    Args:
+        db_path (str): Database file to write
+        users (int): Number of users to create
+        entries (int): Total vault entries, spread over users with a long-tailed distribution
+        seed (int): Random seed so runs are reproducible
+        batch_size (int): Rows per executemany/commit
+
+    Returns:
+        dict: Counts and elapsed time
+    """
+    os.environ['DATABASE_PATH'] = db_path
+    import database
+    from encryption_helper import PasswordEncryption
+    from vault_health import describe_password
+
+    started = time.monotonic()
+    rng = random.Random(seed)
+    encryptor = PasswordEncryption()
+    database.init_db()
+
+    # One KDF run for the whole dataset: every user shares the hash and the wrapped vault key
+    password_hash = encryptor.hash_master_password(MASTER_PASSWORD)
+    vault_key = encryptor.generate_vault_key()
+    wrapped = encryptor.wrap_vault_key(vault_key, MASTER_PASSWORD)
+    fingerprint_key = encryptor.fingerprint_key(vault_key)
+
+    conn = _connect(db_path)
+    cursor = conn.cursor()
+
+    first_id = (cursor.execute('SELECT MAX(id) FROM users').fetchone()[0] or 0) + 1
+    for start in range(0, users, batch_size):
+        chunk = range(start, min(users, start + batch_size))
+        cursor.executemany(
+            'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
+            [(username_for(first_id + i), f"{username_for(first_id + i)}@example.com", password_hash) for i in chunk]
+        )
+        conn.commit()
+    user_ids = [row[0] for row in cursor.execute('SELECT id FROM users WHERE id >= ? ORDER BY id', (first_id,))]
+    # Place users the way create_user does (a no-op with the default single shard)
+    shard_of = {user_id: database.home_shard(user_id) for user_id in user_ids}
+    cursor.executemany('UPDATE users SET shard = ? WHERE id = ?',
+                       [(shard, user_id) for user_id, shard in shard_of.items() if shard])
+    conn.commit()
+
+    shards = {shard: _connect(database.shard_path(shard)) if shard else conn for shard in range(database.DB_SHARDS)}
+    for shard, shard_conn in shards.items():
+        shard_conn.executemany(
+            'INSERT OR IGNORE INTO vault_keys (user_id, kdf_salt, wrapped_key) VALUES (?, ?, ?)',
+            [(user_id, wrapped['salt'], wrapped['wrapped_key']) for user_id in user_ids if shard_of[user_id] == shard]
+        )
+        shard_conn.commit()
+    # Entry IDs continue from each shard's own range, as database.add_password would hand them out
+    next_ids = {
+        shard: max(shard * database.SHARD_ID_SPAN, shard_conn.execute(
+            'SELECT COALESCE(MAX(id), 0) FROM passwords WHERE id < ?', ((shard + 1) * database.SHARD_ID_SPAN,)
+        ).fetchone()[0]) + 1
+        for shard, shard_conn in shards.items()
+    }
+
+    # Long-tailed vault sizes: most users have a few dozen entries, a handful have thousands
+    weights = [rng.paretovariate(1.2) for _ in user_ids]
+    scale = entries / sum(weights) if weights else 0
+    counts = [int(w * scale) for w in weights]
+    for i in range(entries - sum(counts)):
+        counts[i % len(counts)] += 1
+
+    rows = {shard: [] for shard in shards}
+    written = 0
+    for user_id, count in zip(user_ids, counts):
+        associated_data = encryptor.entry_associated_data(user_id)
+        shard = shard_of[user_id]
+        for n in range(count):
+            site = rng.choice(SITES)
+            # About one entry in ten reuses a per-user password so vault health has groups to find
+            password = f"pw-{user_id}-{n % 3}" if rng.random() < 0.1 else f"pw-{rng.getrandbits(64):x}"
+            entry = encryptor.encrypt_entry(password, vault_key, associated_data)
+            rows[shard].append((next_ids[shard], user_id, f"{site.title()} {n}", f"https://{site}.com",
+                                f"{username_for(user_id)}+{n}", json.dumps(entry), entry['v'])
+                               + describe_password(encryptor, password, fingerprint_key))
+            next_ids[shard] += 1
+            if len(rows[shard]) >= batch_size:
+                written += _insert_entries(shards[shard], rows[shard])
+                rows[shard] = []
+    for shard, shard_conn in shards.items():
+        written += _insert_entries(shard_conn, rows[shard])
+        shard_conn.close()
+
+    return {'users': len(user_ids), 'entries': written, 'seconds': time.monotonic() - started}
+
+
+def _connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = OFF')
+    return conn
+
+
+def _insert_entries(conn, rows):
+    if not rows:
+        return 0
+    conn.executemany(
+        'INSERT INTO passwords (id, user_id, site_name, site_url, site_username, encrypted_data, enc_version, fingerprint, strength) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        rows
+    )
+    conn.commit()
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic SecurePass database")
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', required=True, help="Database file to create or extend")
+    args = parser.parse_args()
+
+    result = generate(args.output, args.users, args.entries, args.seed)
+    print(f"Generated {result['users']} users and {result['entries']} entries in {result['seconds']:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
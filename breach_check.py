@@ -0,0 +1,226 @@
+"""
+Offline breached-password checks for SecurePass.
+A HIBP-style list of SHA-1 hashes sorted by hash ("HASH:COUNT" lines) is converted once
+into a compact binary index: fixed-width hash prefixes with their breach counts, plus a
+fanout table over the first two bytes. Workers mmap the index and binary-search it in
+place, so opening it costs nothing, lookups touch a handful of pages, and the pages are
+shared through the OS page cache instead of being loaded into every worker.
+"""
+
+import gzip
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+
+BREACH_CONFIG = {
+    'index_path': os.environ.get('BREACH_INDEX_PATH') or os.path.join(
+        os.path.dirname(__file__), 'data', 'breached_passwords.idx'),
+    # Passwords seen fewer times than this are not reported
+    'min_count': int(os.environ.get('BREACH_MIN_COUNT', 1)),
+}
+
+MAGIC = b'SPBRIDX1'
+# magic, prefix bytes, record count
+HEADER = struct.Struct('>8sB7xQ')
+FANOUT_SIZE = 1 << 16
+FANOUT_OFFSET = HEADER.size
+RECORDS_OFFSET = FANOUT_OFFSET + (FANOUT_SIZE + 1) * 8
+COUNT = struct.Struct('>I')
+MAX_COUNT = 0xFFFFFFFF
+
+
+class BreachIndexError(Exception):
+    """Raised when a source list or index file can't be used"""
+
+
+def _open_source(path):
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='ascii', errors='replace')
+    return open(path, encoding='ascii', errors='replace')
+
+
+def build_index(source_path, output_path, prefix_bytes=8):
+    """
+    Convert a hash list sorted by hash into a binary index
+
+    Entries whose prefixes collide are merged and their counts summed. The index is
+    written next to output_path and moved into place when complete.
+
+    Args:
+        source_path (str): "SHA1HEX:COUNT" lines sorted by hash ('-' for stdin, .gz allowed)
+        output_path (str): Where to write the index
+        prefix_bytes (int): Bytes of each SHA-1 kept (8 gives a ~1e-10 false-positive
+            rate on the full HIBP list)
+
+    Returns:
+        int: Number of records written
+    """
+    if not 4 <= prefix_bytes <= 20:
+        raise BreachIndexError("prefix_bytes must be between 4 and 20")
+    fanout = array('Q', bytes(8 * (FANOUT_SIZE + 1)))
+    tmp_path = f"{output_path}.tmp"
+    records = 0
+    previous = None
+    pending_count = 0
+
+    try:
+        with _open_source(source_path) as source, open(tmp_path, 'wb') as out:
+            out.write(bytes(RECORDS_OFFSET))
+            for line_number, line in enumerate(source, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                hex_hash, _, count = line.partition(':')
+                try:
+                    prefix = bytes.fromhex(hex_hash)[:prefix_bytes]
+                    count = int(count) if count else 1
+                except ValueError:
+                    raise BreachIndexError(f"Line {line_number}: expected SHA1HEX:COUNT")
+                if len(prefix) != prefix_bytes:
+                    raise BreachIndexError(f"Line {line_number}: hash is shorter than {prefix_bytes} bytes")
+
+                if prefix == previous:
+                    pending_count += count
+                    continue
+                if previous is not None:
+                    if prefix < previous:
+                        raise BreachIndexError(f"Line {line_number}: input must be sorted by hash")
+                    out.write(previous + COUNT.pack(min(pending_count, MAX_COUNT)))
+                    fanout[int.from_bytes(previous[:2], 'big') + 1] += 1
+                    records += 1
+                previous, pending_count = prefix, count
+
+            if previous is not None:
+                out.write(previous + COUNT.pack(min(pending_count, MAX_COUNT)))
+                fanout[int.from_bytes(previous[:2], 'big') + 1] += 1
+                records += 1
+
+            # fanout[i] is the index of the first record whose prefix starts with i
+            for i in range(1, FANOUT_SIZE + 1):
+                fanout[i] += fanout[i - 1]
+            if sys.byteorder == 'little':
+                fanout.byteswap()
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, prefix_bytes, records))
+            out.write(fanout.tobytes())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, output_path)
+    return records
+
+
+class BreachIndex:
+    def __init__(self, path=None):
+        self.path = path or BREACH_CONFIG['index_path']
+        self._lock = threading.Lock()
+        self._mm = None
+        self._opened = False
+        self._stats = {'lookups': 0, 'hits': 0}
+
+    def _open(self):
+        """Map the index on first use; a missing or unusable index just disables checks"""
+        with self._lock:
+            if self._opened:
+                return self._mm
+            self._mm = self._map()
+            # Set last: lookup() reads _mm without the lock once this is True
+            self._opened = True
+            return self._mm
+
+    def _map(self):
+        try:
+            with open(self.path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            print(f"Breach index {self.path} is empty; breach checks disabled")
+            return None
+        except OSError as e:
+            print(f"Breach index {self.path} can't be read ({e}); breach checks disabled")
+            return None
+        if len(mm) < RECORDS_OFFSET:
+            mm.close()
+            print(f"Breach index {self.path} is truncated; breach checks disabled")
+            return None
+        magic, prefix_bytes, records = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or len(mm) != RECORDS_OFFSET + records * (prefix_bytes + COUNT.size):
+            mm.close()
+            print(f"Breach index {self.path} is not a breach index or is truncated; breach checks disabled")
+            return None
+        if hasattr(mm, 'madvise'):
+            # Lookups jump around the file; don't read ahead pages that won't be used
+            mm.madvise(mmap.MADV_RANDOM)
+        self._prefix_bytes = prefix_bytes
+        self._record_size = prefix_bytes + COUNT.size
+        self._records = records
+        return mm
+
+    @property
+    def available(self):
+        """True if an index file is present"""
+        return self._open() is not None
+
+    def lookup(self, password):
+        """
+        Look up how often a password appears in the breach list
+
+        Args:
+            password (str): The candidate password
+
+        Returns:
+            int: Times seen in breaches (0 if never, or below BREACH_MIN_COUNT), or None
+                if no index is installed
+        """
+        mm = self._mm if self._opened else self._open()
+        if mm is None:
+            return None
+        key = hashlib.sha1(password.encode('utf-8')).digest()[:self._prefix_bytes]
+        bucket = int.from_bytes(key[:2], 'big')
+        lo, hi = struct.unpack_from('>QQ', mm, FANOUT_OFFSET + bucket * 8)
+        size = self._record_size
+        count = 0
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = RECORDS_OFFSET + mid * size
+            candidate = mm[offset:offset + self._prefix_bytes]
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                count = COUNT.unpack_from(mm, offset + self._prefix_bytes)[0]
+                break
+        if count < BREACH_CONFIG['min_count']:
+            count = 0
+        self._stats['lookups'] += 1
+        if count:
+            self._stats['hits'] += 1
+        return count
+
+    def stats(self):
+        """Return index details and this worker's lookup counters"""
+        if not self.available:
+            return dict(self._stats, available=False)
+        return dict(self._stats, available=True, records=self._records, prefix_bytes=self._prefix_bytes)
+
+
+def breach_warning(count, subject='This password'):
+    """User-facing warning for a breach count, or None if the password wasn't found"""
+    if not count:
+        return None
+    return (f"{subject} has appeared {count:,} time{'s' if count != 1 else ''} in known data breaches. "
+            "Consider choosing a different one.")
+
+
+# Shared index used by the app
+breach_index = BreachIndex()
@@ -0,0 +1,109 @@
+"""
+In-memory caching helpers for SecurePass.
+Caches are per worker process; nothing stored here is shared between gunicorn workers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with optional idle and absolute expiry.
+
+    Args:
+        max_size (int): Maximum number of entries before the least recently used is evicted
+        ttl (float): Seconds an entry may live after insertion (None for no limit)
+        idle_ttl (float): Seconds an entry may go unused before it expires (None for no limit)
+        on_evict (callable): Called with (key, value) whenever an entry leaves the cache
+    """
+
+    def __init__(self, max_size=1024, ttl=None, idle_ttl=None, on_evict=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def _expired(self, entry, now):
+        _, created, last_used = entry
+        if self.ttl is not None and now - created > self.ttl:
+            return True
+        if self.idle_ttl is not None and now - last_used > self.idle_ttl:
+            return True
+        return False
+
+    def _drop(self, key, stat):
+        value = self._data.pop(key)[0]
+        self._stats[stat] += 1
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def get(self, key, default=None):
+        """Get a value and mark it as recently used"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+            if self._expired(entry, now):
+                self._drop(key, 'expirations')
+                self._stats['misses'] += 1
+                return default
+            self._data[key] = (entry[0], entry[1], now)
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entry if full"""
+        now = time.monotonic()
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None and old[0] is not value and self.on_evict:
+                self.on_evict(key, old[0])
+            self._data[key] = (value, now, now)
+            while len(self._data) > self.max_size:
+                self._drop(next(iter(self._data)), 'evictions')
+
+    def pop(self, key):
+        """Remove a value, returning it (or None if absent)"""
+        with self._lock:
+            if key not in self._data:
+                return None
+            value = self._data[key][0]
+            self._drop(key, 'evictions')
+            return value
+
+    def discard_where(self, predicate):
+        """Remove every entry whose value matches predicate(value)"""
+        with self._lock:
+            for key in [k for k, entry in self._data.items() if predicate(entry[0])]:
+                self._drop(key, 'evictions')
+
+    def purge_expired(self):
+        """Drop all expired entries and return how many were removed"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, entry in self._data.items() if self._expired(entry, now)]
+            for key in expired:
+                self._drop(key, 'expirations')
+            return len(expired)
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            for key in list(self._data):
+                self._drop(key, 'evictions')
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current size"""
+        with self._lock:
+            return dict(self._stats, size=len(self._data), max_size=self.max_size)
@@ -1,86 +1,219 @@
 import sqlite3
 import os
 import json
+import hashlib
+import threading
 from datetime import datetime
 
+from cache import TTLCache
+from db_pool import ConnectionPool
+from metrics import db_call_duration, timed
+from migrations import MigrationError, migrate, pending_migrations
+
 # Database file path
-DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'password_manager.db')
+DB_PATH = os.environ.get('DATABASE_PATH') or os.path.join(os.path.dirname(__file__), 'data', 'password_manager.db')
+
+# Vault data (entries, vault and recovery keys, search index) is spread over DB_SHARDS
+# files by a stable hash of the user ID, so writes to different users' vaults don't queue
+# on one SQLite write lock. Shard 0 is DB_PATH itself, which also holds the users directory
+# and the shared tables; with the default of 1 everything stays in that one file.
+DB_SHARDS = max(1, int(os.environ.get('DB_SHARDS', 1)))
+
+# Workers apply pending schema migrations when they start. With this off they refuse to
+# start against an outdated schema instead, and `python manage.py migrate` is run on deploy
+DB_AUTO_MIGRATE = os.environ.get('DB_AUTO_MIGRATE', 'true').lower() == 'true'
+
+# Each shard hands out entry IDs from its own range, so IDs stay unique when users move
+SHARD_ID_SPAN = 1 << 40
+
+# Per-process pools of long-lived connections, one per database file (opened on first use)
+_pool = ConnectionPool(DB_PATH)
+_shard_pools = {0: _pool}
+_shard_pools_lock = threading.Lock()
+
+# Per-process cache of user rows, keyed by ('id' | 'username' | 'email', value).
+# Other workers only see a change once their entry expires, so callers that check
+# credentials pass use_cache=False.
+_user_cache = TTLCache(
+    max_size=int(os.environ.get('USER_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('USER_CACHE_TTL', 30)),
+)
 
-def init_db():
-    """Initialize the database with required tables"""
+# Per-process cache of user ID -> shard. A user's shard only changes through
+# `python manage.py rebalance-shards`, which is run while the app is stopped.
+_shard_routes = TTLCache(max_size=int(os.environ.get('SHARD_ROUTE_CACHE_SIZE', 100000)))
+
+@timed(db_call_duration, 'init_db')
+def init_db(apply=None):
+    """
+    Bring the main database and every shard file up to the latest schema version
+
+    Args:
+        apply (bool): Apply pending migrations (default: DB_AUTO_MIGRATE). When False,
+            raise MigrationError if any are pending instead
+
+    Returns:
+        list: (shard, version, name, seconds) of each migration applied
+    """
+    apply = DB_AUTO_MIGRATE if apply is None else apply
     # Ensure data directory exists
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Create users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create passwords table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS passwords (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            site_name TEXT NOT NULL,
-            site_url TEXT,
-            site_username TEXT NOT NULL,
-            encrypted_data TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-        )
-    ''')
-    
-    # Create reset_tokens table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS reset_tokens (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            token TEXT UNIQUE NOT NULL,
-            expiry TIMESTAMP NOT NULL,
-            used BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-        )
-    ''')
-    
-    # Create recovery_keys table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS recovery_keys (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER UNIQUE NOT NULL,
-            key_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-        )
-    ''')
-    
-    # Create indexes for better performance
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_passwords_user_id ON passwords (user_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reset_tokens_token ON reset_tokens (token)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reset_tokens_user_id ON reset_tokens (user_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recovery_keys_user_id ON recovery_keys (user_id)')
-    
-    conn.commit()
-    conn.close()
 
+    # Shard 0 first: it holds the users directory that lists any shards beyond DB_SHARDS
+    applied = _migrate_shard(0, apply)
+    for shard in get_shards()[1:]:
+        applied += _migrate_shard(shard, apply)
+    return applied
+
+def _migrate_shard(shard, apply):
+    conn = _shard_pool(shard).acquire()
+    try:
+        if not apply:
+            pending = pending_migrations(conn, shard)
+            if pending:
+                names = ', '.join(f"{m.version:04d}_{m.name}" for m in pending)
+                raise MigrationError(f"{shard_path(shard)} needs migrations {names}; run `python manage.py migrate`")
+            return []
+        _prepare_new_database(conn.cursor())
+        return [(shard,) + step for step in migrate(conn, shard)]
+    finally:
+        release_db_connection(conn)
+
+def _prepare_new_database(cursor):
+    """Give a brand-new database file incremental auto_vacuum before any table is created"""
+    # VACUUM applies the setting, which is instant while the file is empty; existing files
+    # are converted with `python manage.py maintenance --enable-incremental-vacuum`
+    if not cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table'").fetchone():
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
+
+def get_schema_status():
+    """Applied and pending migrations of each shard file, for `manage.py migrate --status`"""
+    try:
+        shards = get_shards()
+    except sqlite3.OperationalError:
+        # No users directory yet: nothing has been migrated
+        shards = list(range(DB_SHARDS))
+    status = {}
+    for shard in shards:
+        conn = _shard_pool(shard).acquire()
+        try:
+            try:
+                applied = conn.execute('SELECT version, name, applied_at, duration FROM schema_version ORDER BY version').fetchall()
+            except sqlite3.OperationalError:
+                applied = []
+            status[shard] = {'path': shard_path(shard), 'applied': applied, 'pending': pending_migrations(conn, shard)}
+        finally:
+            release_db_connection(conn)
+    return status
+
+@timed(db_call_duration, 'get_db_connection')
 def get_db_connection():
-    """Get a database connection with row factory for dict-like access"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # This allows us to access columns by name
-    return conn
+    """Get a pooled connection to the main database (users directory and shared tables)"""
+    return _pool.acquire()
+
+@timed(db_call_duration, 'get_shard_connection')
+def get_shard_connection(user_id):
+    """Get a pooled connection to the shard holding a user's vault data"""
+    return _shard_pool(shard_for_user(user_id)).acquire()
+
+def release_db_connection(conn):
+    """Return a connection obtained from get_db_connection or get_shard_connection to its pool"""
+    conn.pool.release(conn)
+
+def get_pool_stats():
+    """Get connection pool usage counters for this worker (per shard when sharded)"""
+    stats = _pool.stats()
+    with _shard_pools_lock:
+        shards = sorted(_shard_pools.items())
+    if len(shards) > 1:
+        stats['shards'] = {shard: pool.stats() for shard, pool in shards if shard}
+    return stats
+
+# Shard routing
+def shard_path(shard):
+    """Database file of a shard (shard 0 is DB_PATH)"""
+    if shard == 0:
+        return DB_PATH
+    root, ext = os.path.splitext(DB_PATH)
+    return f"{root}.shard{shard}{ext}"
+
+def _shard_pool(shard):
+    """Connection pool for a shard file, created on first use"""
+    pool = _shard_pools.get(shard)
+    if pool is None:
+        with _shard_pools_lock:
+            pool = _shard_pools.get(shard)
+            if pool is None:
+                pool = _shard_pools[shard] = ConnectionPool(shard_path(shard))
+    return pool
+
+def home_shard(user_id, shards=None):
+    """
+    Shard a user belongs on out of `shards` shard files (default DB_SHARDS)
+    
+    Jump consistent hash of the user ID: going from N to N+1 shards moves only about
+    1/(N+1) of the users, all of them onto the new shard.
+    """
+    shards = shards or DB_SHARDS
+    key = int.from_bytes(hashlib.blake2b(str(user_id).encode(), digest_size=8).digest(), 'big')
+    bucket, j = -1, 0
+    while j < shards:
+        bucket = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+def get_shards():
+    """Every shard that may hold data: 0..DB_SHARDS-1, plus higher ones users haven't been moved off yet"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT DISTINCT shard FROM users WHERE shard >= ? ORDER BY shard', (DB_SHARDS,))
+        return list(range(DB_SHARDS)) + [row[0] for row in cursor.fetchall()]
+    finally:
+        release_db_connection(conn)
+
+def shard_for_user(user_id):
+    """Shard holding a user's vault data, as recorded in the users directory"""
+    shard = _shard_routes.get(user_id)
+    if shard is None:
+        conn = get_db_connection()
+        try:
+            row = conn.execute('SELECT shard FROM users WHERE id = ?', (user_id,)).fetchone()
+        finally:
+            release_db_connection(conn)
+        if row is None:
+            # Not registered (yet); that's where create_user would put them
+            return home_shard(user_id)
+        shard = row[0]
+        _shard_routes.set(user_id, shard)
+    return shard
+
+def _reserve_entry_ids(cursor, count):
+    """
+    Reserve count consecutive entry IDs in the shard the cursor belongs to
+
+    Must run inside the transaction that inserts the entries, since it takes the write
+    lock. IDs only ever grow, and rows inserted without an explicit ID are accounted for.
+
+    Returns:
+        int: The first reserved ID
+    """
+    # last_id always lies in this shard's range, which bounds the MAX(id) seek; entries
+    # moved in from other shards keep their IDs and are outside it
+    cursor.execute(
+        '''UPDATE id_sequences
+           SET last_id = MAX(last_id, (SELECT COALESCE(MAX(id), 0) FROM passwords
+                                       WHERE id < (last_id / :span + 1) * :span)) + :count
+           WHERE name = 'passwords' ''',
+        {'span': SHARD_ID_SPAN, 'count': count}
+    )
+    cursor.execute("SELECT last_id FROM id_sequences WHERE name = 'passwords'")
+    return cursor.fetchone()[0] - count + 1
 
 # User operations
+@timed(db_call_duration, 'create_user')
 def create_user(username, email, password_hash):
     """Create a new user"""
     conn = get_db_connection()
@@ -91,44 +224,71 @@ def create_user(username, email, password_hash):
             (username, email, password_hash)
         )
         user_id = cursor.lastrowid
+        # The shard is only known once the ID is; both are committed together
+        shard = home_shard(user_id)
+        if shard:
+            cursor.execute('UPDATE users SET shard = ? WHERE id = ?', (shard, user_id))
         conn.commit()
+        invalidate_user_cache(user_id, username, email)
+        _shard_routes.set(user_id, shard)
         return user_id
     except sqlite3.IntegrityError as e:
         conn.rollback()
         raise e
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-def get_user_by_username(username):
-    """Get user by username"""
+def _get_user(column, value, use_cache):
+    """Look up a user row by a unique column, going through the user cache"""
+    key = (column, value)
+    if use_cache:
+        user = _user_cache.get(key)
+        if user is not None:
+            return user
+    
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
-        return cursor.fetchone()
+        cursor.execute(f'SELECT * FROM users WHERE {column} = ?', (value,))
+        user = cursor.fetchone()
     finally:
-        conn.close()
+        release_db_connection(conn)
+    
+    # Only hits are cached, so a new registration is visible right away
+    if user is not None:
+        for cached_column in ('id', 'username', 'email'):
+            _user_cache.set((cached_column, user[cached_column]), user)
+        _shard_routes.set(user['id'], user['shard'])
+    return user
+
+def invalidate_user_cache(user_id=None, username=None, email=None):
+    """Drop cached rows for a user in this worker"""
+    for column, value in (('username', username), ('email', email)):
+        if value is not None:
+            _user_cache.pop((column, value))
+    if user_id is not None:
+        _user_cache.discard_where(lambda user: user['id'] == user_id)
 
-def get_user_by_email(email):
+def get_user_cache_stats():
+    """Get user cache hit/miss counters for this worker"""
+    return _user_cache.stats()
+
+@timed(db_call_duration, 'get_user_by_username')
+def get_user_by_username(username, use_cache=True):
+    """Get user by username"""
+    return _get_user('username', username, use_cache)
+
+@timed(db_call_duration, 'get_user_by_email')
+def get_user_by_email(email, use_cache=True):
     """Get user by email"""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
-        return cursor.fetchone()
-    finally:
-        conn.close()
+    return _get_user('email', email, use_cache)
 
-def get_user_by_id(user_id):
+@timed(db_call_duration, 'get_user_by_id')
+def get_user_by_id(user_id, use_cache=True):
     """Get user by ID"""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-        return cursor.fetchone()
-    finally:
-        conn.close()
+    return _get_user('id', user_id, use_cache)
 
+@timed(db_call_duration, 'update_user_password')
 def update_user_password(user_id, password_hash):
     """Update user's password hash"""
     conn = get_db_connection()
@@ -139,58 +299,553 @@ def update_user_password(user_id, password_hash):
             (password_hash, user_id)
         )
         conn.commit()
+        invalidate_user_cache(user_id)
         return cursor.rowcount > 0
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'rehash_user_password')
+def rehash_user_password(user_id, old_hash, new_hash):
+    """
+    Replace a user's password hash with a rehash of the same password
+
+    Only swaps if the stored hash is still old_hash, so a password reset that lands
+    in the meantime is never overwritten.
+
+    Returns:
+        bool: True if the hash was replaced
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?',
+            (new_hash, user_id, old_hash)
+        )
+        conn.commit()
+        invalidate_user_cache(user_id)
+        return cursor.rowcount > 0
+    finally:
+        release_db_connection(conn)
 
 # Password operations
-def add_password(user_id, site_name, site_url, site_username, encrypted_data):
+@timed(db_call_duration, 'add_password')
+def add_password(user_id, site_name, site_url, site_username, encrypted_data, enc_version=1, fingerprint=None, strength=None):
     """Add a new password for a user"""
-    conn = get_db_connection()
+    conn = get_shard_connection(user_id)
     try:
         cursor = conn.cursor()
+        password_id = _reserve_entry_ids(cursor, 1)
         cursor.execute(
-            'INSERT INTO passwords (user_id, site_name, site_url, site_username, encrypted_data) VALUES (?, ?, ?, ?, ?)',
-            (user_id, site_name, site_url, site_username, encrypted_data)
+            '''INSERT INTO passwords (id, user_id, site_name, site_url, site_username, encrypted_data, enc_version, fingerprint, strength)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            (password_id, user_id, site_name, site_url, site_username, encrypted_data, enc_version, fingerprint, strength)
         )
-        password_id = cursor.lastrowid
         conn.commit()
         return password_id
     finally:
-        conn.close()
+        release_db_connection(conn)
 
+@timed(db_call_duration, 'add_passwords')
+def add_passwords(user_id, entries, enc_version=1):
+    """Add many (site_name, site_url, site_username, encrypted_data, fingerprint, strength) entries for a user in one transaction"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        entries = list(entries)
+        first_id = _reserve_entry_ids(cursor, len(entries))
+        cursor.executemany(
+            '''INSERT INTO passwords (id, user_id, site_name, site_url, site_username, encrypted_data, enc_version, fingerprint, strength)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            [(first_id + i, user_id, site_name, site_url, site_username, encrypted_data, enc_version, fingerprint, strength)
+             for i, (site_name, site_url, site_username, encrypted_data, fingerprint, strength) in enumerate(entries)]
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_passwords_by_user_id')
 def get_passwords_by_user_id(user_id):
     """Get all passwords for a user"""
-    conn = get_db_connection()
+    conn = get_shard_connection(user_id)
     try:
         cursor = conn.cursor()
         cursor.execute('SELECT * FROM passwords WHERE user_id = ? ORDER BY created_at DESC', (user_id,))
         return cursor.fetchall()
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+def iter_password_batches(user_id, batch_size=200):
+    """
+    Yield a user's entries oldest first in lists of up to batch_size rows
+
+    The pooled connection stays checked out until the generator is exhausted or closed,
+    and only one batch is held in memory at a time.
+    """
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id, site_name, site_url, site_username, encrypted_data, created_at FROM passwords '
+            'WHERE user_id = ? ORDER BY created_at, id',
+            (user_id,)
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_password_page')
+def get_password_page(user_id, after=None, limit=None):
+    """Get metadata (no encrypted data) for a user's entries, newest first, after a (created_at, id) cursor"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        query = 'SELECT id, site_name, site_url, site_username, created_at FROM passwords WHERE user_id = ?'
+        params = [user_id]
+        if after is not None:
+            query += ' AND (created_at, id) < (?, ?)'
+            params.extend(after)
+        query += ' ORDER BY created_at DESC, id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_vault_revision')
+def get_vault_revision(user_id):
+    """Get the revision counter of a user's vault (0 if it never changed)"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT revision FROM vault_revisions WHERE user_id = ?', (user_id,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_vault_changes')
+def get_vault_changes(user_id, since):
+    """
+    Get what changed in a user's vault after revision `since`, all from one snapshot
+
+    Both lookups walk a (user_id, revision) index, so the cost follows the number of
+    changes rather than the size of the vault. A `since` of 0, one older than the purged
+    tombstones, or one from the future (e.g. before a restore) gets the whole vault
+    with full=True instead, and the client replaces what it has.
+
+    Returns:
+        dict: revision (the vault's current one), full, changed (entry metadata rows
+            ordered by revision) and deleted (IDs of entries deleted since then)
+    """
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN')
+        cursor.execute('SELECT revision, pruned_revision FROM vault_revisions WHERE user_id = ?', (user_id,))
+        row = cursor.fetchone()
+        revision, pruned = (row['revision'], row['pruned_revision']) if row else (0, 0)
+        full = since <= 0 or since < pruned or since > revision
+        changes = {'revision': revision, 'full': full, 'changed': [], 'deleted': []}
+        if not full and since == revision:
+            return changes
+
+        query = ('SELECT id, site_name, site_url, site_username, created_at, updated_at, revision '
+                 'FROM passwords WHERE user_id = ?')
+        if full:
+            cursor.execute(query + ' ORDER BY revision, id', (user_id,))
+            changes['changed'] = cursor.fetchall()
+        else:
+            cursor.execute(query + ' AND revision > ? ORDER BY revision, id', (user_id, since))
+            changes['changed'] = cursor.fetchall()
+            cursor.execute(
+                'SELECT id FROM password_tombstones WHERE user_id = ? AND revision > ? ORDER BY revision, id',
+                (user_id, since)
+            )
+            changes['deleted'] = [row['id'] for row in cursor.fetchall()]
+        return changes
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'search_passwords')
+def search_passwords(user_id, terms, limit=20):
+    """Full-text prefix search over a user's entry metadata, best matches first"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        has_index = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'passwords_fts'"
+        ).fetchone()
+        if has_index:
+            # Every term is quoted, so user input is never parsed as FTS5 query syntax and
+            # MATCH can't fail on it. The owner token limits the match to this user's rows.
+            match = f'owner:"u{int(user_id)}" AND {{site_name site_url site_username}}:(' + ' AND '.join(
+                '"' + term.replace('"', '""') + '"*' for term in terms) + ')'
+            cursor.execute(
+                '''SELECT p.id, p.site_name, p.site_url, p.site_username, p.created_at
+                   FROM passwords_fts
+                   JOIN passwords p ON p.id = passwords_fts.rowid
+                   WHERE passwords_fts MATCH ?
+                   ORDER BY bm25(passwords_fts, 10.0, 2.0, 5.0, 0.0)
+                   LIMIT ?''',
+                (match, limit)
+            )
+        else:
+            # No FTS5 in this SQLite build; fall back to a substring scan of the user's rows
+            clauses = ' AND '.join(['(site_name LIKE ? OR site_url LIKE ? OR site_username LIKE ?)'] * len(terms))
+            params = [user_id]
+            for term in terms:
+                params.extend(['%' + term + '%'] * 3)
+            params.append(limit)
+            cursor.execute(
+                f'SELECT id, site_name, site_url, site_username, created_at FROM passwords WHERE user_id = ? AND {clauses} ORDER BY site_name LIMIT ?',
+                params
+            )
+        return cursor.fetchall()
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'rebuild_search_index')
+def rebuild_search_index():
+    """Rebuild the full-text index from the passwords table of every shard"""
+    count = 0
+    for shard in get_shards():
+        conn = _shard_pool(shard).acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO passwords_fts (passwords_fts) VALUES ('rebuild')")
+            conn.commit()
+            cursor.execute('SELECT COUNT(*) FROM passwords')
+            count += cursor.fetchone()[0]
+        finally:
+            release_db_connection(conn)
+    return count
+
+@timed(db_call_duration, 'get_password_by_id')
+def get_password_by_id(password_id, user_id):
+    """Get a specific password of a user by ID"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM passwords WHERE id = ? AND user_id = ?', (password_id, user_id))
+        return cursor.fetchone()
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_encrypted_passwords')
+def get_encrypted_passwords(user_id, password_ids=None):
+    """Get id and encrypted data for a user's entries (all of them, or only the given IDs)"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        if password_ids is None:
+            cursor.execute('SELECT id, encrypted_data, enc_version FROM passwords WHERE user_id = ?', (user_id,))
+            return cursor.fetchall()
+        
+        rows = []
+        password_ids = list(password_ids)
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(password_ids), 500):
+            chunk = password_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(
+                f'SELECT id, encrypted_data, enc_version FROM passwords WHERE id IN ({placeholders}) AND user_id = ?',
+                (*chunk, user_id)
+            )
+            rows.extend(cursor.fetchall())
+        return rows
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'delete_password')
+def delete_password(password_id, user_id):
+    """Delete a password of a user by ID"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM passwords WHERE id = ? AND user_id = ?', (password_id, user_id))
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_legacy_passwords')
+def get_legacy_passwords(user_id, after_id=0, limit=100):
+    """Get the next batch of a user's entries still in the per-entry-salt format"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id, encrypted_data FROM passwords WHERE user_id = ? AND enc_version = 1 AND id > ? ORDER BY id LIMIT ?',
+            (user_id, after_id, limit)
+        )
+        return cursor.fetchall()
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'count_legacy_passwords')
+def count_legacy_passwords(user_id):
+    """Count a user's entries still in the per-entry-salt format"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM passwords WHERE user_id = ? AND enc_version = 1', (user_id,))
+        return cursor.fetchone()[0]
+    finally:
+        release_db_connection(conn)
 
-def get_password_by_id(password_id):
-    """Get a specific password by ID"""
+@timed(db_call_duration, 'update_encrypted_passwords')
+def update_encrypted_passwords(user_id, updates, enc_version):
+    """
+    Rewrite (password_id, encrypted_data) pairs of a user's entries in one transaction
+
+    For re-encrypting the same secret: the revision triggers watch only the metadata
+    columns, so this doesn't show up in /api/sync. A write that changes the secret
+    itself must bump the vault revision and stamp the entry in the same transaction.
+    """
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            'UPDATE passwords SET encrypted_data = ?, enc_version = ? WHERE id = ? AND user_id = ?',
+            [(encrypted_data, enc_version, password_id, user_id) for password_id, encrypted_data in updates]
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'mark_legacy_passwords')
+def mark_legacy_passwords(user_id, password_ids, enc_version):
+    """Set enc_version on legacy entries without touching their data (e.g. to stop retrying ones that won't open)"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            'UPDATE passwords SET enc_version = ? WHERE id = ? AND user_id = ? AND enc_version = 1',
+            [(enc_version, password_id, user_id) for password_id in password_ids]
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        release_db_connection(conn)
+
+# Vault health operations
+@timed(db_call_duration, 'get_unfingerprinted_passwords')
+def get_unfingerprinted_passwords(user_id, after_id=0, limit=100):
+    """Get the next batch of a user's vault-key entries that have no fingerprint yet"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            '''SELECT id, encrypted_data FROM passwords
+               WHERE user_id = ? AND fingerprint IS NULL AND enc_version = 2 AND id > ? ORDER BY id LIMIT ?''',
+            (user_id, after_id, limit)
+        )
+        return cursor.fetchall()
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'set_password_fingerprints')
+def set_password_fingerprints(user_id, updates):
+    """Store (password_id, fingerprint, strength) for a user's entries in one transaction"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            'UPDATE passwords SET fingerprint = ?, strength = ? WHERE id = ? AND user_id = ?',
+            [(fingerprint, strength, password_id, user_id) for password_id, fingerprint, strength in updates]
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_reused_passwords')
+def get_reused_passwords(user_id):
+    """Get metadata of a user's entries that share a password with another entry, ordered by fingerprint"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        # Both the GROUP BY and the outer lookup are served by idx_passwords_fingerprint
+        cursor.execute(
+            '''SELECT id, site_name, site_url, site_username, created_at, fingerprint FROM passwords
+               WHERE user_id = ? AND fingerprint IN (
+                   SELECT fingerprint FROM passwords WHERE user_id = ? AND fingerprint IS NOT NULL
+                   GROUP BY fingerprint HAVING COUNT(*) > 1)
+               ORDER BY fingerprint, id''',
+            (user_id, user_id)
+        )
+        return cursor.fetchall()
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_password_strength_counts')
+def get_password_strength_counts(user_id):
+    """Count a user's entries per strength score (None for entries not scored yet)"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT strength, COUNT(*) FROM passwords WHERE user_id = ? GROUP BY strength', (user_id,))
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_password_age_counts')
+def get_password_age_counts(user_id, boundaries_days):
+    """Count a user's entries per age bucket; bucket i holds entries younger than boundaries_days[i] days"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cases = ' '.join(f'WHEN age < {float(days)} THEN {i}' for i, days in enumerate(boundaries_days))
+        cursor.execute(
+            f'''SELECT CASE {cases} ELSE {len(boundaries_days)} END AS bucket, COUNT(*) FROM (
+                    SELECT julianday('now') - julianday(created_at) AS age FROM passwords WHERE user_id = ?)
+                GROUP BY bucket''',
+            (user_id,)
+        )
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_weak_passwords')
+def get_weak_passwords(user_id, max_strength, limit=100):
+    """Get metadata of a user's entries scored at or below max_strength, weakest first"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            '''SELECT id, site_name, site_url, site_username, created_at, strength FROM passwords
+               WHERE user_id = ? AND strength <= ? ORDER BY strength, id LIMIT ?''',
+            (user_id, max_strength, limit)
+        )
+        return cursor.fetchall()
+    finally:
+        release_db_connection(conn)
+
+# Vault key operations
+@timed(db_call_duration, 'create_vault_key')
+def create_vault_key(user_id, kdf_salt, wrapped_key):
+    """Store a user's wrapped vault key unless one already exists"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'INSERT OR IGNORE INTO vault_keys (user_id, kdf_salt, wrapped_key) VALUES (?, ?, ?)',
+            (user_id, kdf_salt, wrapped_key)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_vault_key')
+def get_vault_key(user_id):
+    """Get a user's wrapped vault key"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM vault_keys WHERE user_id = ?', (user_id,))
+        return cursor.fetchone()
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'delete_vault_key')
+def delete_vault_key(user_id):
+    """Delete a user's wrapped vault key (it cannot be rewrapped without the old master password)"""
+    conn = get_shard_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM vault_keys WHERE user_id = ?', (user_id,))
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        release_db_connection(conn)
+
+# Vault session operations
+@timed(db_call_duration, 'create_vault_session')
+def create_vault_session(handle_hash, user_id, sealed_key, idle_until, expires_at):
+    """Store an unlocked-vault session so every worker can resume it (idle_until must not pass expires_at)"""
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            'INSERT OR REPLACE INTO vault_sessions (handle_hash, user_id, sealed_key, idle_until, expires_at) VALUES (?, ?, ?, ?, ?)',
+            (handle_hash, user_id, sealed_key, idle_until, expires_at)
+        )
+        conn.commit()
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_vault_session')
+def get_vault_session(handle_hash, now):
+    """Get an unlocked-vault session that hasn't expired"""
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM passwords WHERE id = ?', (password_id,))
+        cursor.execute(
+            'SELECT user_id, sealed_key, idle_until, expires_at FROM vault_sessions '
+            'WHERE handle_hash = ? AND idle_until > ? AND expires_at > ?',
+            (handle_hash, now, now)
+        )
         return cursor.fetchone()
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-def delete_password(password_id):
-    """Delete a password by ID"""
+@timed(db_call_duration, 'touch_vault_session')
+def touch_vault_session(handle_hash, idle_until, now):
+    """Push back a live session's idle expiry; returns False if it was locked or expired meanwhile"""
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        cursor.execute('DELETE FROM passwords WHERE id = ?', (password_id,))
+        cursor.execute(
+            'UPDATE vault_sessions SET idle_until = MIN(?, expires_at) WHERE handle_hash = ? AND idle_until > ? AND expires_at > ?',
+            (idle_until, handle_hash, now, now)
+        )
         conn.commit()
         return cursor.rowcount > 0
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'delete_vault_sessions')
+def delete_vault_sessions(handle_hash=None, user_id=None):
+    """Delete one unlocked-vault session, or all of a user's"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if handle_hash is not None:
+            cursor.execute('DELETE FROM vault_sessions WHERE handle_hash = ?', (handle_hash,))
+        else:
+            cursor.execute('DELETE FROM vault_sessions WHERE user_id = ?', (user_id,))
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'purge_vault_sessions')
+def purge_vault_sessions(now, limit):
+    """Delete up to limit expired unlocked-vault sessions in one short transaction"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'DELETE FROM vault_sessions WHERE handle_hash IN '
+            '(SELECT handle_hash FROM vault_sessions WHERE idle_until <= ? LIMIT ?)',
+            (now, limit)
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        release_db_connection(conn)
 
 # Reset token operations
+@timed(db_call_duration, 'create_reset_token')
 def create_reset_token(user_id, token, expiry):
     """Create a new reset token"""
     conn = get_db_connection()
@@ -204,8 +859,9 @@ def create_reset_token(user_id, token, expiry):
         conn.commit()
         return token_id
     finally:
-        conn.close()
+        release_db_connection(conn)
 
+@timed(db_call_duration, 'get_reset_token')
 def get_reset_token(token):
     """Get reset token by token value"""
     conn = get_db_connection()
@@ -217,8 +873,9 @@ def get_reset_token(token):
         )
         return cursor.fetchone()
     finally:
-        conn.close()
+        release_db_connection(conn)
 
+@timed(db_call_duration, 'mark_token_as_used')
 def mark_token_as_used(token_id):
     """Mark a reset token as used"""
     conn = get_db_connection()
@@ -228,23 +885,42 @@ def mark_token_as_used(token_id):
         conn.commit()
         return cursor.rowcount > 0
     finally:
-        conn.close()
+        release_db_connection(conn)
 
+@timed(db_call_duration, 'cleanup_expired_tokens')
 def cleanup_expired_tokens():
-    """Remove expired tokens"""
+    """Remove expired and used tokens"""
+    return purge_reset_tokens(datetime.now(), -1)
+
+@timed(db_call_duration, 'purge_reset_tokens')
+def purge_reset_tokens(now, limit):
+    """Delete up to limit expired or used reset tokens (-1 for no limit) in one short transaction"""
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        cursor.execute('DELETE FROM reset_tokens WHERE expiry < datetime("now")')
+        # Expiries are stored in local time by the app, so compare against the caller's clock
+        # rather than SQLite's UTC datetime('now'); both lookups go through an index
+        cursor.execute(
+            'DELETE FROM reset_tokens WHERE id IN (SELECT id FROM reset_tokens WHERE expiry < ? LIMIT ?)',
+            (now, limit)
+        )
+        deleted = cursor.rowcount
+        if limit < 0 or deleted < limit:
+            cursor.execute(
+                'DELETE FROM reset_tokens WHERE id IN (SELECT id FROM reset_tokens WHERE used LIMIT ?)',
+                (limit if limit < 0 else limit - deleted,)
+            )
+            deleted += cursor.rowcount
         conn.commit()
-        return cursor.rowcount
+        return deleted
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 # Recovery key operations
+@timed(db_call_duration, 'create_recovery_key')
 def create_recovery_key(user_id, key_hash):
     """Create or update a recovery key for a user"""
-    conn = get_db_connection()
+    conn = get_shard_connection(user_id)
     try:
         cursor = conn.cursor()
         # Try to update existing recovery key
@@ -256,21 +932,23 @@ def create_recovery_key(user_id, key_hash):
         conn.commit()
         return key_id
     finally:
-        conn.close()
+        release_db_connection(conn)
 
+@timed(db_call_duration, 'get_recovery_key_by_user_id')
 def get_recovery_key_by_user_id(user_id):
     """Get recovery key by user ID"""
-    conn = get_db_connection()
+    conn = get_shard_connection(user_id)
     try:
         cursor = conn.cursor()
         cursor.execute('SELECT * FROM recovery_keys WHERE user_id = ?', (user_id,))
         return cursor.fetchone()
     finally:
-        conn.close()
+        release_db_connection(conn)
 
+@timed(db_call_duration, 'verify_recovery_key')
 def verify_recovery_key(user_id, key_hash):
     """Verify a recovery key for a user"""
-    conn = get_db_connection()
+    conn = get_shard_connection(user_id)
     try:
         cursor = conn.cursor()
         cursor.execute(
@@ -279,4 +957,412 @@ def verify_recovery_key(user_id, key_hash):
         )
         return cursor.fetchone() is not None
     finally:
-        conn.close()
\ No newline at end of file
+        release_db_connection(conn)
+
+# Email outbox operations
+@timed(db_call_duration, 'enqueue_email')
+def enqueue_email(recipient, subject, body_text, body_html=None):
+    """Queue an email for the background sender"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'INSERT INTO email_outbox (recipient, subject, body_text, body_html) VALUES (?, ?, ?, ?)',
+            (recipient, subject, body_text, body_html)
+        )
+        email_id = cursor.lastrowid
+        conn.commit()
+        return email_id
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'claim_due_emails')
+def claim_due_emails(now, lease_seconds, limit):
+    """Atomically claim due emails (and ones whose sender died mid-send) for delivery"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        # IMMEDIATE takes the write lock up front so two workers never claim the same rows
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute(
+            """SELECT * FROM email_outbox
+               WHERE (status = 'pending' AND next_attempt_at <= ?)
+                  OR (status = 'sending' AND locked_until < ?)
+               ORDER BY id LIMIT ?""",
+            (now, now, limit)
+        )
+        rows = cursor.fetchall()
+        cursor.executemany(
+            "UPDATE email_outbox SET status = 'sending', locked_until = ?, attempts = attempts + 1 WHERE id = ?",
+            [(now + lease_seconds, row['id']) for row in rows]
+        )
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'mark_email_sent')
+def mark_email_sent(email_id):
+    """Record a successful delivery"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE email_outbox SET status = 'sent', sent_at = CURRENT_TIMESTAMP, locked_until = NULL, last_error = NULL WHERE id = ?",
+            (email_id,)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'mark_email_failed')
+def mark_email_failed(email_id, error, next_attempt_at=None):
+    """Record a failed delivery; schedule a retry, or give up when next_attempt_at is None"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if next_attempt_at is None:
+            cursor.execute(
+                "UPDATE email_outbox SET status = 'failed', locked_until = NULL, last_error = ? WHERE id = ?",
+                (error, email_id)
+            )
+        else:
+            cursor.execute(
+                "UPDATE email_outbox SET status = 'pending', locked_until = NULL, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                (error, next_attempt_at, email_id)
+            )
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_email_outbox_counts')
+def get_email_outbox_counts():
+    """Count outbox emails by delivery status"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT status, COUNT(*) FROM email_outbox GROUP BY status')
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    finally:
+        release_db_connection(conn)
+
+# Rate limit operations
+@timed(db_call_duration, 'take_rate_limit_tokens')
+def take_rate_limit_tokens(buckets, now):
+    """
+    Take one token from every bucket, or from none of them if any is empty
+    
+    Args:
+        buckets: (key, capacity, refill_per_second) for each bucket
+        now (float): Current Unix time
+    
+    Returns:
+        tuple: (index of the first empty bucket, seconds until it has a token), or None if all were taken
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        for index, (key, capacity, rate) in enumerate(buckets):
+            params = {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}
+            # Refill by elapsed time, then take a token only if one is available
+            cursor.execute(
+                '''INSERT INTO rate_limits (key, tokens, updated_at) VALUES (:key, :capacity - 1, :now)
+                   ON CONFLICT (key) DO UPDATE
+                   SET tokens = MIN(:capacity, tokens + MAX(excluded.updated_at - updated_at, 0) * :rate) - 1,
+                       updated_at = excluded.updated_at
+                   WHERE MIN(:capacity, tokens + MAX(excluded.updated_at - updated_at, 0) * :rate) >= 1''',
+                params
+            )
+            if cursor.rowcount == 0:
+                cursor.execute('SELECT tokens, updated_at FROM rate_limits WHERE key = ?', (key,))
+                row = cursor.fetchone()
+                conn.rollback()
+                available = min(capacity, row['tokens'] + max(now - row['updated_at'], 0) * rate)
+                return index, (1 - available) / rate
+        conn.commit()
+        return None
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'purge_rate_limits')
+def purge_rate_limits(idle_before, limit):
+    """Delete up to limit buckets untouched since idle_before (by then they have refilled)"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'DELETE FROM rate_limits WHERE key IN (SELECT key FROM rate_limits WHERE updated_at < ? LIMIT ?)',
+            (idle_before, limit)
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        release_db_connection(conn)
+
+# Maintenance operations
+@timed(db_call_duration, 'claim_maintenance_job')
+def claim_maintenance_job(name, owner, now, interval, lease_seconds, force=False):
+    """Take the lease on a job if it is due and no other process holds it; returns True if claimed"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('INSERT OR IGNORE INTO maintenance_jobs (name) VALUES (?)', (name,))
+        cursor.execute(
+            '''UPDATE maintenance_jobs SET lease_owner = ?, lease_until = ?, last_started_at = ?
+               WHERE name = ? AND (lease_until IS NULL OR lease_until < ?)
+                 AND (? OR last_started_at IS NULL OR last_started_at <= ?)''',
+            (owner, now + lease_seconds, now, name, now, force, now - interval)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'finish_maintenance_job')
+def finish_maintenance_job(name, owner, finished_at, duration, result=None, error=None):
+    """Record a job run and release its lease"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            '''UPDATE maintenance_jobs SET lease_owner = NULL, lease_until = NULL, last_finished_at = ?,
+                   last_duration = ?, last_result = ?, last_error = ?, runs = runs + 1
+               WHERE name = ? AND lease_owner = ?''',
+            (finished_at, duration, json.dumps(result) if result is not None else None, error, name, owner)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_maintenance_jobs')
+def get_maintenance_jobs():
+    """Get the last run of every maintenance job, keyed by name"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM maintenance_jobs ORDER BY name')
+        jobs = {}
+        for row in cursor.fetchall():
+            job = dict(row)
+            job['last_result'] = json.loads(job['last_result']) if job['last_result'] else None
+            jobs[job.pop('name')] = job
+        return jobs
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'purge_tombstones')
+def purge_tombstones(older_than_days, limit, shard=0):
+    """
+    Delete up to limit delete tombstones older than older_than_days from one shard
+
+    Each affected vault's pruned_revision is raised to the newest revision purged, so
+    clients that last synced before it get a full resync rather than missing deletes.
+
+    Returns:
+        int: Tombstones deleted
+    """
+    conn = _shard_pool(shard).acquire()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute(
+            "SELECT id, user_id, revision FROM password_tombstones WHERE deleted_at < datetime('now', ?) "
+            "ORDER BY deleted_at LIMIT ?",
+            (f'-{float(older_than_days)} days', limit)
+        )
+        rows = cursor.fetchall()
+        pruned = {}
+        for row in rows:
+            pruned[row['user_id']] = max(pruned.get(row['user_id'], 0), row['revision'])
+        cursor.executemany(
+            'UPDATE vault_revisions SET pruned_revision = MAX(pruned_revision, ?) WHERE user_id = ?',
+            [(revision, user_id) for user_id, revision in pruned.items()]
+        )
+        cursor.executemany('DELETE FROM password_tombstones WHERE id = ?', [(row['id'],) for row in rows])
+        conn.commit()
+        return len(rows)
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'optimize_database')
+def optimize_database(analysis_limit, shard=0):
+    """Run PRAGMA optimize, refreshing planner statistics where they are stale"""
+    conn = _shard_pool(shard).acquire()
+    try:
+        # analysis_limit bounds how many rows ANALYZE samples per index, keeping the run short
+        conn.execute(f'PRAGMA analysis_limit = {int(analysis_limit)}')
+        conn.execute('PRAGMA optimize')
+        conn.commit()
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'analyze_database')
+def analyze_database(shard=0):
+    """Run a full ANALYZE over every table and index"""
+    conn = _shard_pool(shard).acquire()
+    try:
+        conn.execute('PRAGMA analysis_limit = 0')
+        conn.execute('ANALYZE')
+        conn.commit()
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'get_storage_stats')
+def get_storage_stats(shard=0):
+    """Get page counts and the auto_vacuum mode of a shard's database file"""
+    conn = _shard_pool(shard).acquire()
+    try:
+        mode = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        return {
+            'auto_vacuum': {0: 'NONE', 1: 'FULL', 2: 'INCREMENTAL'}.get(mode, str(mode)),
+            'page_size': conn.execute('PRAGMA page_size').fetchone()[0],
+            'page_count': conn.execute('PRAGMA page_count').fetchone()[0],
+            'freelist_count': conn.execute('PRAGMA freelist_count').fetchone()[0],
+        }
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'incremental_vacuum')
+def incremental_vacuum(pages, shard=0):
+    """Return up to pages free pages to the filesystem; returns how many were freed"""
+    conn = _shard_pool(shard).acquire()
+    try:
+        before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        # The pragma frees one page per VM step and the cursor API stops after the first;
+        # executescript runs it to completion
+        conn.executescript(f'PRAGMA incremental_vacuum({int(pages)})')
+        return before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'enable_incremental_vacuum')
+def enable_incremental_vacuum(shard=0):
+    """Switch an existing database to auto_vacuum=INCREMENTAL (rewrites the whole file with VACUUM)"""
+    conn = _shard_pool(shard).acquire()
+    try:
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'checkpoint_wal')
+def checkpoint_wal(mode='PASSIVE', shard=0):
+    """Copy WAL frames back into the database file"""
+    conn = _shard_pool(shard).acquire()
+    try:
+        busy, log_frames, checkpointed = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+        return {'busy': bool(busy), 'wal_frames': log_frames, 'checkpointed_frames': checkpointed}
+    finally:
+        release_db_connection(conn)
+
+# Shard operations
+# Tables holding per-user vault data, in the order a move copies them (deleting from
+# passwords writes tombstones and bumps the revision, so those tables are cleared after it)
+_SHARD_TABLES = ('passwords', 'password_tombstones', 'vault_keys', 'recovery_keys', 'vault_revisions')
+
+@timed(db_call_duration, 'get_user_shards')
+def get_user_shards(after_id=0, limit=1000):
+    """Get (id, shard) of the next batch of users in ID order"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, shard FROM users WHERE id > ? ORDER BY id LIMIT ?', (after_id, limit))
+        return cursor.fetchall()
+    finally:
+        release_db_connection(conn)
+
+@timed(db_call_duration, 'move_user_to_shard')
+def move_user_to_shard(user_id, target):
+    """
+    Move a user's vault data to another shard
+    
+    The data is copied to the target, the users directory is repointed, and then the old
+    copy is deleted, each step in its own transaction. Entries keep their IDs. Rerunning
+    an interrupted move is safe: whatever an earlier attempt left in the target is
+    replaced. Workers cache where users live, so run this while the app is stopped.
+    
+    Returns:
+        int: Entries moved (0 if the user was already on the target), or None if there is no such user
+    """
+    conn = get_db_connection()
+    try:
+        row = conn.execute('SELECT shard FROM users WHERE id = ?', (user_id,)).fetchone()
+    finally:
+        release_db_connection(conn)
+    if row is None:
+        return None
+    source = row['shard']
+    if source == target:
+        return 0
+    
+    source_conn = _shard_pool(source).acquire()
+    target_conn = _shard_pool(target).acquire()
+    try:
+        # Hold the source's write lock while copying so its rows can't change underneath
+        source_conn.execute('BEGIN IMMEDIATE')
+        rows = {table: source_conn.execute(f'SELECT * FROM {table} WHERE user_id = ?', (user_id,)).fetchall()
+                for table in _SHARD_TABLES}
+        
+        target_conn.execute('BEGIN IMMEDIATE')
+        for table in _SHARD_TABLES:
+            target_conn.execute(f'DELETE FROM {table} WHERE user_id = ?', (user_id,))
+        for table in _SHARD_TABLES:
+            if not rows[table]:
+                continue
+            columns = list(rows[table][0].keys())
+            if table == 'recovery_keys':
+                # Its surrogate ID isn't referenced anywhere; let the target assign one
+                columns.remove('id')
+            if table == 'vault_revisions':
+                # Bump past the source revision so cached listings (ETags) are refetched;
+                # entries keep their own revisions, so clients' sync positions stay valid
+                target_conn.execute(
+                    '''INSERT INTO vault_revisions (user_id, revision, pruned_revision) VALUES (?, ?, ?)
+                       ON CONFLICT (user_id) DO UPDATE SET revision = excluded.revision,
+                                                           pruned_revision = excluded.pruned_revision''',
+                    (user_id, rows[table][0]['revision'] + 1, rows[table][0]['pruned_revision'])
+                )
+                continue
+            target_conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [tuple(row[column] for column in columns) for row in rows[table]]
+            )
+        
+        # Shard 0 shares its file with the users directory, and the transaction already
+        # open on it must make the directory change too (the file has a single writer)
+        if target == 0:
+            target_conn.execute('UPDATE users SET shard = ? WHERE id = ?', (target, user_id))
+        target_conn.commit()
+        if source != 0 and target != 0:
+            conn = get_db_connection()
+            try:
+                conn.execute('UPDATE users SET shard = ? WHERE id = ?', (target, user_id))
+                conn.commit()
+            finally:
+                release_db_connection(conn)
+        
+        for table in _SHARD_TABLES:
+            source_conn.execute(f'DELETE FROM {table} WHERE user_id = ?', (user_id,))
+        if source == 0:
+            source_conn.execute('UPDATE users SET shard = ? WHERE id = ?', (target, user_id))
+        source_conn.commit()
+        _shard_routes.set(user_id, target)
+        invalidate_user_cache(user_id)
+        return len(rows['passwords'])
+    except Exception:
+        target_conn.rollback()
+        source_conn.rollback()
+        raise
+    finally:
+        release_db_connection(target_conn)
+        release_db_connection(source_conn)
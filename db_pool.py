@@ -0,0 +1,127 @@
+"""
+SQLite connection pool for SecurePass.
+Keeps a bounded set of long-lived, pre-configured connections per worker process
+so request handlers don't pay the connect/PRAGMA cost on every query.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+# Pool configuration - tuned for a handful of gunicorn workers sharing one database file
+POOL_CONFIG = {
+    'max_connections': int(os.environ.get('DB_POOL_SIZE', 8)),
+    'acquire_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    'busy_timeout_ms': int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000)),
+    'synchronous': os.environ.get('DB_SYNCHRONOUS', 'NORMAL').upper(),
+    'mmap_size': int(os.environ.get('DB_MMAP_SIZE', 64 * 1024 * 1024)),
+    'cache_size_kib': int(os.environ.get('DB_CACHE_SIZE_KIB', 8192)),
+    'statement_cache_size': int(os.environ.get('DB_STATEMENT_CACHE_SIZE', 256)),
+}
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that remembers which pool it belongs to"""
+    pool = None
+
+
+class ConnectionPool:
+    def __init__(self, db_path, max_connections=None, acquire_timeout=None):
+        self.db_path = db_path
+        self.max_connections = max_connections or POOL_CONFIG['max_connections']
+        self.acquire_timeout = acquire_timeout if acquire_timeout is not None else POOL_CONFIG['acquire_timeout']
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        """Forget all connections (used on first use and after a fork)"""
+        # Connections must never be shared across processes, so a forked child
+        # simply drops the parent's handles and opens its own.
+        self._pid = os.getpid()
+        self._idle = []
+        self._in_use = 0
+        self._stats = {'opens': 0, 'acquires': 0, 'waits': 0, 'wait_time': 0.0, 'timeouts': 0, 'discards': 0}
+
+    def _open(self):
+        """Open and configure a new connection"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=POOL_CONFIG['busy_timeout_ms'] / 1000.0,
+            check_same_thread=False,
+            cached_statements=POOL_CONFIG['statement_cache_size'],
+            factory=PooledConnection,
+        )
+        conn.pool = self
+        conn.row_factory = sqlite3.Row  # This allows us to access columns by name
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute(f"PRAGMA synchronous = {POOL_CONFIG['synchronous']}")
+        conn.execute(f"PRAGMA busy_timeout = {POOL_CONFIG['busy_timeout_ms']}")
+        conn.execute(f"PRAGMA mmap_size = {POOL_CONFIG['mmap_size']}")
+        conn.execute(f"PRAGMA cache_size = -{POOL_CONFIG['cache_size_kib']}")
+        conn.execute('PRAGMA temp_store = MEMORY')
+        self._stats['opens'] += 1
+        return conn
+
+    def acquire(self):
+        """Check out a connection, opening one if the pool has room"""
+        with self._cond:
+            if self._pid != os.getpid():
+                self._reset()
+
+            self._stats['acquires'] += 1
+            if not self._idle and self._in_use >= self.max_connections:
+                self._stats['waits'] += 1
+                started = time.monotonic()
+                deadline = started + self.acquire_timeout
+                while not self._idle and self._in_use >= self.max_connections:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(f"No database connection available after {self.acquire_timeout}s")
+                    self._cond.wait(remaining)
+                self._stats['wait_time'] += time.monotonic() - started
+
+            self._in_use += 1
+            if self._idle:
+                # LIFO so a single-threaded worker keeps reusing the same warm connection
+                return self._idle.pop()
+
+        try:
+            return self._open()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn):
+        """Return a connection to the pool"""
+        with self._cond:
+            if self._pid != os.getpid():
+                # Checked out before a fork; the pool was already reset
+                return
+            self._in_use -= 1
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append(conn)
+            except sqlite3.Error:
+                self._stats['discards'] += 1
+            self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._idle = []
+
+    def stats(self):
+        """Return a snapshot of pool usage counters"""
+        with self._cond:
+            return dict(self._stats, in_use=self._in_use, idle=len(self._idle), max_connections=self.max_connections)
@@ -0,0 +1,174 @@
+"""
+Email outbox for SecurePass.
+Requests only queue messages in the email_outbox table; a background sender thread
+in each worker claims due messages, delivers them over a reused, authenticated SMTP
+connection and records the outcome, retrying failures with exponential backoff.
+"""
+
+import os
+import threading
+import time
+
+from database import enqueue_email, claim_due_emails, mark_email_sent, mark_email_failed
+from metrics import smtp_send_duration
+
+# Outbox delivery configuration
+OUTBOX_CONFIG = {
+    'batch_size': int(os.environ.get('EMAIL_BATCH_SIZE', 20)),
+    'poll_interval': float(os.environ.get('EMAIL_POLL_INTERVAL', 5)),
+    'max_attempts': int(os.environ.get('EMAIL_MAX_ATTEMPTS', 5)),
+    'retry_base_delay': float(os.environ.get('EMAIL_RETRY_BASE_DELAY', 30)),
+    'retry_max_delay': float(os.environ.get('EMAIL_RETRY_MAX_DELAY', 3600)),
+    'smtp_timeout': float(os.environ.get('SMTP_TIMEOUT', 15)),
+    'smtp_idle_timeout': float(os.environ.get('SMTP_IDLE_TIMEOUT', 60)),
+    'claim_lease': float(os.environ.get('EMAIL_CLAIM_LEASE', 300)),
+}
+
+
+class SMTPConnection:
+    """A lazily opened SMTP session that is kept open between messages"""
+
+    def __init__(self, email_config):
+        self.email_config = email_config
+        self._server = None
+        self._last_used = 0.0
+        self.opens = 0
+
+    def _connect(self):
+        # smtplib and the email package load on first delivery, not at worker startup
+        import smtplib
+        server = smtplib.SMTP(self.email_config['smtp_server'], self.email_config['smtp_port'],
+                              timeout=OUTBOX_CONFIG['smtp_timeout'])
+        if self.email_config['use_tls']:
+            server.starttls()
+        if self.email_config['sender_password']:
+            server.login(self.email_config['sender_email'], self.email_config['sender_password'])
+        self.opens += 1
+        return server
+
+    def get(self):
+        """Get a live, authenticated server connection, reconnecting if needed"""
+        if self._server is not None:
+            import smtplib
+            idle = time.monotonic() - self._last_used
+            try:
+                # Servers drop idle sessions; probe before reusing one that sat around
+                if idle > OUTBOX_CONFIG['smtp_idle_timeout'] or self._server.noop()[0] != 250:
+                    self.close()
+            except smtplib.SMTPException:
+                self.close()
+            except OSError:
+                self.close()
+        if self._server is None:
+            self._server = self._connect()
+        self._last_used = time.monotonic()
+        return self._server
+
+    def close_if_idle(self):
+        """Close the session once it has gone unused for the idle timeout"""
+        if self._server is not None and time.monotonic() - self._last_used > OUTBOX_CONFIG['smtp_idle_timeout']:
+            self.close()
+
+    def close(self):
+        """Close the session if one is open"""
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+
+class EmailOutbox:
+    def __init__(self, email_config):
+        self.email_config = email_config
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._connection = SMTPConnection(email_config)
+        self._stats = {'sent': 0, 'retried': 0, 'failed': 0, 'batches': 0}
+
+    def enqueue(self, recipient, subject, body_text, body_html=None):
+        """
+        Queue an email for delivery and wake the sender
+
+        Returns:
+            int: The outbox row ID
+        """
+        email_id = enqueue_email(recipient, subject, body_text, body_html)
+        self.start()
+        self._wakeup.set()
+        return email_id
+
+    def start(self):
+        """Start the background sender for this worker process if it isn't running"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+            self._thread.start()
+
+    def _build_message(self, row):
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        message = MIMEMultipart("alternative")
+        message["Subject"] = row['subject']
+        message["From"] = self.email_config['sender_email']
+        message["To"] = row['recipient']
+        message.attach(MIMEText(row['body_text'], "plain"))
+        if row['body_html']:
+            message.attach(MIMEText(row['body_html'], "html"))
+        return message.as_string()
+
+    def _retry_at(self, attempts):
+        """Exponential backoff for the next attempt, or None once attempts are exhausted"""
+        if attempts >= OUTBOX_CONFIG['max_attempts']:
+            return None
+        delay = OUTBOX_CONFIG['retry_base_delay'] * (2 ** (attempts - 1))
+        return time.time() + min(delay, OUTBOX_CONFIG['retry_max_delay'])
+
+    def send_due(self):
+        """Deliver one batch of due emails; returns how many were claimed"""
+        connection = self._connection
+        rows = claim_due_emails(time.time(), OUTBOX_CONFIG['claim_lease'], OUTBOX_CONFIG['batch_size'])
+        if not rows:
+            return 0
+        self._stats['batches'] += 1
+
+        for row in rows:
+            started = time.perf_counter()
+            try:
+                server = connection.get()
+                server.sendmail(self.email_config['sender_email'], row['recipient'], self._build_message(row))
+                smtp_send_duration.observe(time.perf_counter() - started, 'sent')
+                mark_email_sent(row['id'])
+                self._stats['sent'] += 1
+                print(f"Email {row['id']} sent to {row['recipient']}")
+            except Exception as e:
+                smtp_send_duration.observe(time.perf_counter() - started, 'error')
+                # Drop the session; it may be in an unknown state after an error
+                connection.close()
+                retry_at = self._retry_at(row['attempts'] + 1)
+                mark_email_failed(row['id'], str(e), retry_at)
+                self._stats['retried' if retry_at else 'failed'] += 1
+                print(f"Error sending email {row['id']} to {row['recipient']}: {e}")
+        return len(rows)
+
+    def _run(self):
+        while True:
+            try:
+                # Keep draining while full batches come back
+                while self.send_due() >= OUTBOX_CONFIG['batch_size']:
+                    pass
+            except Exception as e:
+                print(f"Email outbox error: {e}")
+
+            self._wakeup.wait(OUTBOX_CONFIG['poll_interval'])
+            self._wakeup.clear()
+            self._connection.close_if_idle()
+
+    def stats(self):
+        """Return delivery counters for this worker"""
+        return dict(self._stats, smtp_connections_opened=self._connection.opens)
@@ -1,14 +1,21 @@
 """
 Python encryption helper for SecurePass Password Manager
 This script provides additional encryption functionality that can be used alongside the Chrome extension.
+cryptography is imported by the methods that use it, so importing this module (and
+starting a worker) doesn't load it before the first encryption.
 """
 
 import hashlib
+import hmac
 import secrets
 import base64
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+import password_hashing
+from kdf_service import kdf_service
+
+# Entry format written by encrypt_entry; entries without a version are legacy
+# per-entry-salt Fernet tokens produced by encrypt_password
+ENTRY_FORMAT_VERSION = 2
 
 class PasswordEncryption:
     def __init__(self):
@@ -19,20 +26,20 @@ class PasswordEncryption:
         return secrets.token_bytes(16)
     
     def derive_key(self, master_password, salt):
-        """Derive a key from the master password and salt using PBKDF2"""
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(master_password.encode()))
+        """Derive a key from the master password and salt using PBKDF2 (runs in the KDF pool)"""
+        derived = kdf_service.pbkdf2(master_password.encode(), salt, 100000, length=32, hash_name='sha256')
+        key = base64.urlsafe_b64encode(derived)
         return key
     
     def encrypt_password(self, password, master_password):
         """Encrypt a password using the master password"""
         salt = self.generate_salt()
         key = self.derive_key(master_password, salt)
+        return self.encrypt_with_key(password, key, salt)
+    
+    def encrypt_with_key(self, password, key, salt):
+        """Encrypt a password with an already derived key (no KDF run)"""
+        from cryptography.fernet import Fernet
         f = Fernet(key)
         encrypted_password = f.encrypt(password.encode())
         
@@ -42,12 +49,19 @@ class PasswordEncryption:
             'encrypted_password': base64.b64encode(encrypted_password).decode()
         }
     
+    def get_salt(self, encrypted_data):
+        """Get the key derivation salt an encrypted entry was written with"""
+        return base64.b64decode(encrypted_data['salt'])
+    
     def decrypt_password(self, encrypted_data, master_password):
         """Decrypt a password using the master password"""
-        salt = base64.b64decode(encrypted_data['salt'])
+        key = self.derive_key(master_password, self.get_salt(encrypted_data))
+        return self.decrypt_with_key(encrypted_data, key)
+    
+    def decrypt_with_key(self, encrypted_data, key):
+        """Decrypt a password with an already derived key (no KDF run)"""
+        from cryptography.fernet import Fernet
         encrypted_password = base64.b64decode(encrypted_data['encrypted_password'])
-        
-        key = self.derive_key(master_password, salt)
         f = Fernet(key)
         
         try:
@@ -56,22 +70,99 @@ class PasswordEncryption:
         except Exception as e:
             raise ValueError("Decryption failed. Invalid master password or corrupted data.")
     
-    def hash_master_password(self, master_password):
-        """Hash the master password for verification"""
+    def generate_vault_key(self):
+        """Generate a random 256-bit vault data key"""
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        return AESGCM.generate_key(bit_length=256)
+    
+    def wrap_vault_key(self, vault_key, master_password):
+        """Encrypt the vault data key under a key derived from the master password (one KDF run)"""
+        from cryptography.fernet import Fernet
         salt = self.generate_salt()
         key = self.derive_key(master_password, salt)
-        
-        # Return salt and key as a single string separated by a delimiter
-        return base64.b64encode(salt).decode() + ":" + base64.b64encode(key).decode()
+        return {
+            'salt': base64.b64encode(salt).decode(),
+            'wrapped_key': Fernet(key).encrypt(bytes(vault_key)).decode()
+        }
+    
+    def unwrap_vault_key(self, wrapped, master_password):
+        """Recover the vault data key with the master password (one KDF run)"""
+        from cryptography.fernet import Fernet
+        key = self.derive_key(master_password, base64.b64decode(wrapped['salt']))
+        try:
+            return Fernet(key).decrypt(wrapped['wrapped_key'].encode())
+        except Exception as e:
+            raise ValueError("Unwrapping failed. Invalid master password or corrupted key.")
+    
+    def seal_session_key(self, vault_key, handle):
+        """Encrypt the vault data key under a key derived from an unlocked session's handle (no KDF run)"""
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        nonce = secrets.token_bytes(12)
+        ciphertext = AESGCM(self._session_key(handle)).encrypt(nonce, bytes(vault_key), b"securepass:vault-session")
+        return base64.b64encode(nonce + ciphertext).decode()
+    
+    def open_session_key(self, sealed, handle):
+        """Recover a vault data key sealed with seal_session_key"""
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        data = base64.b64decode(sealed)
+        try:
+            return AESGCM(self._session_key(handle)).decrypt(data[:12], data[12:], b"securepass:vault-session")
+        except Exception as e:
+            raise ValueError("Opening the session key failed. Wrong handle or corrupted data.")
+    
+    def _session_key(self, handle):
+        return hmac.new(handle.encode(), b"securepass:vault-session-key", hashlib.sha256).digest()
+    
+    def is_legacy_entry(self, encrypted_data):
+        """Check whether an entry still uses the per-entry-salt format"""
+        return encrypted_data.get('v') != ENTRY_FORMAT_VERSION
+    
+    def entry_associated_data(self, user_id):
+        """Authenticated data binding an entry to its owner, so rows can't be swapped between users"""
+        return f"securepass:user:{user_id}".encode()
+    
+    def encrypt_entry(self, password, vault_key, associated_data):
+        """Encrypt a password with the vault data key using AES-256-GCM (no KDF run)"""
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        nonce = secrets.token_bytes(12)
+        ciphertext = AESGCM(bytes(vault_key)).encrypt(nonce, password.encode(), associated_data)
+        return {
+            'v': ENTRY_FORMAT_VERSION,
+            'nonce': base64.b64encode(nonce).decode(),
+            'ct': base64.b64encode(ciphertext).decode()
+        }
+    
+    def decrypt_entry(self, encrypted_data, vault_key, associated_data):
+        """Decrypt a password encrypted with encrypt_entry (no KDF run)"""
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        if encrypted_data.get('v') != ENTRY_FORMAT_VERSION:
+            raise ValueError("Unsupported entry format version.")
+        nonce = base64.b64decode(encrypted_data['nonce'])
+        ciphertext = base64.b64decode(encrypted_data['ct'])
+        try:
+            return AESGCM(bytes(vault_key)).decrypt(nonce, ciphertext, associated_data).decode()
+        except Exception as e:
+            raise ValueError("Decryption failed. Invalid vault key or corrupted data.")
+    
+    def fingerprint_key(self, vault_key):
+        """Derive the user's password-fingerprint key from their vault data key"""
+        return hmac.new(bytes(vault_key), b"securepass:fingerprint", hashlib.sha256).digest()
+    
+    def fingerprint(self, password, fingerprint_key):
+        """Keyed fingerprint of a plaintext password; equal passwords in one vault match, nothing else is revealed"""
+        return hmac.new(fingerprint_key, password.encode(), hashlib.sha256).digest()[:16]
+    
+    def hash_master_password(self, master_password):
+        """Hash the master password for verification (self-describing format, see password_hashing)"""
+        return password_hashing.hash_password(master_password)
     
     def verify_master_password(self, master_password, stored_hash):
-        """Verify a master password against stored hash"""
-        # Split the stored hash to get salt and hash
-        salt_str, hash_str = stored_hash.split(":")
-        salt = base64.b64decode(salt_str)
-        key = self.derive_key(master_password, salt)
-        
-        return base64.b64encode(key).decode() == hash_str
+        """Verify a master password against stored hash (constant-time; legacy salt:key hashes too)"""
+        return password_hashing.verify_password(master_password, stored_hash)
+    
+    def master_hash_needs_rehash(self, stored_hash):
+        """True if a stored hash predates the current algorithm or cost settings"""
+        return password_hashing.needs_rehash(stored_hash)
 
 # Example usage
 if __name__ == "__main__":
@@ -96,4 +187,11 @@ if __name__ == "__main__":
     
     # Verify the master password
     is_valid = encryptor.verify_master_password(master_password, master_hash)
-    print("Master password is valid:", is_valid)
\ No newline at end of file
+    print("Master password is valid:", is_valid)
+    
+    # Envelope encryption: one KDF run unwraps the vault key, entries need none
+    vault_key = encryptor.generate_vault_key()
+    wrapped = encryptor.wrap_vault_key(vault_key, master_password)
+    entry = encryptor.encrypt_entry(password, encryptor.unwrap_vault_key(wrapped, master_password), b"example")
+    print("Vault entry:", entry)
+    print("Decrypted vault entry:", encryptor.decrypt_entry(entry, vault_key, b"example"))
\ No newline at end of file
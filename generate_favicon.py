@@ -7,8 +7,11 @@ This script generates favicon files from SVG.
 import os
 from pathlib import Path
 
-def create_favicon_ico():
-    """Create a favicon.ico file using PIL/Pillow"""
+DEFAULT_FAVICON_PATH = Path(__file__).resolve().parent / 'static' / 'images' / 'favicon.ico'
+
+def create_favicon_ico(favicon_path=DEFAULT_FAVICON_PATH):
+    """Create a favicon.ico file using PIL/Pillow (also run by `manage.py build-assets`)"""
+    favicon_path = Path(favicon_path)
     try:
         from PIL import Image, ImageDraw
         
@@ -26,7 +29,6 @@ def create_favicon_ico():
         draw.ellipse([22, 6, 24, 8], fill=(187, 134, 252, 255))
         
         # Save as ICO
-        favicon_path = Path('static/images/favicon.ico')
         favicon_path.parent.mkdir(parents=True, exist_ok=True)
         
         # Create multiple sizes for ICO
@@ -75,7 +77,6 @@ def create_favicon_ico():
             b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
         )
         
-        favicon_path = Path('static/images/favicon.ico')
         favicon_path.parent.mkdir(parents=True, exist_ok=True)
         
         with open(favicon_path, 'wb') as f:
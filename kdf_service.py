@@ -0,0 +1,161 @@
+"""
+KDF execution service for SecurePass.
+Runs password-based key derivation in a bounded pool of worker processes so the
+expensive hashing spreads across cores and never blocks an HTTP worker's own thread.
+When too many derivations are already queued, new ones are rejected immediately
+instead of piling up behind the backlog.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics import kdf_duration
+
+# KDF pool configuration (KDF_POOL_SIZE=0 runs derivations inline in the calling thread)
+KDF_CONFIG = {
+    'pool_size': int(os.environ.get('KDF_POOL_SIZE', 2)),
+    'max_pending': int(os.environ.get('KDF_MAX_PENDING', 8)),
+    'timeout': float(os.environ.get('KDF_TIMEOUT', 10)),
+}
+
+
+class KDFBusyError(Exception):
+    """Raised when the KDF pool is saturated or a derivation takes too long"""
+
+
+def _pbkdf2(password, salt, iterations, length, hash_name):
+    """Runs inside a pool process; kept at module level so it can be pickled"""
+    return hashlib.pbkdf2_hmac(hash_name, password, salt, iterations, length)
+
+
+def _scrypt(password, salt, n, r, p, length):
+    """Runs inside a pool process; kept at module level so it can be pickled"""
+    # hashlib's default memory cap (32 MiB) is below what common parameters need
+    maxmem = 128 * r * (n + p + 2) + 1024 * 1024
+    return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=length)
+
+
+class KDFService:
+    def __init__(self, pool_size=None, max_pending=None, timeout=None):
+        self.pool_size = pool_size if pool_size is not None else KDF_CONFIG['pool_size']
+        self.max_pending = max_pending if max_pending is not None else KDF_CONFIG['max_pending']
+        self.timeout = timeout if timeout is not None else KDF_CONFIG['timeout']
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._pid = None
+        self._stats = {'completed': 0, 'rejected': 0, 'timeouts': 0, 'failures': 0,
+                       'total_seconds': 0.0, 'max_seconds': 0.0}
+        self._pending = 0
+
+    def _get_executor(self):
+        """Create the process pool lazily, once per worker process"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # Not 'fork': by now this process runs the outbox, maintenance and ASGI
+                # threads and holds pooled SQLite connections, and forking a threaded
+                # process can deadlock the child. The fork server starts clean and hands
+                # out children that only ever run hashlib.
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.pool_size,
+                    mp_context=multiprocessing.get_context(method),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _record(self, stat, elapsed=None):
+        with self._lock:
+            self._stats[stat] += 1
+            if elapsed is not None:
+                self._stats['total_seconds'] += elapsed
+                self._stats['max_seconds'] = max(self._stats['max_seconds'], elapsed)
+
+    def _run(self, fn, algorithm, *args):
+        if not self._slots.acquire(blocking=False):
+            self._record('rejected')
+            kdf_duration.observe(0.0, algorithm, 'rejected')
+            raise KDFBusyError("Too many key derivations in progress")
+
+        with self._lock:
+            self._pending += 1
+        started = time.monotonic()
+        try:
+            if self.pool_size <= 0:
+                result = fn(*args)
+            else:
+                result = self._get_executor().submit(fn, *args).result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._record('timeouts')
+            kdf_duration.observe(time.monotonic() - started, algorithm, 'timeout')
+            raise KDFBusyError(f"Key derivation did not finish within {self.timeout}s")
+        except BrokenProcessPool:
+            # A pool process died; start a fresh pool on the next call
+            with self._lock:
+                self._executor = None
+            self._record('failures')
+            kdf_duration.observe(time.monotonic() - started, algorithm, 'error')
+            raise KDFBusyError("Key derivation pool restarted")
+        except Exception:
+            self._record('failures')
+            kdf_duration.observe(time.monotonic() - started, algorithm, 'error')
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+
+        elapsed = time.monotonic() - started
+        self._record('completed', elapsed)
+        kdf_duration.observe(elapsed, algorithm, 'ok')
+        return result
+
+    def pbkdf2(self, password, salt, iterations, length=32, hash_name='sha256'):
+        """
+        Derive a key with PBKDF2-HMAC
+
+        Args:
+            password (bytes): The secret to stretch
+            salt (bytes): The salt
+            iterations (int): PBKDF2 iteration count
+            length (int): Output length in bytes
+            hash_name (str): Underlying hash for HMAC
+
+        Returns:
+            bytes: The derived key
+        """
+        return self._run(_pbkdf2, f'pbkdf2-{hash_name}', password, salt, iterations, length, hash_name)
+
+    def scrypt(self, password, salt, n, r, p, length=32):
+        """
+        Derive a key with scrypt
+
+        Args:
+            password (bytes): The secret to stretch
+            salt (bytes): The salt
+            n (int): CPU/memory cost (a power of two)
+            r (int): Block size
+            p (int): Parallelisation
+            length (int): Output length in bytes
+
+        Returns:
+            bytes: The derived key
+        """
+        return self._run(_scrypt, 'scrypt', password, salt, n, r, p, length)
+
+    def stats(self):
+        """Return derivation counters and timings for this worker"""
+        with self._lock:
+            stats = dict(self._stats, pending=self._pending, pool_size=self.pool_size,
+                         max_pending=self.max_pending)
+        stats['avg_seconds'] = stats['total_seconds'] / stats['completed'] if stats['completed'] else 0.0
+        return stats
+
+
+# Shared service used by PasswordEncryption
+kdf_service = KDFService()
@@ -0,0 +1,216 @@
+"""
+Background database maintenance for SecurePass.
+Every worker runs a scheduler thread, but each job is guarded by a lease row in the
+maintenance_jobs table, so only one process runs a given job at a time and a job
+whose runner died is picked up elsewhere once its lease lapses. Jobs work in small
+steps and stop at their time budget, leaving the rest for the next run, so they
+never hold the write lock long enough to stall requests.
+"""
+
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+from database import (purge_reset_tokens, purge_rate_limits, purge_tombstones, purge_vault_sessions, optimize_database,
+                      get_storage_stats, incremental_vacuum, checkpoint_wal, claim_maintenance_job, finish_maintenance_job, get_maintenance_jobs, get_shards)
+from metrics import histogram
+from rate_limit import max_refill_seconds
+
+MAINTENANCE_CONFIG = {
+    'enabled': os.environ.get('MAINTENANCE_ENABLED', 'True').lower() == 'true',
+    'poll_interval': float(os.environ.get('MAINTENANCE_POLL_INTERVAL', 60)),
+    'time_budget': float(os.environ.get('MAINTENANCE_TIME_BUDGET', 0.5)),
+    'lease': float(os.environ.get('MAINTENANCE_LEASE', 300)),
+    'token_batch_size': int(os.environ.get('MAINTENANCE_TOKEN_BATCH_SIZE', 500)),
+    'vacuum_step_pages': int(os.environ.get('MAINTENANCE_VACUUM_STEP_PAGES', 256)),
+    'analysis_limit': int(os.environ.get('MAINTENANCE_ANALYSIS_LIMIT', 400)),
+    'checkpoint_mode': os.environ.get('MAINTENANCE_CHECKPOINT_MODE', 'PASSIVE').upper(),
+    # Sync clients that stay away longer than this get a full resync instead of the deletes they missed
+    'tombstone_retention_days': float(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', 90)),
+}
+
+maintenance_job_duration = histogram(
+    'securepass_maintenance_job_duration_seconds', 'Maintenance job run time', ['job', 'outcome'])
+
+
+def purge_tokens_job(deadline):
+    """Delete expired and used password reset tokens in small batches"""
+    deleted = batches = 0
+    while time.monotonic() < deadline:
+        count = purge_reset_tokens(datetime.now(), MAINTENANCE_CONFIG['token_batch_size'])
+        deleted += count
+        batches += 1
+        if count < MAINTENANCE_CONFIG['token_batch_size']:
+            return {'deleted': deleted, 'batches': batches, 'complete': True}
+    return {'deleted': deleted, 'batches': batches, 'complete': False}
+
+
+def purge_rate_limits_job(deadline):
+    """Delete rate limit buckets that have been idle long enough to be full again"""
+    idle_before = time.time() - max_refill_seconds()
+    deleted = batches = 0
+    while time.monotonic() < deadline:
+        count = purge_rate_limits(idle_before, MAINTENANCE_CONFIG['token_batch_size'])
+        deleted += count
+        batches += 1
+        if count < MAINTENANCE_CONFIG['token_batch_size']:
+            return {'deleted': deleted, 'batches': batches, 'complete': True}
+    return {'deleted': deleted, 'batches': batches, 'complete': False}
+
+
+def purge_vault_sessions_job(deadline):
+    """Delete unlocked-vault sessions past their idle or absolute expiry"""
+    now = time.time()
+    deleted = batches = 0
+    while time.monotonic() < deadline:
+        count = purge_vault_sessions(now, MAINTENANCE_CONFIG['token_batch_size'])
+        deleted += count
+        batches += 1
+        if count < MAINTENANCE_CONFIG['token_batch_size']:
+            return {'deleted': deleted, 'batches': batches, 'complete': True}
+    return {'deleted': deleted, 'batches': batches, 'complete': False}
+
+
+def purge_tombstones_job(deadline):
+    """Delete sync tombstones of entries deleted longer ago than the retention period"""
+    batch_size = MAINTENANCE_CONFIG['token_batch_size']
+    deleted = batches = 0
+    for shard in get_shards():
+        while time.monotonic() < deadline:
+            count = purge_tombstones(MAINTENANCE_CONFIG['tombstone_retention_days'], batch_size, shard)
+            deleted += count
+            batches += 1
+            if count < batch_size:
+                break
+        else:
+            return {'deleted': deleted, 'batches': batches, 'complete': False}
+    return {'deleted': deleted, 'batches': batches, 'complete': True}
+
+
+def optimize_job(deadline):
+    """Refresh query planner statistics with PRAGMA optimize"""
+    shards = get_shards()
+    for shard in shards:
+        optimize_database(MAINTENANCE_CONFIG['analysis_limit'], shard)
+    return {'analysis_limit': MAINTENANCE_CONFIG['analysis_limit'], 'shards': len(shards)}
+
+
+def _vacuum_shard(shard, deadline):
+    storage = get_storage_stats(shard)
+    if storage['auto_vacuum'] != 'INCREMENTAL':
+        return {'skipped': f"auto_vacuum is {storage['auto_vacuum']}", 'freelist_count': storage['freelist_count']}
+    freed = 0
+    while time.monotonic() < deadline:
+        step = incremental_vacuum(MAINTENANCE_CONFIG['vacuum_step_pages'], shard)
+        freed += step
+        if step < MAINTENANCE_CONFIG['vacuum_step_pages']:
+            break
+    return {'freed_pages': freed, 'freelist_count': get_storage_stats(shard)['freelist_count']}
+
+
+def vacuum_job(deadline):
+    """Return free pages to the filesystem a few at a time"""
+    shards = get_shards()
+    if len(shards) == 1:
+        return _vacuum_shard(0, deadline)
+    # One time budget covers every shard; later shards get whatever earlier ones leave
+    return {f"shard_{shard}": _vacuum_shard(shard, deadline) for shard in shards}
+
+
+def checkpoint_job(deadline):
+    """Checkpoint the WAL so it doesn't keep growing between automatic checkpoints"""
+    shards = get_shards()
+    if len(shards) == 1:
+        return checkpoint_wal(MAINTENANCE_CONFIG['checkpoint_mode'])
+    return {f"shard_{shard}": checkpoint_wal(MAINTENANCE_CONFIG['checkpoint_mode'], shard) for shard in shards}
+
+
+# name -> (job function, seconds between runs)
+JOBS = {
+    'purge_reset_tokens': (purge_tokens_job, float(os.environ.get('MAINTENANCE_TOKEN_INTERVAL', 15 * 60))),
+    'purge_rate_limits': (purge_rate_limits_job, float(os.environ.get('MAINTENANCE_RATE_LIMIT_INTERVAL', 15 * 60))),
+    'purge_vault_sessions': (purge_vault_sessions_job, float(os.environ.get('MAINTENANCE_VAULT_SESSION_INTERVAL', 15 * 60))),
+    'purge_tombstones': (purge_tombstones_job, float(os.environ.get('MAINTENANCE_TOMBSTONE_INTERVAL', 60 * 60))),
+    'optimize': (optimize_job, float(os.environ.get('MAINTENANCE_OPTIMIZE_INTERVAL', 6 * 60 * 60))),
+    'incremental_vacuum': (vacuum_job, float(os.environ.get('MAINTENANCE_VACUUM_INTERVAL', 60 * 60))),
+    'wal_checkpoint': (checkpoint_job, float(os.environ.get('MAINTENANCE_CHECKPOINT_INTERVAL', 5 * 60))),
+}
+
+
+class MaintenanceScheduler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats = {'runs': 0, 'errors': 0, 'not_claimed': 0}
+
+    @property
+    def owner(self):
+        """Lease owner name for this process"""
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self):
+        """Start the scheduler thread for this worker process if it isn't running"""
+        if not MAINTENANCE_CONFIG['enabled']:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='maintenance', daemon=True)
+            self._thread.start()
+
+    def run_job(self, name, force=False, time_budget=None):
+        """
+        Run one job if it is due (or always with force) and no other process holds its lease
+
+        Returns:
+            dict: The job result, or None if the job wasn't run
+        """
+        fn, interval = JOBS[name]
+        budget = time_budget if time_budget is not None else MAINTENANCE_CONFIG['time_budget']
+        owner = self.owner
+        if not claim_maintenance_job(name, owner, time.time(), interval, MAINTENANCE_CONFIG['lease'], force):
+            self._stats['not_claimed'] += 1
+            return None
+
+        started = time.monotonic()
+        result = error = None
+        try:
+            result = fn(started + budget)
+        except Exception as e:
+            error = str(e)
+            self._stats['errors'] += 1
+            print(f"Maintenance job {name} failed: {e}")
+        duration = time.monotonic() - started
+        self._stats['runs'] += 1
+        maintenance_job_duration.observe(duration, name, 'error' if error else 'ok')
+        finish_maintenance_job(name, owner, time.time(), duration, result, error)
+        return result if error is None else {'error': error}
+
+    def run_due(self):
+        """Run every job that is due; returns {name: result} for the jobs that ran"""
+        results = {}
+        for name in JOBS:
+            result = self.run_job(name)
+            if result is not None:
+                results[name] = result
+        return results
+
+    def _run(self):
+        while True:
+            try:
+                self.run_due()
+            except Exception as e:
+                print(f"Maintenance scheduler error: {e}")
+            time.sleep(MAINTENANCE_CONFIG['poll_interval'])
+
+    def stats(self):
+        """Return this worker's counters and the last run of every job (from any worker)"""
+        return dict(self._stats, enabled=MAINTENANCE_CONFIG['enabled'], jobs=get_maintenance_jobs())
+
+
+# Shared scheduler started by the app and used by manage.py
+scheduler = MaintenanceScheduler()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Command-line maintenance tasks for SecurePass.
+
+Usage:
+    python manage.py migrate [--status]
+    python manage.py rebuild-search
+    python manage.py decrypt-export securepass-export.ndjson.spx [--output FILE]
+    python manage.py maintenance [JOB ...] [--time-budget SECONDS] [--status]
+    python manage.py build-breach-index pwned-passwords-sha1-ordered-by-hash.txt [--output FILE]
+    python manage.py rebalance-shards [--dry-run]
+    python manage.py build-assets [--favicon]
+    python manage.py calibrate-kdf [--target-ms MS] [--algorithm ALGORITHM]
+"""
+
+import argparse
+import getpass
+import sys
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file (DATABASE_PATH etc.)
+load_dotenv()
+
+import database
+
+
+def migrate(args):
+    """Apply pending schema migrations to the main database and every shard file"""
+    if args.status:
+        for shard, status in database.get_schema_status().items():
+            print(f"shard {shard} ({status['path']}):")
+            for row in status['applied']:
+                print(f"  {row['version']:04d}_{row['name']}  applied {row['applied_at']} ({row['duration'] * 1000:.1f} ms)")
+            for migration in status['pending']:
+                print(f"  {migration.version:04d}_{migration.name}  pending")
+        return
+    applied = database.init_db(apply=True)
+    for shard, version, name, seconds in applied:
+        print(f"shard {shard}: applied {version:04d}_{name} in {seconds * 1000:.1f} ms")
+    print(f"{len(applied)} migration(s) applied" if applied else "Schema is up to date")
+
+
+def rebuild_search(args):
+    """Rebuild the full-text search index (e.g. after restoring an old backup)"""
+    database.init_db()
+    count = database.rebuild_search_index()
+    print(f"Search index rebuilt for {count} entries")
+
+
+def decrypt_export(args):
+    """Decrypt a passphrase-protected vault export"""
+    from vault_export import open_sealed_stream
+
+    passphrase = getpass.getpass("Export passphrase: ")
+    with open(args.archive) as archive:
+        try:
+            content, chunks = open_sealed_stream(archive, passphrase)
+            output = open(args.output, 'w', newline='') if args.output else sys.stdout
+            try:
+                for chunk in chunks:
+                    output.write(chunk)
+            finally:
+                if args.output:
+                    output.close()
+        except ValueError as e:
+            sys.exit(f"Error: {e}")
+    if args.output:
+        print(f"Wrote {content} export to {args.output}")
+
+
+def maintenance(args):
+    """Run database maintenance jobs now (all of them unless some are named)"""
+    import json
+    from maintenance import JOBS, scheduler
+    from database import enable_incremental_vacuum, analyze_database, get_storage_stats, get_shards
+
+    database.init_db()
+    shards = get_shards()
+    if args.status:
+        storage = {shard: get_storage_stats(shard) for shard in shards}
+        print(json.dumps({'storage': storage if len(shards) > 1 else storage[0], 'jobs': scheduler.stats()['jobs']}, indent=2))
+        return
+    if args.enable_incremental_vacuum:
+        for shard in shards:
+            print(f"Rewriting {database.shard_path(shard)} with auto_vacuum=INCREMENTAL (takes a write lock until done)...")
+            enable_incremental_vacuum(shard)
+    if args.full_analyze:
+        for shard in shards:
+            analyze_database(shard)
+        print("ANALYZE complete")
+
+    unknown = [name for name in args.jobs if name not in JOBS]
+    if unknown:
+        sys.exit(f"Unknown job(s): {', '.join(unknown)}. Available: {', '.join(JOBS)}")
+    for name in args.jobs or JOBS:
+        result = scheduler.run_job(name, force=True, time_budget=args.time_budget)
+        if result is None:
+            print(f"{name}: skipped, another process is running it")
+        else:
+            print(f"{name}: {json.dumps(result)}")
+
+
+def build_breach_index(args):
+    """Build the offline breached-password index from a hash list sorted by hash"""
+    import time
+    from breach_check import BREACH_CONFIG, BreachIndex, BreachIndexError, build_index
+
+    output = args.output or BREACH_CONFIG['index_path']
+    started = time.monotonic()
+    try:
+        records = build_index(args.source, output, args.prefix_bytes)
+    except BreachIndexError as e:
+        sys.exit(f"Error: {e}")
+    print(f"Wrote {records} records to {output} in {time.monotonic() - started:.1f}s")
+    if args.check:
+        print(f"{args.check!r}: seen {BreachIndex(output).lookup(args.check)} times")
+
+
+def rebalance_shards(args):
+    """Move every user whose vault isn't on its home shard for the current DB_SHARDS (stop the app first)"""
+    import time
+    from collections import Counter
+
+    database.init_db()
+    started = time.monotonic()
+    moves = Counter()
+    users = entries = 0
+    after_id = 0
+    while True:
+        batch = database.get_user_shards(after_id, args.batch_size)
+        if not batch:
+            break
+        after_id = batch[-1]['id']
+        for user in batch:
+            target = database.home_shard(user['id'])
+            if user['shard'] == target:
+                continue
+            moves[(user['shard'], target)] += 1
+            users += 1
+            if not args.dry_run:
+                entries += database.move_user_to_shard(user['id'], target) or 0
+
+    for (source, target), count in sorted(moves.items()):
+        print(f"shard {source} -> shard {target}: {count} user(s)")
+    if args.dry_run:
+        print(f"{users} user(s) would move across {database.DB_SHARDS} shard(s)")
+    else:
+        print(f"Moved {users} user(s) and {entries} entries in {time.monotonic() - started:.1f}s")
+
+
+def build_assets(args):
+    """Minify, content-hash and precompress static assets and write the asset manifest"""
+    import os
+    import assets
+    from generate_favicon import create_favicon_ico
+
+    favicon_path = os.path.join(assets.STATIC_DIR, 'images', 'favicon.ico')
+    if args.favicon or not os.path.exists(favicon_path):
+        create_favicon_ico(favicon_path)
+    if assets.brotli is None:
+        print("brotli is not installed; writing gzip variants only")
+
+    manifest, sizes = assets.build_assets(output_dir=args.output_dir, prune=not args.no_prune,
+                                          keep_builds=args.keep_builds)
+    for name, built in sorted(manifest.items()):
+        size = sizes[name]
+        compressed = ', '.join(f"{encoding} {size[encoding]}" for encoding in ('br', 'gzip') if encoding in size)
+        print(f"{name} -> {built} ({size['source']} -> {size['built']} bytes{'; ' + compressed if compressed else ''})")
+
+
+def calibrate_kdf(args):
+    """Pick master password hash parameters that take a target time per hash on this host"""
+    import password_hashing
+    from kdf_service import KDF_CONFIG
+
+    algorithms = [args.algorithm] if args.algorithm else ['pbkdf2-sha256', 'scrypt']
+    print(f"Target: {args.target_ms:.0f} ms per hash "
+          f"(currently {password_hashing.HASH_CONFIG['algorithm']} {password_hashing.current_params()})")
+    for algorithm in algorithms:
+        result = password_hashing.calibrate(algorithm, args.target_ms, args.max_memory_mib)
+        params = result['params']
+        print(f"\n{algorithm}: {params} -> {result['ms']:.0f} ms per hash, "
+              f"~{KDF_CONFIG['pool_size'] * 1000 / result['ms']:.0f} hashes/s per worker (KDF_POOL_SIZE={KDF_CONFIG['pool_size']})")
+        print(f"  PASSWORD_HASH_ALGORITHM={algorithm}")
+        if algorithm == 'scrypt':
+            print(f"  PASSWORD_HASH_SCRYPT_LN={params['ln']}")
+            print(f"  PASSWORD_HASH_SCRYPT_R={params['r']}")
+            print(f"  PASSWORD_HASH_SCRYPT_P={params['p']}")
+        else:
+            print(f"  PASSWORD_HASH_PBKDF2_ITERATIONS={params['i']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SecurePass maintenance commands")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help=migrate.__doc__)
+    migrate_parser.add_argument('--status', action='store_true', help="List applied and pending migrations without applying any")
+    migrate_parser.set_defaults(func=migrate)
+
+    subparsers.add_parser('rebuild-search', help=rebuild_search.__doc__).set_defaults(func=rebuild_search)
+
+    decrypt_parser = subparsers.add_parser('decrypt-export', help=decrypt_export.__doc__)
+    decrypt_parser.add_argument('archive', help="Encrypted export (.spx) downloaded from /api/passwords/export")
+    decrypt_parser.add_argument('--output', help="Write the decrypted export here instead of stdout")
+    decrypt_parser.set_defaults(func=decrypt_export)
+
+    maintenance_parser = subparsers.add_parser('maintenance', help=maintenance.__doc__)
+    maintenance_parser.add_argument('jobs', nargs='*', help="Jobs to run: purge_reset_tokens, purge_rate_limits, purge_vault_sessions, purge_tombstones, optimize, incremental_vacuum, wal_checkpoint")
+    maintenance_parser.add_argument('--time-budget', type=float, default=60.0,
+                                    help="Seconds each job may spend (default: 60; the in-app scheduler uses MAINTENANCE_TIME_BUDGET)")
+    maintenance_parser.add_argument('--status', action='store_true', help="Show storage stats and the last run of each job")
+    maintenance_parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                                    help="Convert an existing database to auto_vacuum=INCREMENTAL first (runs VACUUM)")
+    maintenance_parser.add_argument('--full-analyze', action='store_true', help="Run an unbounded ANALYZE first")
+    maintenance_parser.set_defaults(func=maintenance)
+
+    breach_parser = subparsers.add_parser('build-breach-index', help=build_breach_index.__doc__)
+    breach_parser.add_argument('source', help="HIBP-style SHA1HEX:COUNT lines sorted by hash ('-' for stdin, .gz allowed)")
+    breach_parser.add_argument('--output', help="Index file to write (default: BREACH_INDEX_PATH)")
+    breach_parser.add_argument('--prefix-bytes', type=int, default=8,
+                               help="Bytes of each SHA-1 to keep (default: 8; fewer makes a smaller index with more false positives)")
+    breach_parser.add_argument('--check', metavar='PASSWORD', help="Look up a password in the new index afterwards")
+    breach_parser.set_defaults(func=build_breach_index)
+
+    rebalance_parser = subparsers.add_parser('rebalance-shards', help=rebalance_shards.__doc__)
+    rebalance_parser.add_argument('--dry-run', action='store_true', help="Only report which users would move")
+    rebalance_parser.add_argument('--batch-size', type=int, default=1000, help="Users read from the directory at a time")
+    rebalance_parser.set_defaults(func=rebalance_shards)
+
+    assets_parser = subparsers.add_parser('build-assets', help=build_assets.__doc__)
+    assets_parser.add_argument('--favicon', action='store_true', help="Regenerate static/images/favicon.ico first")
+    assets_parser.add_argument('--output-dir', help="Subdirectory of static/ to build into (default: ASSET_OUTPUT_DIR)")
+    assets_parser.add_argument('--keep-builds', type=int, help="Builds whose files are kept (default: ASSET_KEEP_BUILDS)")
+    assets_parser.add_argument('--no-prune', action='store_true', help="Keep the files of every earlier build")
+    assets_parser.set_defaults(func=build_assets)
+
+    calibrate_parser = subparsers.add_parser('calibrate-kdf', help=calibrate_kdf.__doc__)
+    calibrate_parser.add_argument('--target-ms', type=float, default=250.0, help="Time one hash should take (default: 250)")
+    calibrate_parser.add_argument('--algorithm', choices=['pbkdf2-sha256', 'pbkdf2-sha512', 'scrypt'],
+                                  help="Only calibrate this algorithm (default: pbkdf2-sha256 and scrypt)")
+    calibrate_parser.add_argument('--max-memory-mib', type=int, default=64, help="Upper bound on scrypt memory per hash (default: 64)")
+    calibrate_parser.set_defaults(func=calibrate_kdf)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Prometheus-style metrics for SecurePass.
+Each worker process keeps counters and histograms in memory and periodically writes a
+snapshot to its own file in METRICS_DIR; /metrics merges the snapshots of every worker,
+so the numbers are correct no matter which gunicorn worker serves the scrape. When a
+worker exits, its counts are folded into a snapshot of exited workers rather than lost,
+so totals never go backwards while the others keep running.
+"""
+
+import functools
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+METRICS_CONFIG = {
+    'enabled': os.environ.get('METRICS_ENABLED', 'True').lower() == 'true',
+    'directory': os.environ.get('METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'securepass-metrics'),
+    'flush_interval': float(os.environ.get('METRICS_FLUSH_INTERVAL', 5)),
+}
+
+# Latency buckets in seconds, from sub-millisecond queries up to slow SMTP sends
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_metrics = {}
+# Serializes snapshot writes within a process; observations only ever wait on _lock
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+# Counts of exited workers; merged like any snapshot, but only rewritten under the merge lock
+DEAD_SNAPSHOT_NAME = 'metrics_dead.json'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        """Add to the counter for a label combination"""
+        if not METRICS_CONFIG['enabled']:
+            return
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self):
+        return {'type': 'counter', 'help': self.documentation, 'labels': self.labelnames,
+                'values': [[list(k), v] for k, v in self.values.items()]}
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def observe(self, value, *labels):
+        """Record one observation for a label combination"""
+        if not METRICS_CONFIG['enabled']:
+            return
+        with _lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels):
+        """Context manager timing a block"""
+        return _Timer(self, labels)
+
+    def snapshot(self):
+        # Buckets are stored non-cumulative and summed at export time
+        return {'type': 'histogram', 'help': self.documentation, 'labels': self.labelnames,
+                'buckets': list(self.buckets), 'values': [[list(k), v] for k, v in self.values.items()]}
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+def counter(name, documentation, labelnames=()):
+    """Get or register a counter"""
+    with _lock:
+        if name not in _metrics:
+            _metrics[name] = Counter(name, documentation, labelnames)
+        return _metrics[name]
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Get or register a histogram"""
+    with _lock:
+        if name not in _metrics:
+            _metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        return _metrics[name]
+
+
+def timed(histogram, *labels):
+    """Decorator recording each call's duration in a histogram"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, *labels)
+        return wrapper
+    return decorator
+
+
+def _snapshot_path(pid=None):
+    return os.path.join(METRICS_CONFIG['directory'], f"metrics_{pid or os.getpid()}.json")
+
+
+def flush(force=False):
+    """
+    Write this process's metrics to its snapshot file (at most once per flush interval)
+
+    Never raises for a filesystem problem: losing a snapshot must not fail the request
+    that happened to trigger it.
+    """
+    global _last_flush
+    if not METRICS_CONFIG['enabled']:
+        return
+    # Another thread flushing right now covers this one, unless the caller needs it done
+    if not _flush_lock.acquire(blocking=force):
+        return
+    try:
+        now = time.monotonic()
+        if not force and now - _last_flush < METRICS_CONFIG['flush_interval']:
+            return
+        _last_flush = now
+
+        with _lock:
+            data = {name: metric.snapshot() for name, metric in _metrics.items()}
+        os.makedirs(METRICS_CONFIG['directory'], exist_ok=True)
+        _write_snapshot(_snapshot_path(), data)
+    except OSError as e:
+        print(f"Writing metrics snapshot failed: {e}")
+    finally:
+        _flush_lock.release()
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    return True
+
+
+def _add_snapshot(merged, data):
+    """Add one snapshot's counters and histograms into merged"""
+    for name, metric in data.items():
+        target = merged.setdefault(name, dict(metric, values={}))
+        for labels, value in metric['values']:
+            key = tuple(labels)
+            if metric['type'] == 'counter':
+                target['values'][key] = target['values'].get(key, 0) + value
+            else:
+                series = target['values'].setdefault(key, [[0] * len(metric['buckets']), 0.0, 0])
+                series[0] = [a + b for a, b in zip(series[0], value[0])]
+                series[1] += value[1]
+                series[2] += value[2]
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_snapshot(path, data):
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix='.tmp',
+                                    dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        # Atomic replace so a concurrent scrape never reads a half-written file
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _fold_dead_snapshots(paths):
+    """
+    Add the snapshots of exited workers into the dead-worker snapshot and remove them
+
+    Counters and histograms only ever grow, so an exited worker's counts must stay in
+    the totals; dropping them would look like a counter reset to rate() and increase().
+    """
+    dead_path = os.path.join(METRICS_CONFIG['directory'], DEAD_SNAPSHOT_NAME)
+    folded = {}
+    _add_snapshot(folded, _read_snapshot(dead_path) or {})
+    for path in paths:
+        # Anything gauge-like describes the exited worker itself and goes with it
+        data = _read_snapshot(path) or {}
+        _add_snapshot(folded, {name: metric for name, metric in data.items()
+                               if metric['type'] in ('counter', 'histogram')})
+    _write_snapshot(dead_path, {name: dict(metric, values=[[list(k), v] for k, v in metric['values'].items()])
+                                for name, metric in folded.items()})
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _merge_snapshots():
+    directory = METRICS_CONFIG['directory']
+    # Held across folding and reading, so no scrape sees a worker's counts in both its own
+    # snapshot and the dead-worker one (or in neither)
+    lock_file = None
+    if fcntl is not None:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            lock_file = open(os.path.join(directory, 'metrics.lock'), 'a')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except OSError:
+            lock_file = None
+    try:
+        paths = glob.glob(os.path.join(directory, 'metrics_*.json'))
+        dead = []
+        for path in paths:
+            pid = os.path.basename(path)[len('metrics_'):-len('.json')]
+            if pid.isdigit() and not _process_alive(int(pid)):
+                dead.append(path)
+        if dead:
+            try:
+                _fold_dead_snapshots(dead)
+            except OSError as e:
+                print(f"Folding metrics of exited workers failed: {e}")
+            paths = glob.glob(os.path.join(directory, 'metrics_*.json'))
+
+        merged = {}
+        for path in paths:
+            data = _read_snapshot(path)
+            if data is not None:
+                _add_snapshot(merged, data)
+        return merged
+    finally:
+        if lock_file is not None:
+            lock_file.close()
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def render():
+    """Render the metrics of all workers in Prometheus text exposition format"""
+    flush(force=True)
+    lines = []
+    for name, metric in sorted(_merge_snapshots().items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric['values'].items()):
+            if metric['type'] == 'counter':
+                lines.append(f"{name}{_format_labels(metric['labels'], labels)} {value}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(metric['buckets'], counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(metric['labels'], labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(metric['labels'], labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_format_labels(metric['labels'], labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(metric['labels'], labels)} {count}")
+    return '\n'.join(lines) + '\n'
+
+
+# Metrics shared across modules
+http_request_duration = histogram(
+    'securepass_http_request_duration_seconds', 'HTTP request latency by endpoint', ['endpoint', 'method', 'status'])
+db_call_duration = histogram(
+    'securepass_db_call_duration_seconds', 'Time spent in database.py functions', ['function'])
+kdf_duration = histogram(
+    'securepass_kdf_duration_seconds', 'Key derivation latency, including time queued for the KDF pool',
+    ['algorithm', 'outcome'])
+smtp_send_duration = histogram(
+    'securepass_smtp_send_duration_seconds', 'SMTP delivery latency per message', ['outcome'])
@@ -0,0 +1,87 @@
+"""Users directory and shared tables, as created by init_db() before versioned migrations"""
+
+from migrations import add_column_if_missing
+
+SCOPE = 'main'
+
+
+def upgrade(cursor, shard):
+    # Create users table (the directory: every user, and the shard holding their vault)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Create reset_tokens table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reset_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            token TEXT UNIQUE NOT NULL,
+            expiry TIMESTAMP NOT NULL,
+            used BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Create email_outbox table (emails queued by requests, delivered by a background sender)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body_text TEXT NOT NULL,
+            body_html TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            locked_until REAL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP
+        )
+    ''')
+
+    # Create maintenance_jobs table (schedule, lease and last outcome of each background job)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_jobs (
+            name TEXT PRIMARY KEY,
+            lease_owner TEXT,
+            lease_until REAL,
+            last_started_at REAL,
+            last_finished_at REAL,
+            last_duration REAL,
+            last_result TEXT,
+            last_error TEXT,
+            runs INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    # Create rate_limits table (token buckets shared by every worker)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+    # Columns added after the original schema (users from before sharding live in shard 0)
+    add_column_if_missing(cursor, 'users', 'shard', 'INTEGER NOT NULL DEFAULT 0')
+
+    # Create indexes for better performance
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_shard ON users (shard)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reset_tokens_token ON reset_tokens (token)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reset_tokens_user_id ON reset_tokens (user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reset_tokens_expiry ON reset_tokens (expiry)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reset_tokens_used ON reset_tokens (id) WHERE used')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rate_limits_updated ON rate_limits (updated_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (status, next_attempt_at)')
@@ -0,0 +1,148 @@
+"""Per-user vault tables in every shard file, as created by init_db() before versioned migrations"""
+
+import sqlite3
+
+from migrations import add_column_if_missing
+
+SCOPE = 'shards'
+
+# database.SHARD_ID_SPAN: each shard hands out entry IDs from its own range of this size
+SHARD_ID_SPAN = 1 << 40
+
+
+def upgrade(cursor, shard):
+    # Shard files other than 0 have no users table; foreign keys aren't enforced, so the
+    # references below only document the relationship
+
+    # Create passwords table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS passwords (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            site_name TEXT NOT NULL,
+            site_url TEXT,
+            site_username TEXT NOT NULL,
+            encrypted_data TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Create recovery_keys table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recovery_keys (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER UNIQUE NOT NULL,
+            key_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Create vault_keys table (per-user data key wrapped under the master password)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vault_keys (
+            user_id INTEGER PRIMARY KEY,
+            kdf_salt TEXT NOT NULL,
+            wrapped_key TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Create vault_revisions table (per-user counter bumped by triggers on every vault change)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vault_revisions (
+            user_id INTEGER PRIMARY KEY,
+            revision INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_passwords_revision_{event.lower()}
+            AFTER {event} ON passwords
+            BEGIN
+                INSERT INTO vault_revisions (user_id, revision) VALUES ({row}.user_id, 1)
+                ON CONFLICT (user_id) DO UPDATE SET revision = revision + 1;
+            END
+        ''')
+
+    # Create id_sequences table (last entry ID handed out by this shard, see _reserve_entry_ids)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS id_sequences (
+            name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL
+        )
+    ''')
+    base = shard * SHARD_ID_SPAN
+    cursor.execute(
+        '''INSERT OR IGNORE INTO id_sequences (name, last_id)
+           SELECT 'passwords', MAX(?, COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'passwords' AND seq <= ?), 0))''',
+        (base, base + SHARD_ID_SPAN)
+    )
+
+    # Create passwords_fts full-text index over entry metadata, kept in sync by triggers
+    _create_search_index(cursor)
+
+    # Columns added after the original schema
+    add_column_if_missing(cursor, 'passwords', 'enc_version', 'INTEGER NOT NULL DEFAULT 1')
+    # Keyed plaintext fingerprint and strength score, written alongside the ciphertext (NULL until backfilled)
+    add_column_if_missing(cursor, 'passwords', 'fingerprint', 'BLOB')
+    add_column_if_missing(cursor, 'passwords', 'strength', 'INTEGER')
+
+    # Create indexes for better performance
+    # Serves both the user_id filter and the created_at/id ordering of vault listings
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_passwords_user_created ON passwords (user_id, created_at, id)')
+    cursor.execute('DROP INDEX IF EXISTS idx_passwords_user_id')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recovery_keys_user_id ON recovery_keys (user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_passwords_legacy ON passwords (user_id, id) WHERE enc_version = 1')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_passwords_fingerprint ON passwords (user_id, fingerprint) WHERE fingerprint IS NOT NULL')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_passwords_unfingerprinted ON passwords (user_id, id) WHERE fingerprint IS NULL')
+
+
+def _create_search_index(cursor):
+    """Create the FTS5 index over site_name/site_url/site_username (skipped if SQLite lacks FTS5)"""
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'passwords_fts'"
+    ).fetchone()
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS passwords_fts USING fts5(
+                site_name, site_url, site_username,
+                content = 'passwords', content_rowid = 'id',
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"Full-text search unavailable: {e}")
+        return
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_passwords_fts_insert AFTER INSERT ON passwords
+        BEGIN
+            INSERT INTO passwords_fts (rowid, site_name, site_url, site_username)
+            VALUES (NEW.id, NEW.site_name, NEW.site_url, NEW.site_username);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_passwords_fts_delete AFTER DELETE ON passwords
+        BEGIN
+            INSERT INTO passwords_fts (passwords_fts, rowid, site_name, site_url, site_username)
+            VALUES ('delete', OLD.id, OLD.site_name, OLD.site_url, OLD.site_username);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_passwords_fts_update
+        AFTER UPDATE OF site_name, site_url, site_username ON passwords
+        BEGIN
+            INSERT INTO passwords_fts (passwords_fts, rowid, site_name, site_url, site_username)
+            VALUES ('delete', OLD.id, OLD.site_name, OLD.site_url, OLD.site_username);
+            INSERT INTO passwords_fts (rowid, site_name, site_url, site_username)
+            VALUES (NEW.id, NEW.site_name, NEW.site_url, NEW.site_username);
+        END
+    ''')
+
+    # Index rows that existed before the search index did
+    if not exists:
+        cursor.execute("INSERT INTO passwords_fts (passwords_fts) VALUES ('rebuild')")
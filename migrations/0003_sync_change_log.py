@@ -0,0 +1,75 @@
+"""Per-entry revisions, updated_at and delete tombstones, so /api/sync can return only what changed"""
+
+SCOPE = 'shards'
+
+# Bumps the owner's counter in vault_revisions; {row} is NEW or OLD
+_BUMP = '''
+    INSERT INTO vault_revisions (user_id, revision) VALUES ({row}.user_id, 1)
+    ON CONFLICT (user_id) DO UPDATE SET revision = revision + 1;
+'''
+_CURRENT = '(SELECT revision FROM vault_revisions WHERE user_id = {row}.user_id)'
+
+
+def upgrade(cursor, shard):
+    # The revision an entry was last added or changed at (NULL only between an INSERT and
+    # its trigger), and a tombstone per deleted entry with the revision of the delete
+    cursor.execute('ALTER TABLE passwords ADD COLUMN revision INTEGER')
+    cursor.execute('ALTER TABLE passwords ADD COLUMN updated_at TIMESTAMP')
+    cursor.execute('''
+        CREATE TABLE password_tombstones (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            revision INTEGER NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Highest revision whose tombstones have been purged: clients behind it must resync in full
+    cursor.execute('ALTER TABLE vault_revisions ADD COLUMN pruned_revision INTEGER NOT NULL DEFAULT 0')
+
+    # Existing entries count as last changed at their vault's current revision
+    cursor.execute('DROP TRIGGER IF EXISTS trg_passwords_revision_insert')
+    cursor.execute('DROP TRIGGER IF EXISTS trg_passwords_revision_update')
+    cursor.execute('DROP TRIGGER IF EXISTS trg_passwords_revision_delete')
+    cursor.execute('''
+        INSERT INTO vault_revisions (user_id, revision)
+        SELECT DISTINCT user_id, 1 FROM passwords WHERE true
+        ON CONFLICT (user_id) DO NOTHING
+    ''')
+    cursor.execute(f"UPDATE passwords SET revision = {_CURRENT.format(row='passwords')}, updated_at = created_at")
+
+    # Each trigger bumps the vault revision and stamps the row (or its tombstone) with it.
+    # Inserts that already carry a revision are entries being moved between shards.
+    cursor.execute(f'''
+        CREATE TRIGGER trg_passwords_revision_insert
+        AFTER INSERT ON passwords WHEN NEW.revision IS NULL
+        BEGIN
+            {_BUMP.format(row='NEW')}
+            UPDATE passwords SET revision = {_CURRENT.format(row='NEW')}, updated_at = CURRENT_TIMESTAMP
+            WHERE id = NEW.id;
+        END
+    ''')
+    # Only changes a client can see; fingerprint and strength backfills don't count
+    cursor.execute(f'''
+        CREATE TRIGGER trg_passwords_revision_update
+        AFTER UPDATE OF site_name, site_url, site_username, encrypted_data ON passwords
+        BEGIN
+            {_BUMP.format(row='NEW')}
+            UPDATE passwords SET revision = {_CURRENT.format(row='NEW')}, updated_at = CURRENT_TIMESTAMP
+            WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_passwords_revision_delete
+        AFTER DELETE ON passwords
+        BEGIN
+            {_BUMP.format(row='OLD')}
+            INSERT INTO password_tombstones (id, user_id, revision) VALUES (OLD.id, OLD.user_id, {_CURRENT.format(row='OLD')})
+            ON CONFLICT (id) DO UPDATE SET user_id = excluded.user_id, revision = excluded.revision,
+                                           deleted_at = excluded.deleted_at;
+        END
+    ''')
+
+    # A sync reads the entries and tombstones after the client's revision straight off these
+    cursor.execute('CREATE INDEX idx_passwords_user_revision ON passwords (user_id, revision)')
+    cursor.execute('CREATE INDEX idx_password_tombstones_user_revision ON password_tombstones (user_id, revision)')
+    cursor.execute('CREATE INDEX idx_password_tombstones_deleted ON password_tombstones (deleted_at)')
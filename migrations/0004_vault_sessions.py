@@ -0,0 +1,19 @@
+"""Unlocked-vault sessions shared by every worker (see vault_session.py)"""
+
+SCOPE = 'main'
+
+
+def upgrade(cursor, shard):
+    # The vault key sealed under a key only the browser's session handle can derive;
+    # rows are looked up by a hash of the handle, so this table alone opens nothing
+    cursor.execute('''
+        CREATE TABLE vault_sessions (
+            handle_hash BLOB PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            sealed_key TEXT NOT NULL,
+            idle_until REAL NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX idx_vault_sessions_user_id ON vault_sessions (user_id)')
+    cursor.execute('CREATE INDEX idx_vault_sessions_idle_until ON vault_sessions (idle_until)')
@@ -0,0 +1,57 @@
+"""Index each entry's owner in passwords_fts, so a search only walks the searching user's rows"""
+
+SCOPE = 'shards'
+
+
+def upgrade(cursor, shard):
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'passwords_fts'"
+    ).fetchone()
+    if not exists:
+        # SQLite without FTS5 (see 0002): search falls back to scanning the user's rows
+        return
+
+    for trigger in ('insert', 'delete', 'update'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS trg_passwords_fts_{trigger}')
+    cursor.execute('DROP TABLE passwords_fts')
+
+    # The index reads its content through this view: the metadata columns plus an
+    # "owner" column holding one token per user (u<user_id>)
+    cursor.execute('''
+        CREATE VIEW passwords_search_source AS
+        SELECT id, site_name, site_url, site_username, 'u' || user_id AS owner FROM passwords
+    ''')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE passwords_fts USING fts5(
+            site_name, site_url, site_username, owner,
+            content = 'passwords_search_source', content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TRIGGER trg_passwords_fts_insert AFTER INSERT ON passwords
+        BEGIN
+            INSERT INTO passwords_fts (rowid, site_name, site_url, site_username, owner)
+            VALUES (NEW.id, NEW.site_name, NEW.site_url, NEW.site_username, 'u' || NEW.user_id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER trg_passwords_fts_delete AFTER DELETE ON passwords
+        BEGIN
+            INSERT INTO passwords_fts (passwords_fts, rowid, site_name, site_url, site_username, owner)
+            VALUES ('delete', OLD.id, OLD.site_name, OLD.site_url, OLD.site_username, 'u' || OLD.user_id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER trg_passwords_fts_update
+        AFTER UPDATE OF site_name, site_url, site_username, user_id ON passwords
+        BEGIN
+            INSERT INTO passwords_fts (passwords_fts, rowid, site_name, site_url, site_username, owner)
+            VALUES ('delete', OLD.id, OLD.site_name, OLD.site_url, OLD.site_username, 'u' || OLD.user_id);
+            INSERT INTO passwords_fts (rowid, site_name, site_url, site_username, owner)
+            VALUES (NEW.id, NEW.site_name, NEW.site_url, NEW.site_username, 'u' || NEW.user_id);
+        END
+    ''')
+    cursor.execute("INSERT INTO passwords_fts (passwords_fts) VALUES ('rebuild')")
@@ -0,0 +1,25 @@
+"""Stop re-encrypting an entry from bumping its revision: /api/sync only returns metadata"""
+
+SCOPE = 'shards'
+
+_BUMP = '''
+    INSERT INTO vault_revisions (user_id, revision) VALUES (NEW.user_id, 1)
+    ON CONFLICT (user_id) DO UPDATE SET revision = revision + 1;
+'''
+_CURRENT = '(SELECT revision FROM vault_revisions WHERE user_id = NEW.user_id)'
+
+
+def upgrade(cursor, shard):
+    # 0003 also fired on encrypted_data, so the legacy-format migration that runs at every
+    # unlock bumped the revision of each entry it rewrote and sent clients a full vault of
+    # unchanged rows. Re-encryption keeps the same secret; only metadata edits count now.
+    cursor.execute('DROP TRIGGER IF EXISTS trg_passwords_revision_update')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_passwords_revision_update
+        AFTER UPDATE OF site_name, site_url, site_username ON passwords
+        BEGIN
+            {_BUMP}
+            UPDATE passwords SET revision = {_CURRENT}, updated_at = CURRENT_TIMESTAMP
+            WHERE id = NEW.id;
+        END
+    ''')
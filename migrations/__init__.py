@@ -0,0 +1,136 @@
+"""
+Versioned schema migrations for SecurePass.
+Each NNNN_description.py file in this package is one migration: an upgrade(cursor, shard)
+function plus a SCOPE of 'main' (the users directory and shared tables, which live in
+shard 0's file) or 'shards' (vault tables, in every shard file). Every database file
+records the migrations applied to it in a schema_version table. A worker that finds one
+missing takes the file's write lock with BEGIN IMMEDIATE, checks again, and applies the
+rest in order, one transaction each, so a migration runs exactly once however many
+workers boot at the same time.
+
+0001 and 0002 are the schema as it stood before versioning. They are written with
+IF NOT EXISTS so that they also adopt databases created by earlier releases; later
+migrations run exactly once and need no such guards. Never edit a migration that has
+shipped; add a new one.
+"""
+
+import importlib
+import os
+import re
+import sqlite3
+import time
+
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.py$')
+SCOPES = ('main', 'shards')
+
+
+class MigrationError(Exception):
+    """Raised for a malformed migrations package or a database that needs migrating"""
+
+
+class Migration:
+    def __init__(self, version, name, scope, upgrade):
+        self.version = version
+        self.name = name
+        self.scope = scope
+        self.upgrade = upgrade
+
+    def applies_to(self, shard):
+        """True if this migration belongs in the given shard's file"""
+        return self.scope == 'shards' or shard == 0
+
+    def __repr__(self):
+        return f"<Migration {self.version:04d}_{self.name} ({self.scope})>"
+
+
+_migrations = None
+
+
+def load_migrations():
+    """Every migration in this package, in version order (imported once per process)"""
+    global _migrations
+    if _migrations is None:
+        migrations = []
+        for filename in sorted(os.listdir(os.path.dirname(__file__))):
+            match = MIGRATION_FILE.match(filename)
+            if not match:
+                continue
+            module = importlib.import_module(f"{__name__}.{filename[:-3]}")
+            version, name = int(match.group(1)), match.group(2)
+            if migrations and migrations[-1].version == version:
+                raise MigrationError(f"Two migrations have version {version:04d}")
+            if getattr(module, 'SCOPE', None) not in SCOPES:
+                raise MigrationError(f"{filename}: SCOPE must be one of {', '.join(SCOPES)}")
+            migrations.append(Migration(version, name, module.SCOPE, module.upgrade))
+        _migrations = migrations
+    return _migrations
+
+
+def add_column_if_missing(cursor, table, column, definition):
+    """Add a column to an existing table unless it is already there"""
+    columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+    if column not in columns:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def applied_versions(conn):
+    """Versions recorded in a database file's schema_version table"""
+    try:
+        return {row[0] for row in conn.execute('SELECT version FROM schema_version')}
+    except sqlite3.OperationalError:
+        # No schema_version table yet: a new file, or one from before versioning
+        return set()
+
+
+def pending_migrations(conn, shard):
+    """Migrations that belong in this shard's file and haven't been applied to it"""
+    applied = applied_versions(conn)
+    return [m for m in load_migrations() if m.applies_to(shard) and m.version not in applied]
+
+
+def migrate(conn, shard):
+    """
+    Apply every pending migration to one database file
+
+    Checking costs a single SELECT when the file is up to date, which is the usual case
+    for a worker starting against an already migrated database.
+
+    Args:
+        conn: A connection to the shard's file, with no transaction open
+        shard (int): Which shard the file is (0 is the main database)
+
+    Returns:
+        list: (version, name, seconds) of each migration this call applied
+    """
+    if not pending_migrations(conn, shard):
+        return []
+
+    applied = []
+    for migration in load_migrations():
+        if not migration.applies_to(shard):
+            continue
+        # Take the write lock first, then check again: another worker may have got here first
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    duration REAL
+                )
+            ''')
+            if migration.version in applied_versions(conn):
+                conn.rollback()
+                continue
+            started = time.perf_counter()
+            migration.upgrade(conn.cursor(), shard)
+            duration = time.perf_counter() - started
+            conn.execute('INSERT INTO schema_version (version, name, duration) VALUES (?, ?, ?)',
+                         (migration.version, migration.name, duration))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append((migration.version, migration.name, duration))
+    return applied
@@ -0,0 +1,137 @@
+"""
+Rendered-page cache for SecurePass.
+Pages such as the login form render to the same HTML for every anonymous visitor, so
+each worker keeps the rendered bytes, keyed by template and arguments, together with a
+strong ETag for conditional requests. Cached pages are dropped whenever a template file
+(or the asset manifest the templates link through) changes on disk.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+from cache import TTLCache
+
+PAGE_CACHE_CONFIG = {
+    'enabled': os.environ.get('PAGE_CACHE_ENABLED', 'true').lower() == 'true',
+    'max_entries': int(os.environ.get('PAGE_CACHE_SIZE', 256)),
+    # Larger renders are served but not kept
+    'max_page_bytes': int(os.environ.get('PAGE_CACHE_MAX_PAGE_BYTES', 256 * 1024)),
+    # Seconds between checks of the template files for changes
+    'check_interval': float(os.environ.get('PAGE_CACHE_CHECK_INTERVAL', 1.0)),
+}
+
+# Template arguments that carry per-request feedback; pages rendered with them aren't cached
+UNCACHED_ARGS = frozenset({'error', 'message'})
+
+
+class RenderedPage:
+    """A rendered page body and its ETag"""
+
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class PageCache:
+    """
+    Per-worker cache of rendered pages that empties itself when watched files change.
+
+    Args:
+        watch_dirs (list): Directories whose files the pages are rendered from
+        watch_files (list): Further files the output depends on (they may not exist)
+        max_entries (int): Maximum number of cached pages
+        max_page_bytes (int): Pages larger than this are not cached
+        check_interval (float): Seconds between checks of the watched files
+    """
+
+    def __init__(self, watch_dirs, watch_files=(), max_entries=None, max_page_bytes=None, check_interval=None):
+        self.watch_dirs = list(watch_dirs)
+        self.watch_files = list(watch_files)
+        self.max_page_bytes = max_page_bytes or PAGE_CACHE_CONFIG['max_page_bytes']
+        self.check_interval = check_interval if check_interval is not None else PAGE_CACHE_CONFIG['check_interval']
+        self._pages = TTLCache(max_size=max_entries or PAGE_CACHE_CONFIG['max_entries'])
+        self._lock = threading.Lock()
+        self._signature = None
+        self._next_check = 0.0
+        self._stats = {'invalidations': 0}
+
+    def _files_signature(self):
+        signature = []
+        for directory in self.watch_dirs:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    signature.append(self._stat(os.path.join(root, name)))
+        signature.extend(self._stat(path) for path in self.watch_files)
+        return tuple(sorted(signature, key=lambda entry: entry[0]))
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return (path, None, None)
+        return (path, st.st_mtime_ns, st.st_size)
+
+    def _check_files(self):
+        """Clear the cache if any watched file changed since the last check"""
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return
+        try:
+            signature = self._files_signature()
+            if self._signature is not None and signature != self._signature:
+                self._pages.clear()
+                self._stats['invalidations'] += 1
+            self._signature = signature
+            self._next_check = now + self.check_interval
+        finally:
+            self._lock.release()
+
+    def key(self, template_name, context, *variant):
+        """
+        Cache key for a render, or None if it must not be cached
+
+        Args:
+            template_name (str): The template
+            context (dict): Arguments the template is rendered with
+            variant: Anything else the output depends on (e.g. the app's URL prefix)
+        """
+        if UNCACHED_ARGS.intersection(context):
+            return None
+        key = (template_name, tuple(sorted(context.items())), variant)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, key, render):
+        """
+        Return the cached page for key, rendering and storing it on a miss
+
+        Args:
+            key: From key()
+            render (callable): Returns the page HTML
+
+        Returns:
+            RenderedPage: The page body and its ETag
+        """
+        self._check_files()
+        page = self._pages.get(key)
+        if page is None:
+            page = RenderedPage(render().encode('utf-8'))
+            if len(page.body) <= self.max_page_bytes:
+                self._pages.set(key, page)
+        return page
+
+    def clear(self):
+        """Drop every cached page"""
+        self._pages.clear()
+
+    def stats(self):
+        """Return hit/miss counters, size and invalidation count"""
+        return dict(self._pages.stats(), **self._stats)
@@ -0,0 +1,194 @@
+"""
+Password and passphrase generation for SecurePass.
+Randomness is drawn from the OS CSPRNG in one block per request and mapped onto the
+alphabet or wordlist with rejection sampling, so every character or word is uniform.
+Length, word and count caps bound the work a single request can ask for, and the
+passphrase wordlist is read once when the module is imported.
+"""
+
+import functools
+import math
+import os
+import string
+
+GENERATOR_CONFIG = {
+    'min_length': int(os.environ.get('PASSWORD_MIN_LENGTH', 4)),
+    'max_length': int(os.environ.get('PASSWORD_MAX_LENGTH', 256)),
+    'max_count': int(os.environ.get('PASSWORD_MAX_COUNT', 1000)),
+    'max_words': int(os.environ.get('PASSPHRASE_MAX_WORDS', 24)),
+    'wordlist': os.environ.get('PASSPHRASE_WORDLIST') or os.path.join(
+        os.path.dirname(__file__), 'wordlists', 'passphrase.txt'),
+}
+
+CHARACTER_CLASSES = {
+    'lower': string.ascii_lowercase,
+    'upper': string.ascii_uppercase,
+    'digits': string.digits,
+    'symbols': "!@#$%^&*()_+-=[]{}|;:,.<>?",
+}
+DEFAULT_CLASSES = ('lower', 'upper', 'digits', 'symbols')
+
+# Characters that are easy to misread or mistype
+AMBIGUOUS = "Il1|O0o`'\";:,."
+
+
+class GeneratorError(ValueError):
+    """Raised when a generation request is outside the caps or its policy can't be met"""
+
+
+def load_wordlist(path):
+    """
+    Read a passphrase wordlist: one word per line, or diceware lines ('11111<TAB>word')
+
+    Returns:
+        tuple: The distinct words in file order
+    """
+    words = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if parts:
+                words[parts[-1]] = None
+    if len(words) < 2:
+        raise GeneratorError(f"Wordlist {path} has fewer than two words")
+    return tuple(words)
+
+
+WORDLIST = load_wordlist(GENERATOR_CONFIG['wordlist'])
+
+
+def _random_indices(n, k):
+    """k uniform indices in range(n) from bulk CSPRNG output, rejecting values past the last full multiple of n"""
+    width, code = (1, 'B') if n <= 0x100 else (2, 'H') if n <= 0x10000 else (4, 'I')
+    space = 1 << (8 * width)
+    bound = space - space % n
+    indices = []
+    while len(indices) < k:
+        # Oversample by the expected rejection rate so one draw almost always suffices
+        needed = k - len(indices)
+        raw = os.urandom(width * (math.ceil(needed * space / bound) + 16))
+        indices.extend(v % n for v in memoryview(raw).cast(code) if v < bound)
+    return indices[:k]
+
+
+@functools.lru_cache(maxsize=64)
+def _translation(alphabet):
+    """translate() table and delete set that map random bytes onto alphabet, rejecting the biased tail"""
+    n = len(alphabet)
+    bound = 256 - 256 % n
+    return bytes(alphabet[v % n] for v in range(bound)) + bytes(256 - bound), bytes(range(bound, 256)), bound
+
+
+def _random_text(alphabet, k):
+    """k uniform characters from an ASCII alphabet of at most 256 characters"""
+    # translate() maps each accepted byte to its character and drops the rejected ones in C
+    table, rejected, bound = _translation(alphabet)
+    out = bytearray()
+    while len(out) < k:
+        needed = k - len(out)
+        out += os.urandom(math.ceil(needed * 256 / bound) + 16).translate(table, rejected)
+    return out[:k].decode('ascii')
+
+
+def _check_int(name, value, low, high):
+    if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+        raise GeneratorError(f"{name} must be an integer between {low} and {high}")
+    return value
+
+
+def build_alphabet(classes=DEFAULT_CLASSES, exclude_ambiguous=False, exclude=''):
+    """
+    Build the alphabet for a policy
+
+    Returns:
+        dict: Class name -> the characters of that class left after exclusions
+    """
+    if not isinstance(classes, (list, tuple)):
+        raise GeneratorError("classes must be a list of class names")
+    unknown = [name for name in classes if not isinstance(name, str) or name not in CHARACTER_CLASSES]
+    if unknown or not classes:
+        raise GeneratorError(f"classes must be chosen from {', '.join(CHARACTER_CLASSES)}")
+    removed = set(exclude) | (set(AMBIGUOUS) if exclude_ambiguous else set())
+    alphabet = {}
+    for name in dict.fromkeys(classes):
+        chars = ''.join(c for c in CHARACTER_CLASSES[name] if c not in removed)
+        if chars:
+            alphabet[name] = chars
+    if not alphabet:
+        raise GeneratorError("Every character is excluded")
+    return alphabet
+
+
+def generate_passwords(length=16, count=1, classes=DEFAULT_CLASSES, require=(), exclude_ambiguous=False, exclude=''):
+    """
+    Generate random passwords under a character policy
+
+    Passwords missing a required class are discarded and redrawn, which keeps the
+    result uniform over all passwords that satisfy the policy.
+
+    Args:
+        length (int): Characters per password
+        count (int): Number of passwords
+        classes: Character classes to draw from (names from CHARACTER_CLASSES)
+        require: Classes every password must contain at least once
+        exclude_ambiguous (bool): Leave out characters in AMBIGUOUS
+        exclude (str): Further characters to leave out
+
+    Returns:
+        list: The generated passwords
+    """
+    _check_int('length', length, GENERATOR_CONFIG['min_length'], GENERATOR_CONFIG['max_length'])
+    _check_int('count', count, 1, GENERATOR_CONFIG['max_count'])
+    alphabet = build_alphabet(classes, exclude_ambiguous, exclude)
+    if not isinstance(require, (list, tuple)) or not all(isinstance(name, str) for name in require):
+        raise GeneratorError("require must be a list of class names")
+    required = [alphabet.get(name) for name in dict.fromkeys(require)]
+    if None in required:
+        raise GeneratorError("require must only name classes that are enabled and not fully excluded")
+    if len(required) > length:
+        raise GeneratorError("length is shorter than the number of required classes")
+    chars = ''.join(alphabet.values()).encode('ascii')
+    required = [set(group) for group in required]
+
+    passwords = []
+    while len(passwords) < count:
+        needed = count - len(passwords)
+        text = _random_text(chars, needed * length)
+        for i in range(0, len(text), length):
+            candidate = text[i:i + length]
+            if all(not group.isdisjoint(candidate) for group in required):
+                passwords.append(candidate)
+    return passwords
+
+
+def generate_passphrases(words=6, count=1, separator='-', capitalize=False):
+    """
+    Generate diceware-style passphrases from WORDLIST
+
+    Args:
+        words (int): Words per passphrase
+        count (int): Number of passphrases
+        separator (str): Placed between words
+        capitalize (bool): Capitalize each word
+
+    Returns:
+        list: The generated passphrases
+    """
+    _check_int('words', words, 1, GENERATOR_CONFIG['max_words'])
+    _check_int('count', count, 1, GENERATOR_CONFIG['max_count'])
+    if not isinstance(separator, str) or len(separator) > 3:
+        raise GeneratorError("separator must be at most 3 characters")
+    wordlist = [word.capitalize() for word in WORDLIST] if capitalize else WORDLIST
+    indices = _random_indices(len(wordlist), words * count)
+    return [separator.join(wordlist[j] for j in indices[i:i + words]) for i in range(0, len(indices), words)]
+
+
+def password_entropy(length=16, classes=DEFAULT_CLASSES, exclude_ambiguous=False, exclude=''):
+    """Bits of entropy of an unconstrained password (required classes lower it slightly)"""
+    alphabet = build_alphabet(classes, exclude_ambiguous, exclude)
+    return length * math.log2(sum(len(chars) for chars in alphabet.values()))
+
+
+def passphrase_entropy(words=6):
+    """Bits of entropy of a passphrase drawn from WORDLIST"""
+    return words * math.log2(len(WORDLIST))
@@ -0,0 +1,192 @@
+"""
+Master password hashes for SecurePass.
+Hashes are stored in a self-describing format that names the algorithm and its cost
+parameters next to the salt and digest, e.g.
+
+    $pbkdf2-sha256$i=100000$<salt>$<digest>
+    $scrypt$ln=15,r=8,p=1$<salt>$<digest>
+
+(salt and digest in unpadded base64). Verifying reads the parameters from the hash, so
+the configured algorithm and cost can change at any time: existing hashes keep working
+and are rewritten with the current settings the next time their owner logs in. The
+original "salt:key" strings (PBKDF2-SHA256, 100,000 iterations) are still accepted.
+`python manage.py calibrate-kdf` picks parameters for a target time per hash.
+"""
+
+import base64
+import hmac
+import os
+import secrets
+import time
+
+from kdf_service import kdf_service, _pbkdf2, _scrypt
+
+ALGORITHMS = ('pbkdf2-sha256', 'pbkdf2-sha512', 'scrypt')
+
+HASH_CONFIG = {
+    'algorithm': os.environ.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2-sha256'),
+    'pbkdf2_iterations': int(os.environ.get('PASSWORD_HASH_PBKDF2_ITERATIONS', 100000)),
+    # scrypt cost: N = 2**ln; memory per hash is about 128 * r * N bytes
+    'scrypt_ln': int(os.environ.get('PASSWORD_HASH_SCRYPT_LN', 15)),
+    'scrypt_r': int(os.environ.get('PASSWORD_HASH_SCRYPT_R', 8)),
+    'scrypt_p': int(os.environ.get('PASSWORD_HASH_SCRYPT_P', 1)),
+}
+
+SALT_BYTES = 16
+DIGEST_BYTES = 32
+# Parameters of the original "salt:key" hashes
+LEGACY_ITERATIONS = 100000
+
+
+class PasswordHashError(ValueError):
+    """Raised for a stored hash that can't be parsed or names an unsupported algorithm"""
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode().rstrip('=')
+
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def current_params(algorithm=None):
+    """Cost parameters new hashes get for an algorithm (default: the configured one)"""
+    algorithm = algorithm or HASH_CONFIG['algorithm']
+    if algorithm.startswith('pbkdf2-'):
+        return {'i': HASH_CONFIG['pbkdf2_iterations']}
+    if algorithm == 'scrypt':
+        return {'ln': HASH_CONFIG['scrypt_ln'], 'r': HASH_CONFIG['scrypt_r'], 'p': HASH_CONFIG['scrypt_p']}
+    raise PasswordHashError(f"Unsupported password hash algorithm {algorithm!r}")
+
+
+def format_hash(algorithm, params, salt, digest):
+    """Encode a hash as $algorithm$k=v,...$salt$digest"""
+    encoded_params = ','.join(f"{name}={value}" for name, value in params.items())
+    return f"${algorithm}${encoded_params}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def parse_hash(stored_hash):
+    """
+    Split a stored hash into its parts
+
+    Returns:
+        tuple: (algorithm, params dict, salt bytes, digest bytes); legacy "salt:key"
+            hashes come back as pbkdf2-sha256 with their fixed iteration count
+
+    Raises:
+        PasswordHashError: If the hash is malformed or the algorithm is unknown
+    """
+    try:
+        if not stored_hash.startswith('$'):
+            salt_str, key_str = stored_hash.split(':')
+            # The legacy key is the base64 of derive_key()'s urlsafe-base64 output
+            digest = base64.urlsafe_b64decode(base64.b64decode(key_str))
+            return 'pbkdf2-sha256', {'i': LEGACY_ITERATIONS}, base64.b64decode(salt_str), digest
+        _, algorithm, encoded_params, salt, digest = stored_hash.split('$')
+        params = {}
+        for pair in encoded_params.split(','):
+            name, value = pair.split('=')
+            params[name] = int(value)
+        salt, digest = _b64decode(salt), _b64decode(digest)
+    except (ValueError, TypeError) as e:
+        raise PasswordHashError(f"Malformed password hash: {e}")
+    if algorithm not in ALGORITHMS:
+        raise PasswordHashError(f"Unsupported password hash algorithm {algorithm!r}")
+    expected = {'i'} if algorithm.startswith('pbkdf2-') else {'ln', 'r', 'p'}
+    if set(params) != expected:
+        raise PasswordHashError(f"{algorithm} hashes need parameters {', '.join(sorted(expected))}")
+    return algorithm, params, salt, digest
+
+
+def _derive(password, algorithm, params, salt, length):
+    """Run the KDF for a hash in the KDF pool"""
+    if algorithm.startswith('pbkdf2-'):
+        return kdf_service.pbkdf2(password.encode(), salt, params['i'], length=length, hash_name=algorithm[len('pbkdf2-'):])
+    return kdf_service.scrypt(password.encode(), salt, 1 << params['ln'], params['r'], params['p'], length=length)
+
+
+def hash_password(password, algorithm=None, params=None):
+    """
+    Hash a master password with the configured (or given) algorithm and parameters
+
+    Returns:
+        str: The self-describing hash
+    """
+    algorithm = algorithm or HASH_CONFIG['algorithm']
+    params = params or current_params(algorithm)
+    salt = secrets.token_bytes(SALT_BYTES)
+    return format_hash(algorithm, params, salt, _derive(password, algorithm, params, salt, DIGEST_BYTES))
+
+
+def verify_password(password, stored_hash):
+    """
+    Check a master password against a stored hash in constant time
+
+    Raises:
+        PasswordHashError: If the stored hash can't be parsed
+    """
+    algorithm, params, salt, digest = parse_hash(stored_hash)
+    return hmac.compare_digest(_derive(password, algorithm, params, salt, len(digest)), digest)
+
+
+def needs_rehash(stored_hash):
+    """True if a hash wasn't made with the current algorithm and parameters (or is legacy)"""
+    if not stored_hash.startswith('$'):
+        return True
+    try:
+        algorithm, params, _, _ = parse_hash(stored_hash)
+    except PasswordHashError:
+        return False
+    return algorithm != HASH_CONFIG['algorithm'] or params != current_params(algorithm)
+
+
+# --- Calibration ---
+
+def _time_hash(algorithm, params, repeats=3):
+    """Fastest of a few in-process runs, in seconds (no pool, so no queueing)"""
+    salt = secrets.token_bytes(SALT_BYTES)
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        if algorithm.startswith('pbkdf2-'):
+            _pbkdf2(b'calibration', salt, params['i'], DIGEST_BYTES, algorithm[len('pbkdf2-'):])
+        else:
+            _scrypt(b'calibration', salt, 1 << params['ln'], params['r'], params['p'], DIGEST_BYTES)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate(algorithm, target_ms, max_memory_mib=64):
+    """
+    Pick cost parameters so one hash takes about target_ms on this host
+
+    PBKDF2 iterations scale linearly, so they're extrapolated from a short run and
+    rounded to the nearest thousand. scrypt's N only comes in powers of two, so it is
+    the largest N (with r=8, p=1 and at most max_memory_mib per hash) that stays under
+    the target.
+
+    Returns:
+        dict: algorithm, params and the measured milliseconds per hash
+    """
+    if algorithm not in ALGORITHMS:
+        raise PasswordHashError(f"Unsupported password hash algorithm {algorithm!r}")
+    target = target_ms / 1000.0
+
+    if algorithm.startswith('pbkdf2-'):
+        probe = 20000
+        per_iteration = _time_hash(algorithm, {'i': probe}) / probe
+        params = {'i': max(10000, int(round(target / per_iteration, -3)))}
+    else:
+        r, p = 8, 1
+        params = {'ln': 10, 'r': r, 'p': p}
+        for ln in range(11, 31):
+            if 128 * r * (1 << ln) > max_memory_mib * 1024 * 1024:
+                break
+            candidate = {'ln': ln, 'r': r, 'p': p}
+            if _time_hash(algorithm, candidate, repeats=1) > target:
+                break
+            params = candidate
+
+    return {'algorithm': algorithm, 'params': params, 'ms': _time_hash(algorithm, params) * 1000.0}
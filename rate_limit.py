@@ -0,0 +1,130 @@
+"""
+Rate limiting for SecurePass's KDF-heavy endpoints.
+Limits are token buckets kept in the rate_limits table, so every gunicorn worker
+draws from the same buckets. A request takes one token from its client IP, username
+and global buckets in a single short transaction before any key derivation starts;
+if any bucket is empty nothing is taken and the request is turned away with the time
+until a token is available.
+"""
+
+import hashlib
+import os
+import time
+
+from database import take_rate_limit_tokens
+from metrics import counter
+
+
+def _parse_limit(env_name, default):
+    """Parse a 'CAPACITY/SECONDS' limit (e.g. '10/60': bursts of 10, refilled over a minute)"""
+    value = os.environ.get(env_name, default)
+    capacity, seconds = value.split('/')
+    return float(capacity), float(seconds)
+
+
+RATE_LIMIT_CONFIG = {
+    'enabled': os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true',
+    # Reverse proxies in front of the app (Render has one) whose X-Forwarded-For entries are trusted
+    'trusted_proxies': int(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', 0)),
+    # Shared by every rule: caps total KDF work across all workers
+    'global': _parse_limit('RATE_LIMIT_GLOBAL', '100/5'),
+}
+
+# rule -> scope -> (capacity, seconds to refill it); override with RATE_LIMIT_<RULE>_<SCOPE>
+RATE_LIMITS = {
+    'login': {
+        'ip': _parse_limit('RATE_LIMIT_LOGIN_IP', '20/60'),
+        'username': _parse_limit('RATE_LIMIT_LOGIN_USERNAME', '10/300'),
+    },
+    'register': {
+        'ip': _parse_limit('RATE_LIMIT_REGISTER_IP', '5/600'),
+    },
+    'forgot_password': {
+        'ip': _parse_limit('RATE_LIMIT_FORGOT_PASSWORD_IP', '10/600'),
+        'username': _parse_limit('RATE_LIMIT_FORGOT_PASSWORD_USERNAME', '3/900'),
+    },
+    'reset_password': {
+        'ip': _parse_limit('RATE_LIMIT_RESET_PASSWORD_IP', '10/300'),
+    },
+    'use_recovery_key': {
+        'ip': _parse_limit('RATE_LIMIT_USE_RECOVERY_KEY_IP', '10/300'),
+        'username': _parse_limit('RATE_LIMIT_USE_RECOVERY_KEY_USERNAME', '5/900'),
+    },
+    'recovery_reset_password': {
+        'ip': _parse_limit('RATE_LIMIT_RECOVERY_RESET_PASSWORD_IP', '10/300'),
+    },
+    # Master password checks from the API (unlock, and decrypt/import/export on a locked vault)
+    'vault_unlock': {
+        'ip': _parse_limit('RATE_LIMIT_VAULT_UNLOCK_IP', '30/60'),
+        'user': _parse_limit('RATE_LIMIT_VAULT_UNLOCK_USER', '10/60'),
+    },
+}
+
+rate_limit_rejections = counter(
+    'securepass_rate_limit_rejections_total', 'Requests rejected by a rate limit', ['rule', 'scope'])
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request is over one of its rate limits"""
+
+    def __init__(self, rule, scope, retry_after):
+        super().__init__(f"Rate limit exceeded for {rule} ({scope})")
+        self.rule = rule
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+def bucket_key(rule, scope, value):
+    """Key for one bucket; values are hashed so usernames and IPs aren't stored as-is"""
+    digest = hashlib.sha256(str(value).encode()).hexdigest()[:32]
+    return f"{rule}:{scope}:{digest}"
+
+
+def max_refill_seconds():
+    """Longest time any bucket takes to refill completely; idle buckets older than this are full"""
+    periods = [seconds for limits in RATE_LIMITS.values() for _, seconds in limits.values()]
+    return max(periods + [RATE_LIMIT_CONFIG['global'][1]])
+
+
+class RateLimiter:
+    def __init__(self):
+        self._stats = {'allowed': 0, 'rejected': 0}
+
+    def check(self, rule, **values):
+        """
+        Take a token for a request under a rule, or raise RateLimitExceeded
+
+        Args:
+            rule (str): Key into RATE_LIMITS
+            **values: The request's value for each scope (ip=..., username=..., user=...); missing
+                or empty values skip that scope
+        """
+        if not RATE_LIMIT_CONFIG['enabled']:
+            return
+        scopes = []
+        buckets = []
+        for scope, (capacity, seconds) in RATE_LIMITS[rule].items():
+            value = values.get(scope)
+            if value:
+                scopes.append(scope)
+                buckets.append((bucket_key(rule, scope, value), capacity, capacity / seconds))
+        capacity, seconds = RATE_LIMIT_CONFIG['global']
+        scopes.append('global')
+        buckets.append(('global', capacity, capacity / seconds))
+
+        rejected = take_rate_limit_tokens(buckets, time.time())
+        if rejected is None:
+            self._stats['allowed'] += 1
+            return
+        index, retry_after = rejected
+        self._stats['rejected'] += 1
+        rate_limit_rejections.inc(rule, scopes[index])
+        raise RateLimitExceeded(rule, scopes[index], retry_after)
+
+    def stats(self):
+        """Return this worker's allow/reject counters"""
+        return dict(self._stats, enabled=RATE_LIMIT_CONFIG['enabled'])
+
+
+# Shared limiter used by the app
+limiter = RateLimiter()
@@ -192,7 +192,7 @@ document.addEventListener('DOMContentLoaded', function() {
                             strengthLabel.textContent = 'Password Strength: None';
                         }
                         loadPasswords();
-                        showAlert('Password added successfully!', 'success');
+                        showAlert(data.warning || 'Password added successfully!', data.warning ? 'info' : 'success');
                     }, 300);
                 } else {
                     showAlert('Error: ' + data.error, 'error');
@@ -0,0 +1,179 @@
+"""
+Vault export for SecurePass.
+Entries are read from a server-side cursor a batch at a time, decrypted, formatted as
+NDJSON or CSV and handed to the response as they are produced, so worker memory stays
+flat however large the vault is. With an export passphrase the output is sealed in
+AES-256-GCM frames (one per batch) that only `python manage.py decrypt-export` opens.
+"""
+
+import base64
+import csv
+import io
+import json
+import os
+import secrets
+
+from database import iter_password_batches
+from kdf_service import kdf_service
+
+EXPORT_CONFIG = {
+    'batch_size': int(os.environ.get('EXPORT_BATCH_SIZE', 200)),
+    'kdf_iterations': int(os.environ.get('EXPORT_KDF_ITERATIONS', 600000)),
+}
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+# Column order matches the names the importer understands
+CSV_FIELDS = ('site_name', 'site_url', 'site_username', 'site_password', 'created_at', 'error')
+
+ARCHIVE_VERSION = 1
+
+
+def export_entries(encryptor, user_id, vault_key, master_password=None, batch_size=None):
+    """
+    Yield lists of decrypted entries, oldest first, one database batch at a time
+
+    Legacy entries are opened with the master password when one is given; otherwise
+    they come out with an error instead of a password.
+    """
+    associated_data = encryptor.entry_associated_data(user_id)
+    for rows in iter_password_batches(user_id, batch_size or EXPORT_CONFIG['batch_size']):
+        entries = []
+        for row in rows:
+            entry = {
+                'id': row['id'],
+                'site_name': row['site_name'],
+                'site_url': row['site_url'],
+                'site_username': row['site_username'],
+                'created_at': row['created_at'],
+            }
+            try:
+                encrypted_data = json.loads(row['encrypted_data'])
+                if not encryptor.is_legacy_entry(encrypted_data):
+                    entry['site_password'] = encryptor.decrypt_entry(encrypted_data, vault_key, associated_data)
+                elif master_password:
+                    entry['site_password'] = encryptor.decrypt_password(encrypted_data, master_password)
+                else:
+                    entry['error'] = 'Master password required for legacy entry'
+            except Exception:
+                entry['error'] = 'Decryption failed'
+            entries.append(entry)
+        yield entries
+
+
+def format_ndjson(batches):
+    """Render entry batches as newline-delimited JSON, one chunk per batch"""
+    for entries in batches:
+        yield ''.join(json.dumps(entry) + '\n' for entry in entries)
+
+
+def format_csv(batches):
+    """Render entry batches as CSV with a header row, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for entries in batches:
+        writer.writerows(entries)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _frame_aad(header, index, final):
+    # Binding the header, position and end marker rejects reordered, spliced or truncated archives
+    return f"{header}|{index}|{int(final)}".encode()
+
+
+def seal_stream(chunks, passphrase, content, iterations=None):
+    """
+    Encrypt a stream of text chunks under an export passphrase
+
+    The archive is a JSON header line followed by one JSON frame line per chunk and a
+    closing frame marked final. The passphrase goes through one PBKDF2 run, done
+    before the first line is produced so a busy KDF pool fails the request up front.
+
+    Args:
+        chunks: Iterable of text chunks (NDJSON or CSV)
+        passphrase (str): The export passphrase
+        content (str): Format of the plaintext ('ndjson' or 'csv')
+        iterations (int): PBKDF2 iterations for the passphrase
+
+    Returns:
+        iterator: Lines of the encrypted archive
+    """
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    iterations = iterations or EXPORT_CONFIG['kdf_iterations']
+    salt = secrets.token_bytes(16)
+    aesgcm = AESGCM(kdf_service.pbkdf2(passphrase.encode(), salt, iterations, length=32, hash_name='sha256'))
+    header = json.dumps({
+        'securepass_export': ARCHIVE_VERSION,
+        'content': content,
+        'kdf': 'pbkdf2-sha256',
+        'iterations': iterations,
+        'salt': base64.b64encode(salt).decode(),
+    })
+
+    def frame(index, plaintext, final):
+        nonce = secrets.token_bytes(12)
+        ciphertext = aesgcm.encrypt(nonce, plaintext.encode(), _frame_aad(header, index, final))
+        return json.dumps({
+            'nonce': base64.b64encode(nonce).decode(),
+            'ct': base64.b64encode(ciphertext).decode(),
+            'final': final,
+        }) + '\n'
+
+    def lines():
+        yield header + '\n'
+        index = 0
+        for chunk in chunks:
+            yield frame(index, chunk, False)
+            index += 1
+        yield frame(index, '', True)
+    return lines()
+
+
+def open_sealed_stream(lines, passphrase):
+    """
+    Decrypt an archive made by seal_stream
+
+    Args:
+        lines: Iterable of archive lines
+        passphrase (str): The export passphrase
+
+    Returns:
+        tuple: (content format, iterator of plaintext chunks)
+
+    Raises:
+        ValueError: If the archive is malformed, truncated or the passphrase is wrong
+    """
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    lines = iter(lines)
+    try:
+        header = next(lines).rstrip('\n')
+        meta = json.loads(header)
+    except (StopIteration, ValueError):
+        raise ValueError("Not a SecurePass export archive")
+    if meta.get('securepass_export') != ARCHIVE_VERSION or meta.get('kdf') != 'pbkdf2-sha256':
+        raise ValueError("Unsupported export archive version")
+    key = kdf_service.pbkdf2(passphrase.encode(), base64.b64decode(meta['salt']), meta['iterations'],
+                             length=32, hash_name='sha256')
+    aesgcm = AESGCM(key)
+
+    def chunks():
+        for index, line in enumerate(lines):
+            frame = json.loads(line)
+            try:
+                plaintext = aesgcm.decrypt(base64.b64decode(frame['nonce']), base64.b64decode(frame['ct']),
+                                           _frame_aad(header, index, frame['final']))
+            except Exception:
+                raise ValueError("Decryption failed. Wrong passphrase or damaged archive.")
+            if frame['final']:
+                return
+            yield plaintext.decode()
+        raise ValueError("Export archive is truncated")
+    return meta['content'], chunks()
@@ -0,0 +1,151 @@
+"""
+Vault health reporting for SecurePass.
+Every entry is stored with a keyed HMAC fingerprint of its plaintext and a strength
+score, both computed while the plaintext is at hand (on add, import, or a backfill
+pass when the vault is unlocked). Reused passwords then show up as equal fingerprints
+found with an indexed GROUP BY, and the report needs no decryption at all. The
+fingerprint key is derived from the user's vault key, so equal passwords in different
+vaults never match.
+"""
+
+import json
+import math
+import os
+import string
+import time
+
+from breach_check import breach_index
+from database import (get_unfingerprinted_passwords, set_password_fingerprints, get_reused_passwords,
+                      get_password_strength_counts, get_password_age_counts, get_weak_passwords)
+
+HEALTH_CONFIG = {
+    'batch_size': int(os.environ.get('VAULT_HEALTH_BATCH_SIZE', 200)),
+    'time_budget': float(os.environ.get('VAULT_HEALTH_TIME_BUDGET', 2.0)),
+    'max_listed': int(os.environ.get('VAULT_HEALTH_MAX_LISTED', 100)),
+}
+
+# Strength scores, weakest first; entries at WEAK_STRENGTH or below are listed in the report
+STRENGTH_LABELS = ('very_weak', 'weak', 'fair', 'strong', 'very_strong')
+WEAK_STRENGTH = 1
+# Minimum estimated bits of entropy for each score above very_weak
+STRENGTH_THRESHOLDS = (28, 36, 60, 80)
+
+# Age bucket upper bounds in days; entries older than the last bound fall in the final bucket
+AGE_BUCKETS = ((90, 'under_90_days'), (365, 'under_1_year'), (730, 'under_2_years'))
+AGE_OVERFLOW_LABEL = 'over_2_years'
+
+
+def password_strength(password):
+    """
+    Score a password from 0 (very weak) to 4 (very strong)
+
+    The estimate is length times log2 of the character pool in use, with repeated
+    characters discounted. Passwords found in the breach index always score 0.
+    """
+    if breach_index.lookup(password):
+        return 0
+    pool = 0
+    for chars, size in ((string.ascii_lowercase, 26), (string.ascii_uppercase, 26), (string.digits, 10)):
+        if any(c in chars for c in password):
+            pool += size
+    if any(c in string.punctuation or c == ' ' for c in password):
+        pool += 33
+    if any(ord(c) > 127 for c in password):
+        pool += 100
+    # 'aaaaaaaaaaaa' shouldn't outscore 'k3Xp'; count each distinct character at most twice
+    effective_length = min(len(password), 2 * len(set(password)))
+    bits = effective_length * math.log2(pool) if pool else 0.0
+    return sum(bits >= threshold for threshold in STRENGTH_THRESHOLDS)
+
+
+def describe_password(encryptor, password, fingerprint_key):
+    """Fingerprint and strength to store alongside a newly encrypted password"""
+    return encryptor.fingerprint(password, fingerprint_key), password_strength(password)
+
+
+def backfill_fingerprints(encryptor, user_id, vault_key, batch_size=None, time_budget=None):
+    """
+    Fingerprint and score a user's vault-key entries that predate fingerprints
+
+    Entries open with the vault key alone (no KDF), so this runs whenever the vault is
+    unlocked. Legacy entries are picked up once the migration has rewritten them.
+
+    Returns:
+        dict: Counts of fingerprinted and failed entries and whether the run finished
+    """
+    batch_size = batch_size or HEALTH_CONFIG['batch_size']
+    time_budget = time_budget if time_budget is not None else HEALTH_CONFIG['time_budget']
+    deadline = time.monotonic() + time_budget
+    associated_data = encryptor.entry_associated_data(user_id)
+    fingerprint_key = encryptor.fingerprint_key(vault_key)
+
+    result = {'fingerprinted': 0, 'failed': 0, 'complete': False}
+    after_id = 0
+    while True:
+        rows = get_unfingerprinted_passwords(user_id, after_id, batch_size)
+        if not rows:
+            result['complete'] = True
+            return result
+
+        updates = []
+        for row in rows:
+            after_id = row['id']
+            try:
+                plaintext = encryptor.decrypt_entry(json.loads(row['encrypted_data']), vault_key, associated_data)
+            except Exception:
+                result['failed'] += 1
+                continue
+            updates.append((row['id'],) + describe_password(encryptor, plaintext, fingerprint_key))
+
+        if updates:
+            set_password_fingerprints(user_id, updates)
+            result['fingerprinted'] += len(updates)
+
+        if time.monotonic() > deadline:
+            return result
+
+
+def _entry_metadata(row):
+    return {
+        'id': row['id'],
+        'site_name': row['site_name'],
+        'site_url': row['site_url'],
+        'site_username': row['site_username'],
+        'created_at': row['created_at'],
+    }
+
+
+def vault_health_report(user_id):
+    """
+    Summarize reuse, strength and age across a user's vault from stored metadata only
+
+    Returns:
+        dict: Reused-password groups, weak entries, and counts per strength and age bucket
+    """
+    reused = []
+    previous = None
+    for row in get_reused_passwords(user_id):
+        if row['fingerprint'] != previous:
+            reused.append([])
+            previous = row['fingerprint']
+        reused[-1].append(_entry_metadata(row))
+
+    strength_counts = get_password_strength_counts(user_id)
+    age_counts = get_password_age_counts(user_id, [days for days, _ in AGE_BUCKETS])
+    age_labels = [label for _, label in AGE_BUCKETS] + [AGE_OVERFLOW_LABEL]
+    weak = [dict(_entry_metadata(row), strength=STRENGTH_LABELS[row['strength']])
+            for row in get_weak_passwords(user_id, WEAK_STRENGTH, HEALTH_CONFIG['max_listed'])]
+
+    return {
+        'total': sum(strength_counts.values()),
+        'reused': {
+            'groups': reused[:HEALTH_CONFIG['max_listed']],
+            'group_count': len(reused),
+            'entry_count': sum(len(group) for group in reused),
+        },
+        'strength': {label: strength_counts.get(score, 0) for score, label in enumerate(STRENGTH_LABELS)},
+        'weak': weak,
+        'age': {label: age_counts.get(bucket, 0) for bucket, label in enumerate(age_labels)},
+        # Entries written before fingerprints existed, until the next unlock backfills them
+        'pending': strength_counts.get(None, 0),
+    }
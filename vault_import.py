@@ -0,0 +1,298 @@
+"""
+Bulk import of vault entries for SecurePass.
+Reads CSV exports (Chrome, Firefox, Bitwarden or SecurePass column names) and JSON
+exports (a list of entries or a Bitwarden export) as a stream, encrypts each entry
+under the already unlocked vault key and inserts them in chunked transactions, so a
+large import costs one master password check instead of one per entry.
+"""
+
+import csv
+import io
+import json
+import os
+from urllib.parse import urlparse
+
+from database import add_passwords
+from encryption_helper import ENTRY_FORMAT_VERSION
+from vault_health import describe_password
+
+IMPORT_CONFIG = {
+    'chunk_size': int(os.environ.get('IMPORT_CHUNK_SIZE', 500)),
+    'max_entries': int(os.environ.get('IMPORT_MAX_ENTRIES', 10000)),
+    'max_bytes': int(os.environ.get('IMPORT_MAX_BYTES', 16 * 1024 * 1024)),
+    'max_errors': int(os.environ.get('IMPORT_MAX_ERRORS', 500)),
+}
+
+# Column names used by the supported exporters, per vault field
+FIELD_ALIASES = {
+    'site_name': ('site_name', 'name', 'title'),
+    'site_url': ('site_url', 'url', 'login_uri', 'uri'),
+    'site_username': ('site_username', 'username', 'login_username'),
+    'site_password': ('site_password', 'password', 'login_password'),
+}
+
+_READ_SIZE = 64 * 1024
+
+
+class ImportFormatError(ValueError):
+    """Raised when an upload can't be read as the requested format"""
+
+
+class ImportTooLargeError(Exception):
+    """Raised by SizeLimitedStream once more than its limit has been read"""
+    # Not a ValueError: Werkzeug's form parser silently swallows those
+
+
+class SizeLimitedStream(io.RawIOBase):
+    """
+    Binary stream wrapper that counts bytes read and raises past a limit
+
+    Covers bodies without a Content-Length (chunked uploads), which a header check can't.
+    """
+
+    def __init__(self, stream, max_bytes):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # Ask for one byte past the limit so an upload of exactly max_bytes still passes
+        size = min(len(buffer), self.max_bytes + 1 - self.bytes_read)
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise ImportTooLargeError(f"Import is larger than {self.max_bytes} bytes")
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def detect_format(requested=None, filename=None, mimetype=None):
+    """
+    Pick the import format from an explicit choice, the file name or the content type
+
+    Returns:
+        str: 'csv', 'json', or None if it can't be told
+    """
+    for hint in (requested, os.path.splitext(filename or '')[1].lstrip('.'), (mimetype or '').split('/')[-1]):
+        hint = (hint or '').lower()
+        if hint in ('csv', 'json'):
+            return hint
+    return None
+
+
+def _text_stream(stream):
+    # utf-8-sig drops the byte order mark some spreadsheet tools write
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def _iter_csv(stream):
+    reader = csv.DictReader(_text_stream(stream))
+    try:
+        fieldnames = reader.fieldnames
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ImportFormatError(f"Invalid CSV: {e}")
+    if not fieldnames:
+        raise ImportFormatError("CSV file is empty")
+    reader.fieldnames = [(name or '').strip().lower() for name in fieldnames]
+    if not any(name in reader.fieldnames for name in FIELD_ALIASES['site_password']):
+        raise ImportFormatError("CSV header has no password column")
+
+    def rows():
+        try:
+            for row in reader:
+                yield reader.line_num, row
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise ImportFormatError(f"Invalid CSV near line {reader.line_num}: {e}")
+    return rows()
+
+
+def _iter_json_array(text, buffer):
+    """Decode the items of a top-level JSON array one at a time"""
+    decoder = json.JSONDecoder()
+    pos = 1
+    eof = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        if pos < len(buffer):
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Most likely the item runs past the end of the buffer; read more and retry
+                if eof:
+                    raise ImportFormatError("Invalid JSON array")
+            else:
+                yield item
+                pos = end
+                continue
+        if eof:
+            raise ImportFormatError("Unexpected end of JSON array")
+        try:
+            chunk = text.read(_READ_SIZE)
+        except UnicodeDecodeError as e:
+            raise ImportFormatError(f"Invalid JSON: {e}")
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def _flatten_json_item(item):
+    if not isinstance(item, dict):
+        return None
+    login = item.get('login')
+    if isinstance(login, dict):
+        # Bitwarden item: type 1 is a login, other types (notes, cards, identities) are skipped
+        uris = login.get('uris') or []
+        return {
+            'type': 'login' if item.get('type') == 1 else str(item.get('type')),
+            'name': item.get('name'),
+            'login_uri': uris[0].get('uri') if uris and isinstance(uris[0], dict) else None,
+            'login_username': login.get('username'),
+            'login_password': login.get('password'),
+        }
+    return {str(key).lower(): value for key, value in item.items()}
+
+
+def _iter_json(stream):
+    text = _text_stream(stream)
+    try:
+        buffer = text.read(_READ_SIZE).lstrip()
+    except UnicodeDecodeError as e:
+        raise ImportFormatError(f"Invalid JSON: {e}")
+    if buffer.startswith('['):
+        items = _iter_json_array(text, buffer)
+    elif buffer.startswith('{'):
+        # Wrapped exports (Bitwarden) are read whole; the request body is a SizeLimitedStream
+        # capped at IMPORT_MAX_BYTES, so this can't grow past that
+        try:
+            document = json.loads(buffer + text.read())
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ImportFormatError(f"Invalid JSON: {e}")
+        if document.get('encrypted'):
+            raise ImportFormatError("Encrypted exports can't be imported; export unencrypted JSON instead")
+        items = document.get('items')
+        if not isinstance(items, list):
+            raise ImportFormatError("JSON export has no items list")
+    else:
+        raise ImportFormatError("JSON import must be a list of entries or an export with an items list")
+
+    def rows():
+        for index, item in enumerate(items, start=1):
+            yield index, _flatten_json_item(item)
+    return rows()
+
+
+def open_import(stream, fmt):
+    """
+    Start reading an upload, checking its header or opening bracket straight away
+
+    Args:
+        stream: Binary file-like object with the upload
+        fmt (str): 'csv' or 'json'
+
+    Returns:
+        iterator: (row number, raw field dict or None) pairs
+
+    Raises:
+        ImportFormatError: If the upload doesn't look like the format at all
+    """
+    if fmt == 'csv':
+        return _iter_csv(stream)
+    if fmt == 'json':
+        return _iter_json(stream)
+    raise ImportFormatError("Unsupported import format; use csv or json")
+
+
+def normalize_entry(raw):
+    """
+    Map an exporter's fields onto site_name, site_url, site_username and site_password
+
+    Returns:
+        tuple: (entry dict, None) or (None, error message)
+    """
+    if raw is None:
+        return None, 'Entry is not an object'
+    if raw.get('type') not in (None, '', 'login'):
+        return None, 'Only login items can be imported'
+
+    entry = {}
+    for field, aliases in FIELD_ALIASES.items():
+        value = next((raw[name] for name in aliases if raw.get(name) not in (None, '')), '')
+        value = value if isinstance(value, str) else str(value)
+        # Passwords are kept byte for byte; surrounding spaces may be part of them
+        entry[field] = value if field == 'site_password' else value.strip()
+
+    if not entry['site_name'] and entry['site_url']:
+        # Firefox exports have no name column; fall back to the host name
+        entry['site_name'] = urlparse(entry['site_url']).hostname or entry['site_url']
+    if not entry['site_password']:
+        return None, 'Missing password'
+    if not entry['site_name']:
+        return None, 'Missing site name or URL'
+    return entry, None
+
+
+def import_entries(encryptor, user_id, vault_key, rows, chunk_size=None, max_entries=None):
+    """
+    Encrypt and store parsed import rows under the vault key
+
+    Args:
+        encryptor (PasswordEncryption): The encryption helper
+        user_id (int): Owner of the entries
+        vault_key (bytes): The unwrapped vault data key
+        rows: Iterator of (row number, raw field dict) from open_import
+        chunk_size (int): Entries inserted per transaction
+        max_entries (int): Rows read before the rest of the upload is rejected
+
+    Returns:
+        dict: Counts of imported and failed rows, with an error per failed row
+    """
+    chunk_size = chunk_size or IMPORT_CONFIG['chunk_size']
+    max_entries = max_entries or IMPORT_CONFIG['max_entries']
+    associated_data = encryptor.entry_associated_data(user_id)
+
+    report = {'imported': 0, 'failed': 0, 'errors': [], 'complete': True}
+
+    def fail(row, error):
+        report['failed'] += 1
+        if len(report['errors']) < IMPORT_CONFIG['max_errors']:
+            report['errors'].append({'row': row, 'error': error})
+
+    fingerprint_key = encryptor.fingerprint_key(vault_key)
+    chunk = []
+    seen = 0
+    try:
+        for row, raw in rows:
+            seen += 1
+            if seen > max_entries:
+                report['complete'] = False
+                report['errors'].append({'row': row, 'error': f"Import limited to {max_entries} entries; the rest was skipped"})
+                break
+            entry, error = normalize_entry(raw)
+            if error:
+                fail(row, error)
+                continue
+            encrypted = encryptor.encrypt_entry(entry['site_password'], vault_key, associated_data)
+            chunk.append((entry['site_name'], entry['site_url'] or None, entry['site_username'], json.dumps(encrypted))
+                         + describe_password(encryptor, entry['site_password'], fingerprint_key))
+            if len(chunk) >= chunk_size:
+                report['imported'] += add_passwords(user_id, chunk, ENTRY_FORMAT_VERSION)
+                chunk = []
+    except ImportFormatError as e:
+        # Rows before the damage are kept; report where reading stopped
+        report['complete'] = False
+        report['errors'].append({'row': None, 'error': str(e)})
+    except ImportTooLargeError as e:
+        # Rows before the limit are kept, as for damaged input
+        report['complete'] = False
+        report['too_large'] = True
+        report['errors'].append({'row': None, 'error': str(e)})
+
+    if chunk:
+        report['imported'] += add_passwords(user_id, chunk, ENTRY_FORMAT_VERSION)
+    return report
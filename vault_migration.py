@@ -0,0 +1,87 @@
+"""
+Migration of legacy vault entries to the vault-key format for SecurePass.
+Legacy entries each carry their own salt and need a full PBKDF2 run to open, so
+they can only be rewritten while the owner's master password is at hand (on unlock).
+Work happens in small batches committed one at a time, so an interrupted or
+time-limited run simply resumes from the remaining legacy rows next time.
+Entries that don't open with the master password (e.g. written under the one in
+use before a password reset) are marked with UNREADABLE_LEGACY_VERSION so later
+unlocks don't spend a PBKDF2 run on them again.
+"""
+
+import json
+import os
+import time
+
+from database import get_legacy_passwords, update_encrypted_passwords, mark_legacy_passwords
+from encryption_helper import ENTRY_FORMAT_VERSION
+from kdf_service import KDFBusyError
+
+# enc_version of legacy entries the master password couldn't open (1 is a legacy entry still to try)
+UNREADABLE_LEGACY_VERSION = 0
+
+MIGRATION_CONFIG = {
+    'batch_size': int(os.environ.get('VAULT_MIGRATION_BATCH_SIZE', 50)),
+    'time_budget': float(os.environ.get('VAULT_MIGRATION_TIME_BUDGET', 5.0)),
+}
+
+
+def migrate_legacy_entries(encryptor, user_id, master_password, vault_key, batch_size=None, time_budget=None):
+    """
+    Re-encrypt a user's legacy entries under their vault key
+
+    Args:
+        encryptor (PasswordEncryption): The encryption helper
+        user_id (int): Owner of the entries
+        master_password (str): The verified master password (opens legacy entries)
+        vault_key (bytes): The unwrapped vault data key
+        batch_size (int): Rows read and committed per batch
+        time_budget (float): Seconds after which to stop and leave the rest for next time
+
+    Returns:
+        dict: Counts of migrated and failed entries and whether the run finished
+    """
+    batch_size = batch_size or MIGRATION_CONFIG['batch_size']
+    time_budget = time_budget if time_budget is not None else MIGRATION_CONFIG['time_budget']
+    deadline = time.monotonic() + time_budget
+    associated_data = encryptor.entry_associated_data(user_id)
+    
+    result = {'migrated': 0, 'failed': 0, 'complete': False}
+    after_id = 0
+    while True:
+        rows = get_legacy_passwords(user_id, after_id, batch_size)
+        if not rows:
+            result['complete'] = True
+            return result
+        
+        updates = []
+        unreadable = []
+        out_of_time = False
+        for row in rows:
+            # Checked before every row, whichever way the previous one went: each costs a PBKDF2 run
+            if time.monotonic() > deadline:
+                out_of_time = True
+                break
+            after_id = row['id']
+            try:
+                plaintext = encryptor.decrypt_password(json.loads(row['encrypted_data']), master_password)
+            except KDFBusyError:
+                # Not the row's fault; try it again on a later unlock
+                out_of_time = True
+                break
+            except Exception:
+                # Corrupt, foreign or opened only by an earlier master password: set aside for good
+                unreadable.append(row['id'])
+                continue
+            entry = encryptor.encrypt_entry(plaintext, vault_key, associated_data)
+            updates.append((row['id'], json.dumps(entry)))
+        
+        if updates:
+            update_encrypted_passwords(user_id, updates, ENTRY_FORMAT_VERSION)
+            result['migrated'] += len(updates)
+        if unreadable:
+            mark_legacy_passwords(user_id, unreadable, UNREADABLE_LEGACY_VERSION)
+            result['failed'] += len(unreadable)
+        
+        if out_of_time:
+            return result
@@ -0,0 +1,144 @@
+"""
+Unlocked-vault sessions for SecurePass.
+After one successful master password check, the unwrapped vault data key is kept
+server-side in a bounded per-worker cache so later API calls skip PBKDF2 entirely.
+The browser only ever holds an opaque handle to the cached key in its session cookie.
+
+Each unlocked session is also stored in the vault_sessions table, sealed under a key
+derived from the handle, so a worker that hasn't seen the session yet resumes it
+without asking for the master password again. Workers recheck the row every
+VAULT_TOUCH_INTERVAL seconds, which is how a lock or password reset made through one
+worker reaches the others.
+"""
+
+import hashlib
+import os
+import secrets
+import time
+
+from cache import TTLCache
+from database import create_vault_session, get_vault_session, touch_vault_session, delete_vault_sessions
+from encryption_helper import PasswordEncryption
+
+# Vault cache configuration
+VAULT_CONFIG = {
+    'max_sessions': int(os.environ.get('VAULT_CACHE_SIZE', 1000)),
+    'idle_ttl': float(os.environ.get('VAULT_IDLE_TTL', 15 * 60)),
+    'max_ttl': float(os.environ.get('VAULT_MAX_TTL', 8 * 60 * 60)),
+    'touch_interval': float(os.environ.get('VAULT_TOUCH_INTERVAL', 60)),
+}
+
+
+class UnlockedVault:
+    """A user's vault data key, held for one unlocked session"""
+
+    def __init__(self, user_id, vault_key):
+        self.user_id = user_id
+        self._key = bytearray(vault_key)
+        # When this worker last confirmed the shared session row still exists
+        self.checked_at = time.monotonic()
+
+    @property
+    def key(self):
+        """The vault data key"""
+        return bytes(self._key)
+
+    def wipe(self):
+        """Overwrite and forget the cached key"""
+        for i in range(len(self._key)):
+            self._key[i] = 0
+
+
+_vaults = TTLCache(
+    max_size=VAULT_CONFIG['max_sessions'],
+    ttl=VAULT_CONFIG['max_ttl'],
+    idle_ttl=VAULT_CONFIG['idle_ttl'],
+    on_evict=lambda sid, vault: vault.wipe(),
+)
+
+_encryptor = PasswordEncryption()
+
+
+def _handle_hash(vault_sid):
+    return hashlib.sha256(vault_sid.encode()).digest()
+
+
+def unlock_vault(session, user_id, vault_key):
+    """
+    Start an unlocked-vault session for the current browser session
+
+    Args:
+        session: The Flask session to attach the vault handle to
+        user_id (int): The user the vault belongs to
+        vault_key (bytes): The unwrapped vault data key
+
+    Returns:
+        UnlockedVault: The cached vault
+    """
+    lock_vault(session)
+    vault_sid = secrets.token_urlsafe(32)
+    now = time.time()
+    expires_at = now + VAULT_CONFIG['max_ttl']
+    create_vault_session(_handle_hash(vault_sid), user_id, _encryptor.seal_session_key(vault_key, vault_sid),
+                         min(now + VAULT_CONFIG['idle_ttl'], expires_at), expires_at)
+    vault = UnlockedVault(user_id, vault_key)
+    _vaults.set(vault_sid, vault)
+    session['vault_sid'] = vault_sid
+    return vault
+
+
+def get_unlocked_vault(session, user_id):
+    """Get the unlocked vault for this session, or None if locked or expired"""
+    vault_sid = session.get('vault_sid')
+    if not vault_sid:
+        return None
+    vault = _vaults.get(vault_sid)
+    if vault is None:
+        vault = _resume_vault(vault_sid)
+    elif time.monotonic() - vault.checked_at > VAULT_CONFIG['touch_interval']:
+        now = time.time()
+        if not touch_vault_session(_handle_hash(vault_sid), now + VAULT_CONFIG['idle_ttl'], now):
+            # Locked, reset or expired through another worker
+            _vaults.pop(vault_sid)
+            return None
+        vault.checked_at = time.monotonic()
+    if vault is None or vault.user_id != user_id:
+        return None
+    return vault
+
+
+def _resume_vault(vault_sid):
+    """Load a session unlocked through another worker into this worker's cache"""
+    now = time.time()
+    row = get_vault_session(_handle_hash(vault_sid), now)
+    if row is None:
+        return None
+    try:
+        vault_key = _encryptor.open_session_key(row['sealed_key'], vault_sid)
+    except ValueError:
+        return None
+    touch_vault_session(_handle_hash(vault_sid), now + VAULT_CONFIG['idle_ttl'], now)
+    vault = UnlockedVault(row['user_id'], vault_key)
+    _vaults.set(vault_sid, vault)
+    return vault
+
+
+def lock_vault(session):
+    """Wipe the cached keys for this session, in every worker"""
+    vault_sid = session.pop('vault_sid', None)
+    if vault_sid:
+        _vaults.pop(vault_sid)
+        delete_vault_sessions(handle_hash=_handle_hash(vault_sid))
+
+
+def lock_user_vaults(user_id):
+    """Wipe every cached vault belonging to a user (e.g. after a password reset)"""
+    _vaults.discard_where(lambda vault: vault.user_id == user_id)
+    # Other workers drop their copies at their next check of the shared row
+    delete_vault_sessions(user_id=user_id)
+
+
+def vault_cache_stats():
+    """Get vault cache counters for this worker"""
+    _vaults.purge_expired()
+    return _vaults.stats()
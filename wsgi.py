@@ -3,11 +3,11 @@ WSGI entry point for SecurePass application.
 This file is used by Gunicorn to serve the application.
 """
 
-from app import app
+from app import create_app
 
 if __name__ == "__main__":
     # For local development
-    app.run()
+    create_app().run()
 else:
     # For production with Gunicorn
-    application = app
\ No newline at end of file
+    application = create_app()